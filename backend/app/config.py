@@ -9,6 +9,41 @@ class Settings(BaseSettings):
     yandex_client_id: str = ""
     yandex_client_secret: str = ""
     yandex_redirect_uri: str = ""
+    yandex_max_concurrent_requests: int = 4  # parallel Metrika API requests per sync
+    yandex_rate_limit_per_second: float = 8.0  # client-side request rate per OAuth token
+    yandex_rate_limit_burst: float = 8.0
+    yandex_retry_attempts: int = 5  # total attempts for 429/5xx/transport errors
+    yandex_retry_base_delay_seconds: float = 0.5
+    yandex_retry_max_delay_seconds: float = 30.0  # cap of the exponential backoff (not of Retry-After)
+    yandex_retry_budget_seconds: float = 120.0  # max total wait between retries of one request; longer Retry-After fails fast
+    yandex_circuit_failure_threshold: int = 5  # consecutive failures before failing fast
+    yandex_circuit_reset_seconds: float = 30.0
+    # One Metrika request per counter for both robot variants; "users" with robots is then
+    # approximate (see fetch_metrics_by_robot), compare with benchmarks.robots_fetch_check
+    yandex_combined_robots_fetch: bool = False
+    sync_full_window_days: int = 7  # default window for new counters / full syncs
+    sync_restatement_days: int = 1  # incremental syncs re-fetch this many days before synced_through
+    sync_workers: int = 4  # libraries synced in parallel by the scheduled job
+    sync_library_timeout_seconds: int = 600
+    backfill_max_parallel_chunks: int = 2  # monthly chunks fetched at once by a backfill
+    http_client_max_connections: int = 20  # shared Yandex API connection pool
+    http_client_max_keepalive_connections: int = 10
+    http_client_keepalive_expiry_seconds: float = 30.0
+    http_client_timeout_seconds: float = 30.0
+    http_client_http2: bool = True  # needs the `h2` package (pip install "httpx[http2]")
+    vk_csv_engine: str = "stream"  # "stream" (row by row) or "columnar" (batched, NumPy if installed)
+    vk_upload_dir: str = ""  # where uploads wait for their background job; empty = system temp dir
+    vk_upload_progress_interval_seconds: float = 2.0  # how often job progress is saved to vk_uploads
+    dashboard_concurrent_loaders: bool = True  # run multi-loader endpoints on parallel sessions (1 pooled connection each)
+    # Parallel sessions per request; keep requests in flight x this within the engine pool (5 + 10 overflow)
+    dashboard_max_concurrent_loaders: int = 3
+    traffic_rollups_enabled: bool = True  # dashboard reads traffic_*_rollups when no counter filter is set
+    trend_max_points: int = 92  # granularity=auto: finest of day/week/month with at most this many points
+    response_cache_enabled: bool = True  # cache public dashboard responses (invalidated on data changes)
+    response_cache_ttl_seconds: float = 6 * 3600  # safety net; writes invalidate explicitly
+    response_cache_max_entries: int = 2048  # in-process LRU size
+    response_etag_enabled: bool = True  # strong ETag + 304 on If-None-Match for cached endpoints
+    cache_redis_url: str = ""  # shared cache across processes, needs `redis` (pip install ".[cache]")
     frontend_url: str = "http://localhost:5173"
     cors_origins: list[str] = []
 
@@ -15,3 +15,9 @@ async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit
 async def get_db():
     async with async_session() as session:
         yield session
+
+
+async def run_in_session(loader, *args, **kwargs):
+    """Run loader(session, *args, **kwargs) on its own pooled session, so loaders can be gathered"""
+    async with async_session() as session:
+        return await loader(session, *args, **kwargs)
@@ -21,6 +21,11 @@ from app.routers import (
     yandex_auth,
 )
 from app.scheduler.setup import start_scheduler, stop_scheduler
+from app.services.backfill_service import resume_backfills, stop_backfills
+from app.services.http_client import close_http_client, start_http_client
+from app.services.response_cache import close_cache_backend
+from app.services.rollup_service import ensure_traffic_rollups
+from app.services.vk_upload_service import resume_upload_jobs, stop_upload_jobs
 
 
 @asynccontextmanager
@@ -43,10 +48,21 @@ async def lifespan(app: FastAPI):
             " EXCEPTION WHEN duplicate_object THEN NULL; END $$"
         ))
         await conn.run_sync(Base.metadata.create_all)
+    # Fill traffic rollups where migration 009 has not
+    await ensure_traffic_rollups()
+    # One pooled HTTP client for all Yandex API calls
+    await start_http_client()
     start_scheduler()
+    # Pick up backfills and VK uploads interrupted by a restart
+    await resume_backfills()
+    await resume_upload_jobs()
     yield
     # Shutdown
     stop_scheduler()
+    await stop_backfills()
+    await stop_upload_jobs()
+    await close_http_client()
+    await close_cache_backend()
 
 
 app = FastAPI(
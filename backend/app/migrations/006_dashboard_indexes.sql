@@ -0,0 +1,61 @@
+-- Migration 006: Covering indexes for dashboard queries
+-- Run this in Supabase SQL Editor
+--
+-- Dashboard queries filter traffic_metrics by library_id (or counter_id / channel_id),
+-- exclude_robots and a date range, then sum or average the metric columns.
+-- uq_traffic_metric starts with (library_id, channel_id, counter_id, ...), so those range
+-- scans could not use it well. The indexes below follow the query order and INCLUDE the
+-- aggregated columns, which lets PostgreSQL answer them with index-only scans.
+--
+-- Benchmark before/after plans with: python -m benchmarks.dashboard_indexes
+
+-- =====================
+-- TRAFFIC METRICS
+-- =====================
+
+CREATE INDEX IF NOT EXISTS idx_traffic_metrics_library_robots_date
+  ON traffic_metrics (library_id, exclude_robots, date)
+  INCLUDE (channel_id, counter_id, views, visits, users, avg_time, depth, bounce_rate, return_rate);
+
+CREATE INDEX IF NOT EXISTS idx_traffic_metrics_counter_robots_date
+  ON traffic_metrics (counter_id, exclude_robots, date)
+  INCLUDE (library_id, views, visits, users, avg_time, depth, bounce_rate, return_rate);
+
+CREATE INDEX IF NOT EXISTS idx_traffic_metrics_channel_robots_date
+  ON traffic_metrics (channel_id, exclude_robots, date)
+  INCLUDE (library_id, views, visits, users);
+
+-- Superseded by the indexes above
+DROP INDEX IF EXISTS idx_traffic_metrics_library_date;
+DROP INDEX IF EXISTS idx_traffic_metrics_channel_date;
+
+-- =====================
+-- VK METRICS
+-- =====================
+
+CREATE INDEX IF NOT EXISTS idx_vk_metrics_library_date
+  ON vk_metrics (library_id, date)
+  INCLUDE (channel_id, visitors, views, posts, stories, clips, videos, total_subscribers);
+
+-- Superseded by idx_vk_metrics_library_date
+DROP INDEX IF EXISTS idx_vk_metrics_library;
+
+-- =====================
+-- ENGAGEMENT METRICS
+-- =====================
+
+CREATE INDEX IF NOT EXISTS idx_engagement_metrics_library_date_cov
+  ON engagement_metrics (library_id, date)
+  INCLUDE (channel_id, likes, reposts, comments);
+
+-- Superseded by idx_engagement_metrics_library_date_cov
+DROP INDEX IF EXISTS idx_engagement_metrics_library_date;
+
+-- Refresh planner statistics
+ANALYZE traffic_metrics;
+ANALYZE vk_metrics;
+ANALYZE engagement_metrics;
+
+-- Index-only scans also need an up-to-date visibility map. VACUUM cannot run inside
+-- a transaction block, so run it as a separate statement after this migration:
+-- VACUUM traffic_metrics; VACUUM vk_metrics; VACUUM engagement_metrics;
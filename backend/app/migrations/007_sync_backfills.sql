@@ -0,0 +1,33 @@
+-- Migration 007: Resumable Yandex.Metrika backfills
+-- Run this in Supabase SQL Editor
+--
+-- Long sync ranges are split into monthly chunks. Chunk progress is persisted so a
+-- backfill interrupted by a restart resumes from the first chunk that is not completed.
+
+CREATE TABLE IF NOT EXISTS sync_backfills (
+  id               UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+  library_id       UUID NOT NULL REFERENCES libraries(id) ON DELETE CASCADE,
+  date_from        DATE NOT NULL,
+  date_to          DATE NOT NULL,
+  status           TEXT NOT NULL DEFAULT 'pending',  -- pending | running | completed | error
+  total_chunks     INTEGER NOT NULL DEFAULT 0,
+  completed_chunks INTEGER NOT NULL DEFAULT 0,
+  error_message    TEXT,
+  finished_at      TIMESTAMP,
+  created_at       TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS sync_backfill_chunks (
+  id            UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+  backfill_id   UUID NOT NULL REFERENCES sync_backfills(id) ON DELETE CASCADE,
+  date_from     DATE NOT NULL,
+  date_to       DATE NOT NULL,
+  status        TEXT NOT NULL DEFAULT 'pending',  -- pending | completed | error
+  attempts      INTEGER NOT NULL DEFAULT 0,
+  error_message TEXT,
+  completed_at  TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_sync_backfills_library ON sync_backfills(library_id);
+CREATE INDEX IF NOT EXISTS idx_sync_backfills_status ON sync_backfills(status);
+CREATE INDEX IF NOT EXISTS idx_sync_backfill_chunks_backfill ON sync_backfill_chunks(backfill_id, date_from);
@@ -0,0 +1,16 @@
+-- Migration 008: Asynchronous VK upload jobs
+-- Run this in Supabase SQL Editor
+--
+-- The upload row is created before the file is parsed, so the period is unknown
+-- at first. Progress columns back GET /api/vk/uploads/{id}.
+
+ALTER TABLE vk_uploads ALTER COLUMN period_start DROP NOT NULL;
+ALTER TABLE vk_uploads ALTER COLUMN period_end DROP NOT NULL;
+
+ALTER TABLE vk_uploads ADD COLUMN IF NOT EXISTS bytes_total              BIGINT;
+ALTER TABLE vk_uploads ADD COLUMN IF NOT EXISTS bytes_processed          BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE vk_uploads ADD COLUMN IF NOT EXISTS rows_processed           INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE vk_uploads ADD COLUMN IF NOT EXISTS vk_metrics_count         INTEGER;
+ALTER TABLE vk_uploads ADD COLUMN IF NOT EXISTS engagement_metrics_count INTEGER;
+ALTER TABLE vk_uploads ADD COLUMN IF NOT EXISTS started_at               TIMESTAMPTZ;
+ALTER TABLE vk_uploads ADD COLUMN IF NOT EXISTS finished_at              TIMESTAMPTZ;
@@ -0,0 +1,58 @@
+-- Migration 009: Daily traffic rollups
+-- Run this in Supabase SQL Editor
+--
+-- Pre-aggregated traffic_metrics per library/day and per channel/day, read by the
+-- dashboard when no counter filter is applied. Refreshed by the sync, backfill and
+-- channel deletion (DELETE + INSERT ... SELECT for the affected dates).
+-- Behavior metrics are kept as sums plus row_count so averages stay exact.
+
+CREATE TABLE IF NOT EXISTS traffic_daily_rollups (
+  library_id      UUID NOT NULL REFERENCES libraries(id) ON DELETE CASCADE,
+  exclude_robots  BOOLEAN NOT NULL,
+  date            DATE NOT NULL,
+  views           INTEGER DEFAULT 0,
+  visits          INTEGER DEFAULT 0,
+  users           INTEGER DEFAULT 0,
+  row_count       INTEGER DEFAULT 0,
+  avg_time_sum    DOUBLE PRECISION DEFAULT 0,
+  depth_sum       DOUBLE PRECISION DEFAULT 0,
+  bounce_rate_sum DOUBLE PRECISION DEFAULT 0,
+  return_rate_sum DOUBLE PRECISION DEFAULT 0,
+  PRIMARY KEY (library_id, exclude_robots, date)
+);
+
+CREATE TABLE IF NOT EXISTS traffic_channel_daily_rollups (
+  library_id      UUID NOT NULL REFERENCES libraries(id) ON DELETE CASCADE,
+  channel_id      UUID NOT NULL REFERENCES channels(id) ON DELETE CASCADE,
+  exclude_robots  BOOLEAN NOT NULL,
+  date            DATE NOT NULL,
+  views           INTEGER DEFAULT 0,
+  visits          INTEGER DEFAULT 0,
+  users           INTEGER DEFAULT 0,
+  PRIMARY KEY (channel_id, exclude_robots, date)
+);
+
+CREATE INDEX IF NOT EXISTS idx_traffic_channel_rollups_library_date
+  ON traffic_channel_daily_rollups (library_id, date);
+
+-- Initial fill from existing data
+INSERT INTO traffic_daily_rollups (
+  library_id, exclude_robots, date, views, visits, users,
+  row_count, avg_time_sum, depth_sum, bounce_rate_sum, return_rate_sum
+)
+SELECT
+  library_id, exclude_robots, date,
+  COALESCE(SUM(views), 0), COALESCE(SUM(visits), 0), COALESCE(SUM(users), 0),
+  COUNT(*), COALESCE(SUM(avg_time), 0), COALESCE(SUM(depth), 0),
+  COALESCE(SUM(bounce_rate), 0), COALESCE(SUM(return_rate), 0)
+FROM traffic_metrics
+GROUP BY library_id, exclude_robots, date
+ON CONFLICT DO NOTHING;
+
+INSERT INTO traffic_channel_daily_rollups (library_id, channel_id, exclude_robots, date, views, visits, users)
+SELECT
+  library_id, channel_id, exclude_robots, date,
+  COALESCE(SUM(views), 0), COALESCE(SUM(visits), 0), COALESCE(SUM(users), 0)
+FROM traffic_metrics
+GROUP BY library_id, channel_id, exclude_robots, date
+ON CONFLICT DO NOTHING;
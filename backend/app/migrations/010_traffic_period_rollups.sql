@@ -0,0 +1,69 @@
+-- Migration 010: Weekly and monthly traffic rollups
+-- Run this in Supabase SQL Editor
+--
+-- One row per channel (views/visits/users) and per counter (behavior sums + row_count)
+-- for every week (starting Monday) and month. Long-range dashboard trends
+-- (granularity=week/month) read whole buckets from here; rebuilt together with
+-- the daily rollups of migration 009.
+
+CREATE TABLE IF NOT EXISTS traffic_channel_period_rollups (
+  library_id      UUID NOT NULL REFERENCES libraries(id) ON DELETE CASCADE,
+  channel_id      UUID NOT NULL REFERENCES channels(id) ON DELETE CASCADE,
+  exclude_robots  BOOLEAN NOT NULL,
+  granularity     TEXT NOT NULL,
+  period_start    DATE NOT NULL,
+  views           INTEGER DEFAULT 0,
+  visits          INTEGER DEFAULT 0,
+  users           INTEGER DEFAULT 0,
+  PRIMARY KEY (channel_id, exclude_robots, granularity, period_start),
+  CONSTRAINT ck_traffic_channel_period_granularity CHECK (granularity IN ('week', 'month'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_traffic_channel_period_rollups_library
+  ON traffic_channel_period_rollups (library_id, granularity, period_start);
+
+CREATE TABLE IF NOT EXISTS traffic_counter_period_rollups (
+  library_id      UUID NOT NULL REFERENCES libraries(id) ON DELETE CASCADE,
+  counter_id      UUID NOT NULL REFERENCES metric_counters(id) ON DELETE CASCADE,
+  exclude_robots  BOOLEAN NOT NULL,
+  granularity     TEXT NOT NULL,
+  period_start    DATE NOT NULL,
+  row_count       INTEGER DEFAULT 0,
+  avg_time_sum    DOUBLE PRECISION DEFAULT 0,
+  depth_sum       DOUBLE PRECISION DEFAULT 0,
+  bounce_rate_sum DOUBLE PRECISION DEFAULT 0,
+  return_rate_sum DOUBLE PRECISION DEFAULT 0,
+  PRIMARY KEY (counter_id, exclude_robots, granularity, period_start),
+  CONSTRAINT ck_traffic_counter_period_granularity CHECK (granularity IN ('week', 'month'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_traffic_counter_period_rollups_library
+  ON traffic_counter_period_rollups (library_id, granularity, period_start);
+
+-- Initial fill from existing data
+INSERT INTO traffic_channel_period_rollups (
+  library_id, channel_id, exclude_robots, granularity, period_start, views, visits, users
+)
+SELECT
+  r.library_id, r.channel_id, r.exclude_robots, g.granularity,
+  date_trunc(g.granularity, r.date::timestamp)::date,
+  SUM(r.views), SUM(r.visits), SUM(r.users)
+FROM traffic_channel_daily_rollups r
+CROSS JOIN (VALUES ('week'), ('month')) AS g(granularity)
+GROUP BY r.library_id, r.channel_id, r.exclude_robots, g.granularity, date_trunc(g.granularity, r.date::timestamp)
+ON CONFLICT DO NOTHING;
+
+INSERT INTO traffic_counter_period_rollups (
+  library_id, counter_id, exclude_robots, granularity, period_start,
+  row_count, avg_time_sum, depth_sum, bounce_rate_sum, return_rate_sum
+)
+SELECT
+  m.library_id, m.counter_id, m.exclude_robots, g.granularity,
+  date_trunc(g.granularity, m.date::timestamp)::date,
+  COUNT(*), COALESCE(SUM(m.avg_time), 0), COALESCE(SUM(m.depth), 0),
+  COALESCE(SUM(m.bounce_rate), 0), COALESCE(SUM(m.return_rate), 0)
+FROM traffic_metrics m
+CROSS JOIN (VALUES ('week'), ('month')) AS g(granularity)
+WHERE m.counter_id IS NOT NULL
+GROUP BY m.library_id, m.counter_id, m.exclude_robots, g.granularity, date_trunc(g.granularity, m.date::timestamp)
+ON CONFLICT DO NOTHING;
@@ -0,0 +1,12 @@
+-- Migration 011: Incremental sync watermark per counter
+-- Run this in Supabase SQL Editor
+--
+-- synced_through is the last day fetched contiguously by the sync; incremental
+-- syncs start from it (minus the restatement lookback) instead of last_sync_at,
+-- which a manual sync of a past range also moves.
+
+ALTER TABLE metric_counters ADD COLUMN IF NOT EXISTS synced_through DATE;
+
+UPDATE metric_counters
+SET synced_through = last_sync_at::date
+WHERE synced_through IS NULL AND last_sync_at IS NOT NULL;
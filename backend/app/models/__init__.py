@@ -2,20 +2,33 @@ from app.models.library import Library
 from app.models.metric_counter import MetricCounter
 from app.models.channel import Channel
 from app.models.traffic_metric import TrafficMetric
+from app.models.traffic_rollup import (
+    TrafficChannelDailyRollup,
+    TrafficChannelPeriodRollup,
+    TrafficCounterPeriodRollup,
+    TrafficDailyRollup,
+)
 from app.models.engagement_metric import EngagementMetric
 from app.models.review import Review
 from app.models.yandex_token import YandexToken
 from app.models.vk_upload import VkUpload
 from app.models.vk_metric import VkMetric
+from app.models.sync_backfill import SyncBackfill, SyncBackfillChunk
 
 __all__ = [
     "Library",
     "MetricCounter",
     "Channel",
     "TrafficMetric",
+    "TrafficDailyRollup",
+    "TrafficChannelDailyRollup",
+    "TrafficChannelPeriodRollup",
+    "TrafficCounterPeriodRollup",
     "EngagementMetric",
     "Review",
     "YandexToken",
     "VkUpload",
     "VkMetric",
+    "SyncBackfill",
+    "SyncBackfillChunk",
 ]
@@ -1,7 +1,7 @@
 import uuid
 from datetime import date
 
-from sqlalchemy import Date, ForeignKey, Integer, Text, UniqueConstraint
+from sqlalchemy import Date, ForeignKey, Index, Integer, Text, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -12,6 +12,11 @@ class EngagementMetric(Base, IdMixin, TimestampMixin):
     __tablename__ = "engagement_metrics"
     __table_args__ = (
         UniqueConstraint("library_id", "channel_id", "date", name="uq_engagement_metric"),
+        Index(
+            "idx_engagement_metrics_library_date_cov",
+            "library_id", "date",
+            postgresql_include=["channel_id", "likes", "reposts", "comments"],
+        ),
     )
 
     library_id: Mapped[uuid.UUID] = mapped_column(
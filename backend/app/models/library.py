@@ -17,3 +17,4 @@ class Library(Base, IdMixin, TimestampMixin):
     reviews = relationship("Review", back_populates="library", cascade="all, delete-orphan")
     vk_uploads = relationship("VkUpload", back_populates="library", cascade="all, delete-orphan")
     vk_metrics = relationship("VkMetric", back_populates="library", cascade="all, delete-orphan")
+    sync_backfills = relationship("SyncBackfill", back_populates="library", cascade="all, delete-orphan")
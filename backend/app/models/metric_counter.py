@@ -1,8 +1,8 @@
 import uuid
-from datetime import datetime
+from datetime import date, datetime
 from enum import Enum
 
-from sqlalchemy import Boolean, ForeignKey, String, Text
+from sqlalchemy import Boolean, Date, ForeignKey, String, Text
 from sqlalchemy.dialects.postgresql import ENUM, UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -30,6 +30,7 @@ class MetricCounter(Base, IdMixin, TimestampMixin):
     yandex_counter_id: Mapped[str] = mapped_column(String, nullable=False)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     last_sync_at: Mapped[datetime | None] = mapped_column()
+    synced_through: Mapped[date | None] = mapped_column(Date)  # incremental sync watermark (last contiguous day fetched)
     sync_status: Mapped[str] = mapped_column(sync_status_enum, server_default="idle")
     sync_error_message: Mapped[str | None] = mapped_column(Text)
 
@@ -0,0 +1,53 @@
+import uuid
+from datetime import date, datetime
+
+from sqlalchemy import Date, ForeignKey, Integer, String, Text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.models.base import Base, IdMixin, TimestampMixin
+
+
+class SyncBackfill(Base, IdMixin, TimestampMixin):
+    """Historical Yandex.Metrika backfill split into monthly chunks"""
+
+    __tablename__ = "sync_backfills"
+
+    library_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("libraries.id", ondelete="CASCADE"), nullable=False
+    )
+    date_from: Mapped[date] = mapped_column(Date, nullable=False)
+    date_to: Mapped[date] = mapped_column(Date, nullable=False)
+    status: Mapped[str] = mapped_column(String, server_default="pending")
+    total_chunks: Mapped[int] = mapped_column(Integer, server_default="0")
+    completed_chunks: Mapped[int] = mapped_column(Integer, server_default="0")
+    error_message: Mapped[str | None] = mapped_column(Text)
+    finished_at: Mapped[datetime | None] = mapped_column()
+
+    # Relationships
+    library = relationship("Library", back_populates="sync_backfills")
+    chunks = relationship(
+        "SyncBackfillChunk",
+        back_populates="backfill",
+        cascade="all, delete-orphan",
+        order_by="SyncBackfillChunk.date_from",
+    )
+
+
+class SyncBackfillChunk(Base, IdMixin):
+    """One month of a backfill; status is persisted so a restart resumes where it stopped"""
+
+    __tablename__ = "sync_backfill_chunks"
+
+    backfill_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("sync_backfills.id", ondelete="CASCADE"), nullable=False
+    )
+    date_from: Mapped[date] = mapped_column(Date, nullable=False)
+    date_to: Mapped[date] = mapped_column(Date, nullable=False)
+    status: Mapped[str] = mapped_column(String, server_default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, server_default="0")
+    error_message: Mapped[str | None] = mapped_column(Text)
+    completed_at: Mapped[datetime | None] = mapped_column()
+
+    # Relationships
+    backfill = relationship("SyncBackfill", back_populates="chunks")
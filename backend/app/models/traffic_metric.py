@@ -1,7 +1,7 @@
 import uuid
 from datetime import date
 
-from sqlalchemy import Boolean, Date, Float, ForeignKey, Integer, UniqueConstraint
+from sqlalchemy import Boolean, Date, Float, ForeignKey, Index, Integer, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -12,6 +12,28 @@ class TrafficMetric(Base, IdMixin, TimestampMixin):
     __tablename__ = "traffic_metrics"
     __table_args__ = (
         UniqueConstraint("library_id", "channel_id", "counter_id", "date", "exclude_robots", name="uq_traffic_metric"),
+        # Covering indexes in dashboard query order (see migration 006)
+        Index(
+            "idx_traffic_metrics_library_robots_date",
+            "library_id", "exclude_robots", "date",
+            postgresql_include=[
+                "channel_id", "counter_id", "views", "visits", "users",
+                "avg_time", "depth", "bounce_rate", "return_rate",
+            ],
+        ),
+        Index(
+            "idx_traffic_metrics_counter_robots_date",
+            "counter_id", "exclude_robots", "date",
+            postgresql_include=[
+                "library_id", "views", "visits", "users",
+                "avg_time", "depth", "bounce_rate", "return_rate",
+            ],
+        ),
+        Index(
+            "idx_traffic_metrics_channel_robots_date",
+            "channel_id", "exclude_robots", "date",
+            postgresql_include=["library_id", "views", "visits", "users"],
+        ),
     )
 
     library_id: Mapped[uuid.UUID] = mapped_column(
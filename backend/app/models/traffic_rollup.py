@@ -0,0 +1,119 @@
+import uuid
+from datetime import date
+
+from sqlalchemy import Boolean, CheckConstraint, Date, Float, ForeignKey, Index, Integer, PrimaryKeyConstraint, String
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.models.base import Base
+
+
+class TrafficDailyRollup(Base):
+    """
+    Library-wide daily totals of traffic_metrics (all channels and counters)
+
+    Maintained by rollup_service. Behavior metrics are stored as sums with the
+    row count, so averages over any range equal AVG() over the raw rows.
+    """
+
+    __tablename__ = "traffic_daily_rollups"
+    __table_args__ = (
+        PrimaryKeyConstraint("library_id", "exclude_robots", "date"),
+    )
+
+    library_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("libraries.id", ondelete="CASCADE"), nullable=False
+    )
+    exclude_robots: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    date: Mapped[date] = mapped_column(Date, nullable=False)
+
+    views: Mapped[int] = mapped_column(Integer, server_default="0")
+    visits: Mapped[int] = mapped_column(Integer, server_default="0")
+    users: Mapped[int] = mapped_column(Integer, server_default="0")
+
+    # Raw rows summed, and sums of their per-row averages
+    row_count: Mapped[int] = mapped_column(Integer, server_default="0")
+    avg_time_sum: Mapped[float] = mapped_column(Float, server_default="0")
+    depth_sum: Mapped[float] = mapped_column(Float, server_default="0")
+    bounce_rate_sum: Mapped[float] = mapped_column(Float, server_default="0")
+    return_rate_sum: Mapped[float] = mapped_column(Float, server_default="0")
+
+
+class TrafficChannelDailyRollup(Base):
+    """Per-channel daily totals of traffic_metrics (all counters of the channel)"""
+
+    __tablename__ = "traffic_channel_daily_rollups"
+    __table_args__ = (
+        PrimaryKeyConstraint("channel_id", "exclude_robots", "date"),
+        Index("idx_traffic_channel_rollups_library_date", "library_id", "date"),
+    )
+
+    library_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("libraries.id", ondelete="CASCADE"), nullable=False
+    )
+    channel_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("channels.id", ondelete="CASCADE"), nullable=False
+    )
+    exclude_robots: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    date: Mapped[date] = mapped_column(Date, nullable=False)
+
+    views: Mapped[int] = mapped_column(Integer, server_default="0")
+    visits: Mapped[int] = mapped_column(Integer, server_default="0")
+    users: Mapped[int] = mapped_column(Integer, server_default="0")
+
+
+class TrafficChannelPeriodRollup(Base):
+    """Per-channel weekly/monthly totals, summed from traffic_channel_daily_rollups"""
+
+    __tablename__ = "traffic_channel_period_rollups"
+    __table_args__ = (
+        PrimaryKeyConstraint("channel_id", "exclude_robots", "granularity", "period_start"),
+        CheckConstraint("granularity IN ('week', 'month')", name="ck_traffic_channel_period_granularity"),
+        Index("idx_traffic_channel_period_rollups_library", "library_id", "granularity", "period_start"),
+    )
+
+    library_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("libraries.id", ondelete="CASCADE"), nullable=False
+    )
+    channel_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("channels.id", ondelete="CASCADE"), nullable=False
+    )
+    exclude_robots: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    granularity: Mapped[str] = mapped_column(String, nullable=False)  # "week" | "month"
+    period_start: Mapped[date] = mapped_column(Date, nullable=False)  # Monday / 1st of month
+
+    views: Mapped[int] = mapped_column(Integer, server_default="0")
+    visits: Mapped[int] = mapped_column(Integer, server_default="0")
+    users: Mapped[int] = mapped_column(Integer, server_default="0")
+
+
+class TrafficCounterPeriodRollup(Base):
+    """
+    Per-counter weekly/monthly behavior sums for the behavior timelines
+
+    Same sums + row_count layout as TrafficDailyRollup, so a bucket's averages
+    equal AVG() over its raw rows. Rows without a counter are not rolled up.
+    """
+
+    __tablename__ = "traffic_counter_period_rollups"
+    __table_args__ = (
+        PrimaryKeyConstraint("counter_id", "exclude_robots", "granularity", "period_start"),
+        CheckConstraint("granularity IN ('week', 'month')", name="ck_traffic_counter_period_granularity"),
+        Index("idx_traffic_counter_period_rollups_library", "library_id", "granularity", "period_start"),
+    )
+
+    library_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("libraries.id", ondelete="CASCADE"), nullable=False
+    )
+    counter_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("metric_counters.id", ondelete="CASCADE"), nullable=False
+    )
+    exclude_robots: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    granularity: Mapped[str] = mapped_column(String, nullable=False)  # "week" | "month"
+    period_start: Mapped[date] = mapped_column(Date, nullable=False)  # Monday / 1st of month
+
+    row_count: Mapped[int] = mapped_column(Integer, server_default="0")
+    avg_time_sum: Mapped[float] = mapped_column(Float, server_default="0")
+    depth_sum: Mapped[float] = mapped_column(Float, server_default="0")
+    bounce_rate_sum: Mapped[float] = mapped_column(Float, server_default="0")
+    return_rate_sum: Mapped[float] = mapped_column(Float, server_default="0")
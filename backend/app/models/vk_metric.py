@@ -1,7 +1,7 @@
 import uuid
 from datetime import date
 
-from sqlalchemy import Date, ForeignKey, Integer, UniqueConstraint
+from sqlalchemy import Date, ForeignKey, Index, Integer, UniqueConstraint
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -12,7 +12,17 @@ class VkMetric(Base, IdMixin, TimestampMixin):
     """VK-specific metrics (reach, views, posts, subscribers)"""
 
     __tablename__ = "vk_metrics"
-    __table_args__ = (UniqueConstraint("library_id", "channel_id", "date"),)
+    __table_args__ = (
+        UniqueConstraint("library_id", "channel_id", "date"),
+        Index(
+            "idx_vk_metrics_library_date",
+            "library_id", "date",
+            postgresql_include=[
+                "channel_id", "visitors", "views", "posts", "stories",
+                "clips", "videos", "total_subscribers",
+            ],
+        ),
+    )
 
     library_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), ForeignKey("libraries.id", ondelete="CASCADE"), nullable=False
@@ -1,7 +1,7 @@
 import uuid
 from datetime import date, datetime
 
-from sqlalchemy import Date, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import BigInteger, Date, DateTime, ForeignKey, Integer, String, Text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -21,11 +21,20 @@ class VkUpload(Base, IdMixin, TimestampMixin):
     )
     filename: Mapped[str] = mapped_column(String, nullable=False)
     uploaded_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
-    period_start: Mapped[date] = mapped_column(Date, nullable=False)
-    period_end: Mapped[date] = mapped_column(Date, nullable=False)
+    # Known once the file has been parsed
+    period_start: Mapped[date | None] = mapped_column(Date)
+    period_end: Mapped[date | None] = mapped_column(Date)
     total_rows: Mapped[int | None] = mapped_column(Integer)
     status: Mapped[str] = mapped_column(String, server_default="processing")
     error_message: Mapped[str | None] = mapped_column(Text)
+    # Background job progress
+    bytes_total: Mapped[int | None] = mapped_column(BigInteger)
+    bytes_processed: Mapped[int] = mapped_column(BigInteger, server_default="0")
+    rows_processed: Mapped[int] = mapped_column(Integer, server_default="0")
+    vk_metrics_count: Mapped[int | None] = mapped_column(Integer)
+    engagement_metrics_count: Mapped[int | None] = mapped_column(Integer)
+    started_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
 
     # Relationships
     library = relationship("Library", back_populates="vk_uploads")
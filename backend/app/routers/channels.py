@@ -8,6 +8,8 @@ from app.database import get_db
 from app.dependencies import get_current_admin
 from app.models.channel import Channel
 from app.schemas.channel import ChannelCreate, ChannelOut, ChannelUpdate
+from app.services.response_cache import invalidate_library
+from app.services.rollup_service import refresh_traffic_rollups
 
 router = APIRouter(prefix="/api/channels", tags=["channels"])
 
@@ -33,6 +35,7 @@ async def create_channel(
     db.add(channel)
     await db.commit()
     await db.refresh(channel)
+    await invalidate_library(channel.library_id)
     return channel
 
 
@@ -50,6 +53,7 @@ async def update_channel(
         setattr(channel, key, val)
     await db.commit()
     await db.refresh(channel)
+    await invalidate_library(channel.library_id)
     return channel
 
 
@@ -64,4 +68,8 @@ async def delete_channel(
     if not channel:
         raise HTTPException(status_code=404, detail="Channel not found")
     await db.delete(channel)
+    await db.flush()
+    # Its traffic rows are gone with it: rebuild the library-wide rollups
+    await refresh_traffic_rollups(db, channel.library_id)
     await db.commit()
+    await invalidate_library(channel.library_id)
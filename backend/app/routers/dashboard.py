@@ -1,42 +1,81 @@
+import asyncio
 import uuid
-from datetime import date, timedelta
-from typing import Optional
+from datetime import date
+from typing import Any, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
-from app.models.engagement_metric import EngagementMetric
-from app.models.vk_metric import VkMetric
-from app.models.vk_upload import VkUpload
+from app.config import settings
+from app.database import get_db, run_in_session
 from app.schemas.dashboard import (
     BehaviorData,
+    BundleSection,
     ChannelMetric,
     ChannelTrendPoint,
+    DashboardBundle,
     EngagementData,
+    Granularity,
     KpiOverview,
     Period,
     ReviewsResponse,
 )
 from app.schemas.insights import Insight
-from app.schemas.vk import (
-    VkContentPoint,
-    VkEngagementPoint,
-    VkKpi,
-    VkPeriodInfo,
-    VkReachPoint,
-    VkStatsResponse,
-    VkTopPost,
-)
-from app.services import dashboard_service
-from app.services.insights_engine import generate_insights, generate_vk_insights
+from app.schemas.vk import VkStatsResponse
+from app.services import dashboard_service, vk_stats_service
+from app.services.insights_engine import generate_insights
 from app.services.period import resolve_period_or_custom
+from app.services.response_cache import cached_response
 
 router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
 
+# Sections generate_insights is computed from
+INSIGHT_SOURCES = (BundleSection.overview, BundleSection.behavior, BundleSection.engagement)
+
+
+async def _run_loaders(db: AsyncSession, loaders: dict[Any, tuple]) -> dict[Any, Any]:
+    """
+    Run {name: (loader, *args)} and return {name: result}
+
+    Concurrently on one pooled session per loader (latency of the slowest
+    loaders instead of the sum), at most settings.dashboard_max_concurrent_loaders
+    sessions at a time, unless settings.dashboard_concurrent_loaders is off,
+    then one after another on the request's session.
+    """
+    if settings.dashboard_concurrent_loaders:
+        semaphore = asyncio.Semaphore(settings.dashboard_max_concurrent_loaders)
+
+        async def _limited(loader, *args):
+            async with semaphore:
+                return await run_in_session(loader, *args)
+
+        results = await asyncio.gather(*(_limited(loader, *args) for loader, *args in loaders.values()))
+    else:
+        results = [await loader(db, *args) for loader, *args in loaders.values()]
+    return dict(zip(loaders, results))
+
+
+def _parse_sections(sections: str | None) -> set[BundleSection]:
+    if not sections:
+        return set(BundleSection)
+    names = {name.strip() for name in sections.split(",") if name.strip()}
+    unknown = names - {section.value for section in BundleSection}
+    if unknown:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown sections: {', '.join(sorted(unknown))}. "
+            f"Expected any of: {', '.join(section.value for section in BundleSection)}",
+        )
+    return {BundleSection(name) for name in names}
+
+
+def _sections_key(sections: str | None) -> str:
+    """Cache key form of `sections`: same set, same key, whatever the order or spelling"""
+    return ",".join(sorted(section.value for section in _parse_sections(sections)))
+
 
 @router.get("/overview", response_model=KpiOverview)
+@cached_response("overview")
 async def overview(
     library_id: uuid.UUID,
     period: Period = Period.month,
@@ -50,6 +89,7 @@ async def overview(
 
 
 @router.get("/channels", response_model=list[ChannelMetric])
+@cached_response("channels")
 async def channels(
     library_id: uuid.UUID,
     period: Period = Period.month,
@@ -63,6 +103,7 @@ async def channels(
 
 
 @router.get("/channels/trend", response_model=list[ChannelTrendPoint])
+@cached_response("channels_trend")
 async def channel_trend(
     library_id: uuid.UUID,
     channel_id: uuid.UUID,
@@ -70,12 +111,16 @@ async def channel_trend(
     date_from: Optional[date] = Query(None),
     date_to: Optional[date] = Query(None),
     exclude_robots: bool = Query(True),
+    granularity: Granularity = Granularity.auto,
     db: AsyncSession = Depends(get_db),
 ):
-    return await dashboard_service.get_channel_trend(db, library_id, channel_id, period, date_from, date_to, exclude_robots)
+    return await dashboard_service.get_channel_trend(
+        db, library_id, channel_id, period, date_from, date_to, exclude_robots, granularity
+    )
 
 
 @router.get("/behavior", response_model=BehaviorData)
+@cached_response("behavior")
 async def behavior(
     library_id: uuid.UUID,
     period: Period = Period.month,
@@ -83,23 +128,29 @@ async def behavior(
     date_from: Optional[date] = Query(None),
     date_to: Optional[date] = Query(None),
     exclude_robots: bool = Query(True),
+    granularity: Granularity = Granularity.auto,
     db: AsyncSession = Depends(get_db),
 ):
-    return await dashboard_service.get_behavior(db, library_id, period, counter_id, date_from, date_to, exclude_robots)
+    return await dashboard_service.get_behavior(
+        db, library_id, period, counter_id, date_from, date_to, exclude_robots, granularity
+    )
 
 
 @router.get("/engagement", response_model=EngagementData)
+@cached_response("engagement")
 async def engagement(
     library_id: uuid.UUID,
     period: Period = Period.month,
     date_from: Optional[date] = Query(None),
     date_to: Optional[date] = Query(None),
+    granularity: Granularity = Granularity.auto,
     db: AsyncSession = Depends(get_db),
 ):
-    return await dashboard_service.get_engagement(db, library_id, period, date_from, date_to)
+    return await dashboard_service.get_engagement(db, library_id, period, date_from, date_to, granularity)
 
 
 @router.get("/reviews", response_model=ReviewsResponse)
+@cached_response("reviews")
 async def reviews(
     library_id: uuid.UUID,
     limit: int = Query(10, ge=1, le=100),
@@ -110,6 +161,7 @@ async def reviews(
 
 
 @router.get("/insights", response_model=list[Insight])
+@cached_response("insights")
 async def insights(
     library_id: uuid.UUID,
     period: Period = Period.month,
@@ -119,13 +171,16 @@ async def insights(
     exclude_robots: bool = Query(True),
     db: AsyncSession = Depends(get_db),
 ):
-    overview_data = await dashboard_service.get_overview(db, library_id, period, counter_id, date_from, date_to, exclude_robots)
-    behavior_data = await dashboard_service.get_behavior(db, library_id, period, counter_id, date_from, date_to, exclude_robots)
-    engagement_data = await dashboard_service.get_engagement(db, library_id, period, date_from, date_to)
-    return generate_insights(overview_data, behavior_data, engagement_data)
+    data = await _run_loaders(db, {
+        BundleSection.overview: (dashboard_service.get_overview, library_id, period, counter_id, date_from, date_to, exclude_robots),
+        BundleSection.behavior: (dashboard_service.get_behavior, library_id, period, counter_id, date_from, date_to, exclude_robots),
+        BundleSection.engagement: (dashboard_service.get_engagement, library_id, period, date_from, date_to),
+    })
+    return generate_insights(*(data[section] for section in INSIGHT_SOURCES))
 
 
 @router.get("/vk", response_model=VkStatsResponse)
+@cached_response("vk")
 async def vk_stats(
     library_id: uuid.UUID,
     period: Period = Period.month,
@@ -134,171 +189,58 @@ async def vk_stats(
     db: AsyncSession = Depends(get_db),
 ):
     """Get VK statistics for public dashboard"""
-    # Determine date range
-    today = date.today()
     resolved_from, resolved_to, _, _ = resolve_period_or_custom(period, date_from, date_to)
 
-    # Get latest upload info
-    upload_query = select(VkUpload).where(
-        VkUpload.library_id == library_id,
-        VkUpload.status == "completed"
-    ).order_by(VkUpload.uploaded_at.desc()).limit(1)
-    upload_result = await db.execute(upload_query)
-    latest_upload = upload_result.scalar_one_or_none()
-
-    # Fetch VK metrics
-    vk_query = select(VkMetric).where(
-        VkMetric.library_id == library_id,
-        VkMetric.date >= resolved_from,
-        VkMetric.date <= resolved_to,
-    ).order_by(VkMetric.date.asc())
-    vk_result = await db.execute(vk_query)
-    vk_metrics = vk_result.scalars().all()
-
-    # Fetch engagement metrics
-    eng_query = select(EngagementMetric).where(
-        EngagementMetric.library_id == library_id,
-        EngagementMetric.date >= resolved_from,
-        EngagementMetric.date <= resolved_to,
-    ).order_by(EngagementMetric.date.asc())
-    eng_result = await db.execute(eng_query)
-    eng_metrics = eng_result.scalars().all()
-
-    if not vk_metrics:
+    stats = await vk_stats_service.get_vk_stats(db, library_id, resolved_from, resolved_to)
+    if not stats.reach_trend:
         raise HTTPException(status_code=404, detail="No VK data found")
+    return stats
 
-    # Calculate KPIs for current period
-    total_reach = sum(m.visitors for m in vk_metrics)
-    total_views = sum(m.views for m in vk_metrics)
-    latest_subscribers = vk_metrics[-1].total_subscribers if vk_metrics else 0
-    total_likes = sum(m.likes for m in eng_metrics)
-    total_reposts = sum(m.reposts for m in eng_metrics)
-    total_comments = sum(m.comments for m in eng_metrics)
-    total_engagement = total_likes + total_reposts + total_comments
-    er_pct = (total_engagement / total_reach * 100) if total_reach > 0 else 0
-
-    # Calculate previous period for comparison
-    period_days = (resolved_to - resolved_from).days + 1
-    prev_date_to = resolved_from - timedelta(days=1)
-    prev_date_from = prev_date_to - timedelta(days=period_days - 1)
-
-    # Fetch previous period metrics
-    prev_vk_query = select(VkMetric).where(
-        VkMetric.library_id == library_id,
-        VkMetric.date >= prev_date_from,
-        VkMetric.date <= prev_date_to,
-    )
-    prev_vk_result = await db.execute(prev_vk_query)
-    prev_vk_metrics = prev_vk_result.scalars().all()
-
-    # Calculate deltas
-    reach_delta_pct = None
-    views_delta_pct = None
-    subscribers_delta_pct = None
-
-    if prev_vk_metrics:
-        prev_reach = sum(m.visitors for m in prev_vk_metrics)
-        prev_views = sum(m.views for m in prev_vk_metrics)
-        prev_subscribers = prev_vk_metrics[-1].total_subscribers if prev_vk_metrics else 0
-
-        if prev_reach > 0:
-            reach_delta_pct = round(((total_reach - prev_reach) / prev_reach) * 100, 1)
-        if prev_views > 0:
-            views_delta_pct = round(((total_views - prev_views) / prev_views) * 100, 1)
-        if prev_subscribers > 0:
-            subscribers_delta_pct = round(((latest_subscribers - prev_subscribers) / prev_subscribers) * 100, 1)
-
-    kpis = VkKpi(
-        reach=total_reach,
-        views=total_views,
-        subscribers=latest_subscribers,
-        er_pct=round(er_pct, 2),
-        reposts=total_reposts,
-        comments=total_comments,
-        reach_delta_pct=reach_delta_pct,
-        views_delta_pct=views_delta_pct,
-        subscribers_delta_pct=subscribers_delta_pct,
-        er_delta_pct=None,
-    )
-
-    # Build reach trend
-    reach_trend = [
-        VkReachPoint(date=str(m.date), reach=m.visitors, views=m.views) for m in vk_metrics
-    ]
-
-    # Build engagement trend
-    engagement_trend = []
-    for m in eng_metrics:
-        vk_m = next((v for v in vk_metrics if v.date == m.date), None)
-        reach = vk_m.visitors if vk_m else 0
-        total_eng = m.likes + m.reposts + m.comments
-        er = (total_eng / reach * 100) if reach > 0 else 0
-        engagement_trend.append(
-            VkEngagementPoint(
-                date=str(m.date),
-                likes=m.likes,
-                reposts=m.reposts,
-                comments=m.comments,
-                er=round(er, 2),
-            )
-        )
-
-    # Build content trend
-    content_trend = [
-        VkContentPoint(
-            date=str(m.date),
-            posts=m.posts,
-            stories=m.stories,
-            clips=m.clips,
-            videos=m.videos,
-        )
-        for m in vk_metrics
-    ]
-
-    # Build top posts (simplified)
-    top_posts = []
-    for m in eng_metrics[:10]:
-        vk_m = next((v for v in vk_metrics if v.date == m.date), None)
-        reach = vk_m.visitors if vk_m else 0
-        total_eng = m.likes + m.reposts + m.comments
-        er = (total_eng / reach * 100) if reach > 0 else 0
-        content_type = "Пост"
-        if vk_m:
-            if vk_m.stories > 0:
-                content_type = "История"
-            elif vk_m.clips > 0:
-                content_type = "Клип"
-            elif vk_m.videos > 0:
-                content_type = "Видео"
-        top_posts.append(
-            VkTopPost(
-                date=str(m.date),
-                type=content_type,
-                reach=reach,
-                er=round(er, 2),
-                likes=m.likes,
-                comments=m.comments,
-            )
-        )
-    top_posts.sort(key=lambda x: x.er, reverse=True)
-    top_posts = top_posts[:10]
-
-    # Period info
-    period_info = VkPeriodInfo(
-        start=str(resolved_from),
-        end=str(resolved_to),
-        upload_date=str(latest_upload.uploaded_at.date()) if latest_upload else None,
-    )
 
-    # Generate insights
-    insights = generate_vk_insights(kpis)
-
-    return VkStatsResponse(
-        kpis=kpis,
-        reach_trend=reach_trend,
-        engagement_trend=engagement_trend,
-        content_trend=content_trend,
-        top_posts=top_posts,
-        period_info=period_info,
-        insights=insights,
-    )
+@router.get("/bundle", response_model=DashboardBundle)
+@cached_response("bundle", normalize={"sections": _sections_key})
+async def bundle(
+    library_id: uuid.UUID,
+    sections: Optional[str] = Query(
+        None, description="Comma-separated sections to include (overview,channels,behavior,"
+        "engagement,reviews,insights,vk); all when omitted",
+    ),
+    period: Period = Period.month,
+    counter_id: uuid.UUID | None = None,
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+    exclude_robots: bool = Query(True),
+    granularity: Granularity = Granularity.auto,
+    reviews_limit: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Several dashboard blocks in one response, each computed once
+
+    Sections load concurrently; insights reuse the overview, behavior and
+    engagement results instead of recomputing them.
+    """
+    requested = _parse_sections(sections)
+    needed = requested | (set(INSIGHT_SOURCES) if BundleSection.insights in requested else set())
+    vk_from, vk_to, _, _ = resolve_period_or_custom(period, date_from, date_to)
+
+    loaders = {
+        BundleSection.overview: (dashboard_service.get_overview, library_id, period, counter_id, date_from, date_to, exclude_robots),
+        BundleSection.channels: (dashboard_service.get_channels, library_id, period, date_from, date_to, counter_id, exclude_robots),
+        BundleSection.behavior: (
+            dashboard_service.get_behavior,
+            library_id, period, counter_id, date_from, date_to, exclude_robots, granularity,
+        ),
+        BundleSection.engagement: (dashboard_service.get_engagement, library_id, period, date_from, date_to, granularity),
+        BundleSection.reviews: (dashboard_service.get_reviews, library_id, reviews_limit, 0),
+        BundleSection.vk: (vk_stats_service.get_vk_stats, library_id, vk_from, vk_to),
+    }
+    data = await _run_loaders(db, {section: loaders[section] for section in loaders if section in needed})
+
+    if BundleSection.insights in requested:
+        data[BundleSection.insights] = generate_insights(*(data[section] for section in INSIGHT_SOURCES))
+    # Same rule as /vk, which answers 404 here
+    if BundleSection.vk in data and not data[BundleSection.vk].reach_trend:
+        data[BundleSection.vk] = None
+
+    return DashboardBundle(**{section.value: data[section] for section in requested})
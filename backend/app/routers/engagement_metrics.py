@@ -12,6 +12,7 @@ from app.schemas.engagement_metric import (
     EngagementMetricOut,
     EngagementMetricUpdate,
 )
+from app.services.response_cache import invalidate_library
 
 router = APIRouter(prefix="/api/engagement-metrics", tags=["engagement-metrics"])
 
@@ -40,6 +41,7 @@ async def create_engagement(
     db.add(metric)
     await db.commit()
     await db.refresh(metric)
+    await invalidate_library(metric.library_id)
     return metric
 
 
@@ -57,6 +59,7 @@ async def update_engagement(
         setattr(metric, key, val)
     await db.commit()
     await db.refresh(metric)
+    await invalidate_library(metric.library_id)
     return metric
 
 
@@ -71,3 +74,4 @@ async def delete_engagement(
         raise HTTPException(status_code=404, detail="Engagement metric not found")
     await db.delete(metric)
     await db.commit()
+    await invalidate_library(metric.library_id)
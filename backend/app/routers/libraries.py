@@ -10,6 +10,7 @@ from app.models.library import Library
 from app.models.metric_counter import MetricCounter
 from app.schemas.library import LibraryCreate, LibraryOut, LibraryUpdate
 from app.schemas.metric_counter import MetricCounterOut
+from app.services.response_cache import invalidate_library
 
 router = APIRouter(prefix="/api/libraries", tags=["libraries"])
 
@@ -55,6 +56,7 @@ async def update_library(
         setattr(lib, key, val)
     await db.commit()
     await db.refresh(lib)
+    await invalidate_library(lib.id)
     return lib
 
 
@@ -69,6 +71,7 @@ async def delete_library(
         raise HTTPException(status_code=404, detail="Library not found")
     await db.delete(lib)
     await db.commit()
+    await invalidate_library(library_id)
 
 
 @router.get("/{library_id}/counters", response_model=list[MetricCounterOut])
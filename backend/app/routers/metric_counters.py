@@ -7,6 +7,7 @@ from app.database import get_db
 from app.dependencies import get_current_admin
 from app.models.metric_counter import MetricCounter
 from app.schemas.metric_counter import MetricCounterCreate, MetricCounterOut, MetricCounterUpdate
+from app.services.response_cache import invalidate_library
 
 router = APIRouter(prefix="/api/metric-counters", tags=["metric-counters"])
 
@@ -21,6 +22,7 @@ async def create_counter(
     db.add(counter)
     await db.commit()
     await db.refresh(counter)
+    await invalidate_library(counter.library_id)
     return counter
 
 
@@ -38,6 +40,7 @@ async def update_counter(
         setattr(counter, key, val)
     await db.commit()
     await db.refresh(counter)
+    await invalidate_library(counter.library_id)
     return counter
 
 
@@ -52,3 +55,4 @@ async def delete_counter(
         raise HTTPException(status_code=404, detail="Counter not found")
     await db.delete(counter)
     await db.commit()
+    await invalidate_library(counter.library_id)
@@ -8,6 +8,7 @@ from app.database import get_db
 from app.dependencies import get_current_admin
 from app.models.review import Review
 from app.schemas.review import ReviewCreate, ReviewOut, ReviewUpdate
+from app.services.response_cache import invalidate_library
 
 router = APIRouter(prefix="/api/reviews", tags=["reviews"])
 
@@ -36,6 +37,7 @@ async def create_review(
     db.add(review)
     await db.commit()
     await db.refresh(review)
+    await invalidate_library(review.library_id)
     return review
 
 
@@ -53,6 +55,7 @@ async def update_review(
         setattr(review, key, val)
     await db.commit()
     await db.refresh(review)
+    await invalidate_library(review.library_id)
     return review
 
 
@@ -67,3 +70,4 @@ async def delete_review(
         raise HTTPException(status_code=404, detail="Review not found")
     await db.delete(review)
     await db.commit()
+    await invalidate_library(review.library_id)
@@ -5,13 +5,17 @@ import logging
 import uuid
 from typing import Optional
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
-from app.database import async_session, get_db
+from app.database import get_db
 from app.models.metric_counter import MetricCounter
+from app.models.sync_backfill import SyncBackfill
 from app.models.traffic_metric import TrafficMetric
+from app.schemas.sync import SyncBackfillChunkOut, SyncBackfillStatus
+from app.services.backfill_service import create_backfill, is_running, start_backfill
 from app.services.sync_service import sync_library_metrics
 
 logger = logging.getLogger(__name__)
@@ -20,18 +24,8 @@ router = APIRouter(prefix="/api/sync", tags=["sync"])
 _BG_THRESHOLD_DAYS = 30  # periods longer than this run in background
 
 
-async def _run_sync_bg(library_id: uuid.UUID, date_from: datetime.date, date_to: datetime.date) -> None:
-    async with async_session() as db:
-        try:
-            await sync_library_metrics(db, library_id, date_from=date_from, date_to=date_to)
-            logger.info("Background sync completed for library %s (%s → %s)", library_id, date_from, date_to)
-        except Exception:
-            logger.exception("Background sync failed for library %s", library_id)
-
-
 @router.post("/trigger")
 async def trigger_sync(
-    background_tasks: BackgroundTasks,
     library_id: uuid.UUID,
     date_from: Optional[datetime.date] = Query(default=None),
     date_to: Optional[datetime.date] = Query(default=None),
@@ -39,7 +33,8 @@ async def trigger_sync(
 ) -> dict:
     """
     Ручной запуск синхронизации метрик с Яндекс.Метрики.
-    Периоды > 30 дней запускаются в фоне и отвечают немедленно.
+    Периоды > 30 дней запускаются в фоне как backfill по месяцам и отвечают немедленно;
+    прогресс — GET /api/sync/backfill/{backfill_id}.
     """
     effective_date_to = date_to or datetime.date.today()
     effective_date_from = date_from or (effective_date_to - datetime.timedelta(days=7))
@@ -52,12 +47,14 @@ async def trigger_sync(
     }
 
     if days > _BG_THRESHOLD_DAYS:
-        # Long sync — run in background, respond immediately
-        background_tasks.add_task(_run_sync_bg, library_id, effective_date_from, effective_date_to)
+        # Long sync — chunked, resumable backfill in background, respond immediately
+        backfill = await create_backfill(db, library_id, effective_date_from, effective_date_to)
+        start_backfill(backfill.id)
         return {
             "message": f"Синхронизация запущена в фоне ({days} дн.). Данные появятся через несколько минут.",
             "background": True,
             "period": period_info,
+            "backfill_id": str(backfill.id),
         }
 
     # Short sync — run synchronously
@@ -77,3 +74,58 @@ async def trigger_sync(
         "period": period_info,
         "diagnostics": {"traffic_metrics_rows": traffic_count},
     }
+
+
+async def _get_backfill(db: AsyncSession, backfill_id: uuid.UUID) -> SyncBackfill:
+    result = await db.execute(
+        select(SyncBackfill)
+        .where(SyncBackfill.id == backfill_id)
+        .options(selectinload(SyncBackfill.chunks))
+    )
+    backfill = result.scalar_one_or_none()
+    if not backfill:
+        raise HTTPException(status_code=404, detail="Backfill not found")
+    return backfill
+
+
+def _backfill_status(backfill: SyncBackfill) -> SyncBackfillStatus:
+    total = backfill.total_chunks or 0
+    return SyncBackfillStatus(
+        id=backfill.id,
+        library_id=backfill.library_id,
+        date_from=backfill.date_from,
+        date_to=backfill.date_to,
+        status=backfill.status,
+        total_chunks=total,
+        completed_chunks=backfill.completed_chunks or 0,
+        progress_pct=round((backfill.completed_chunks or 0) / total * 100, 1) if total else 0.0,
+        running=is_running(backfill.id),
+        error_message=backfill.error_message,
+        created_at=backfill.created_at,
+        finished_at=backfill.finished_at,
+        chunks=[SyncBackfillChunkOut.model_validate(chunk) for chunk in backfill.chunks],
+    )
+
+
+@router.get("/backfill/{backfill_id}", response_model=SyncBackfillStatus)
+async def get_backfill_status(
+    backfill_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db),
+) -> SyncBackfillStatus:
+    """Прогресс фоновой загрузки истории (по месячным чанкам)"""
+    backfill = await _get_backfill(db, backfill_id)
+    return _backfill_status(backfill)
+
+
+@router.post("/backfill/{backfill_id}/resume", response_model=SyncBackfillStatus)
+async def resume_backfill(
+    backfill_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db),
+) -> SyncBackfillStatus:
+    """Повторный запуск backfill — загружаются только незавершённые чанки"""
+    backfill = await _get_backfill(db, backfill_id)
+    if backfill.status == "completed":
+        return _backfill_status(backfill)
+    if not start_backfill(backfill.id):
+        raise HTTPException(status_code=409, detail="Backfill is already running")
+    return _backfill_status(backfill)
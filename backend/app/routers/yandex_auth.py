@@ -18,6 +18,7 @@ from app.models.metric_counter import MetricCounter, SyncStatus
 from app.models.yandex_token import YandexToken
 from app.schemas.metric_counter import MetricCounterOut
 from app.schemas.yandex import LinkCounterRequest, OAuthStartResponse, YandexCounterOut
+from app.services.response_cache import invalidate_library
 from app.services.sync_service import sync_library_metrics
 from app.services.yandex_metrika import YandexMetrikaService
 
@@ -205,6 +206,7 @@ async def link_counter(
     db.add(counter)
     await db.commit()
     await db.refresh(counter)
+    await invalidate_library(data.library_id)
 
     # Auto-sync: подтянуть данные в фоне сразу после подключения
     async def _bg_sync(library_id: uuid.UUID):
@@ -1,53 +1,128 @@
 from __future__ import annotations
 
+import asyncio
 import logging
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+import time
+import uuid
+from sqlalchemy import select, update
 
+from app.config import settings
 from app.database import async_session
 from app.models.library import Library
+from app.models.metric_counter import MetricCounter, SyncStatus
 from app.models.yandex_token import YandexToken
 from app.services.sync_service import sync_library_metrics
 
 logger = logging.getLogger(__name__)
 
+# Guards against overlapping runs within this process (the scheduler also sets max_instances=1)
+_sync_job_lock = asyncio.Lock()
+
 
 async def daily_sync_job():
     """
     Ежедневная синхронизация метрик для всех библиотек с подключённой Яндекс.Метрикой
 
-    Запускается по расписанию в 3:00 каждый день
+    Библиотеки распределяются между settings.sync_workers параллельными воркерами,
+    у каждого воркера своя сессия БД. Синхронизация одной библиотеки ограничена
+    settings.sync_library_timeout_seconds, чтобы зависшая библиотека не задерживала остальные.
     """
-    logger.info("Starting daily sync job")
+    if _sync_job_lock.locked():
+        logger.warning("Previous sync job is still running, skipping this run")
+        return
+
+    async with _sync_job_lock:
+        logger.info("Starting daily sync job")
+        started = time.monotonic()
 
-    async with async_session() as db:
         try:
             # Получаем все библиотеки, у которых есть токен Яндекс.Метрики
-            result = await db.execute(
-                select(Library)
-                .join(YandexToken, Library.id == YandexToken.library_id)
-            )
-            libraries = result.scalars().all()
+            async with async_session() as db:
+                result = await db.execute(
+                    select(Library.id, Library.name)
+                    .join(YandexToken, Library.id == YandexToken.library_id)
+                )
+                libraries = result.all()
+        except Exception as e:
+            logger.error(f"Daily sync job failed: {e}", exc_info=True)
+            return
 
-            if not libraries:
-                logger.info("No libraries with Yandex tokens found")
-                return
+        if not libraries:
+            logger.info("No libraries with Yandex tokens found")
+            return
 
-            logger.info(f"Found {len(libraries)} libraries to sync")
+        workers = max(1, min(settings.sync_workers, len(libraries)))
+        logger.info(f"Found {len(libraries)} libraries to sync, {workers} workers")
 
-            # Синхронизируем каждую библиотеку
-            for library in libraries:
+        queue: asyncio.Queue[tuple[uuid.UUID, str]] = asyncio.Queue()
+        for library_id, name in libraries:
+            queue.put_nowait((library_id, name))
+
+        stats = {"success": 0, "error": 0, "timeout": 0}
+
+        async def _worker() -> None:
+            while True:
                 try:
-                    logger.info(f"Syncing library {library.id} ({library.name})")
-                    await sync_library_metrics(db, library.id)
-                    logger.info(f"Successfully synced library {library.id}")
-                except Exception as e:
-                    logger.error(
-                        f"Failed to sync library {library.id}: {e}", exc_info=True
-                    )
-                    # Продолжаем синхронизацию других библиотек
+                    library_id, name = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                outcome = await _sync_library(library_id, name)
+                stats[outcome] += 1
 
-            logger.info("Daily sync job completed")
+        await asyncio.gather(*(_worker() for _ in range(workers)))
 
-        except Exception as e:
-            logger.error(f"Daily sync job failed: {e}", exc_info=True)
+        elapsed = time.monotonic() - started
+        rate = len(libraries) / elapsed if elapsed > 0 else 0.0
+        logger.info(
+            f"Daily sync job completed: {len(libraries)} libraries in {elapsed:.1f}s"
+            f" ({rate:.2f} libraries/s) —"
+            f" success={stats['success']}, error={stats['error']}, timeout={stats['timeout']}"
+        )
+
+
+async def _fail_syncing_counters(library_id: uuid.UUID, message: str) -> None:
+    """
+    Счётчики, оставшиеся в статусе 'syncing' после прерванной синхронизации, перевести в 'error'
+
+    Шаг 4a уже закоммитил статус 'syncing'; без этого он висел бы до следующей успешной синхронизации.
+    Отдельная сессия: сессия прерванной синхронизации могла остаться посреди транзакции.
+    """
+    try:
+        async with async_session() as db:
+            await db.execute(
+                update(MetricCounter)
+                .where(
+                    MetricCounter.library_id == library_id,
+                    MetricCounter.sync_status == SyncStatus.SYNCING,
+                )
+                .values(sync_status=SyncStatus.ERROR, sync_error_message=message)
+            )
+            await db.commit()
+    except Exception as e:
+        logger.error(f"Failed to reset sync status of library {library_id}: {e}", exc_info=True)
+
+
+async def _sync_library(library_id: uuid.UUID, name: str) -> str:
+    """Sync one library in its own session; returns 'success', 'error' or 'timeout'"""
+    started = time.monotonic()
+    logger.info(f"Syncing library {library_id} ({name})")
+    try:
+        async with async_session() as db:
+            await asyncio.wait_for(
+                sync_library_metrics(db, library_id),
+                timeout=settings.sync_library_timeout_seconds,
+            )
+    except asyncio.TimeoutError:
+        message = f"Sync timed out after {settings.sync_library_timeout_seconds}s"
+        logger.error(f"Sync of library {library_id}: {message}")
+        await _fail_syncing_counters(library_id, message)
+        return "timeout"
+    except asyncio.CancelledError:
+        await _fail_syncing_counters(library_id, "Sync was cancelled")
+        raise
+    except Exception as e:
+        logger.error(f"Failed to sync library {library_id}: {e}", exc_info=True)
+        return "error"
+
+    logger.info(f"Successfully synced library {library_id} in {time.monotonic() - started:.1f}s")
+    return "success"
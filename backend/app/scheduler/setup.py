@@ -26,6 +26,8 @@ def start_scheduler():
         id="periodic_sync",
         name="Periodic Yandex.Metrika sync (every 4h)",
         replace_existing=True,
+        max_instances=1,  # never overlap with a run that is still in progress
+        coalesce=True,  # collapse missed runs into a single one
     )
 
     logger.info("Starting APScheduler")
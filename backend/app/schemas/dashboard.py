@@ -6,6 +6,9 @@ from enum import Enum
 
 from pydantic import BaseModel
 
+from app.schemas.insights import Insight
+from app.schemas.vk import VkStatsResponse
+
 
 class Period(str, Enum):
     today = "today"
@@ -16,6 +19,14 @@ class Period(str, Enum):
     year = "year"
 
 
+class Granularity(str, Enum):
+    """Bucket size of trend series; auto picks it from the period length"""
+    auto = "auto"
+    day = "day"
+    week = "week"
+    month = "month"
+
+
 # Block 1: KPI overview
 class KpiOverview(BaseModel):
     views: int
@@ -103,3 +114,25 @@ class ReviewItem(BaseModel):
 class ReviewsResponse(BaseModel):
     items: list[ReviewItem]
     total: int
+
+
+# Bundle: several blocks in one response
+class BundleSection(str, Enum):
+    overview = "overview"
+    channels = "channels"
+    behavior = "behavior"
+    engagement = "engagement"
+    reviews = "reviews"
+    insights = "insights"
+    vk = "vk"
+
+
+class DashboardBundle(BaseModel):
+    """Requested sections filled in, the rest null; vk is null when there is no VK data"""
+    overview: KpiOverview | None = None
+    channels: list[ChannelMetric] | None = None
+    behavior: BehaviorData | None = None
+    engagement: EngagementData | None = None
+    reviews: ReviewsResponse | None = None
+    insights: list[Insight] | None = None
+    vk: VkStatsResponse | None = None
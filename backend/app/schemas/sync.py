@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import datetime
+import uuid
+
+from pydantic import BaseModel
+
+
+class SyncBackfillChunkOut(BaseModel):
+    """One monthly chunk of a backfill"""
+
+    date_from: datetime.date
+    date_to: datetime.date
+    status: str
+    attempts: int
+    error_message: str | None
+    completed_at: datetime.datetime | None
+
+    model_config = {"from_attributes": True}
+
+
+class SyncBackfillStatus(BaseModel):
+    """Backfill progress"""
+
+    id: uuid.UUID
+    library_id: uuid.UUID
+    date_from: datetime.date
+    date_to: datetime.date
+    status: str
+    total_chunks: int
+    completed_chunks: int
+    progress_pct: float
+    running: bool
+    error_message: str | None
+    created_at: datetime.datetime
+    finished_at: datetime.datetime | None
+    chunks: list[SyncBackfillChunkOut]
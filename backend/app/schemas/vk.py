@@ -14,8 +14,8 @@ class VkUploadOut(BaseModel):
     channel_id: uuid.UUID
     filename: str
     uploaded_at: datetime.datetime
-    period_start: datetime.date
-    period_end: datetime.date
+    period_start: datetime.date | None
+    period_end: datetime.date | None
     total_rows: int | None
     status: str
     error_message: str | None
@@ -121,12 +121,27 @@ class VkStatsResponse(BaseModel):
     insights: list[dict]  # Re-use existing Insight schema
 
 
-class VkUploadSummary(BaseModel):
-    """Upload summary response"""
+class VkUploadProgress(BaseModel):
+    """Upload status with background job progress"""
 
-    upload_id: uuid.UUID
-    total_rows: int
-    period_start: datetime.date
-    period_end: datetime.date
-    vk_metrics_count: int
-    engagement_metrics_count: int
+    id: uuid.UUID
+    library_id: uuid.UUID
+    channel_id: uuid.UUID
+    filename: str
+    status: str
+    phase: str | None  # queued | parsing | saving while the job runs in this process
+    bytes_total: int | None
+    bytes_processed: int
+    rows_processed: int
+    progress_pct: float | None
+    rows_per_second: float | None
+    eta_seconds: float | None
+    period_start: datetime.date | None
+    period_end: datetime.date | None
+    total_rows: int | None
+    vk_metrics_count: int | None
+    engagement_metrics_count: int | None
+    error_message: str | None
+    uploaded_at: datetime.datetime
+    started_at: datetime.datetime | None
+    finished_at: datetime.datetime | None
@@ -0,0 +1,112 @@
+from datetime import date
+from typing import Any, Callable, Sequence
+
+from sqlalchemy import Date, DateTime, and_, cast, func, literal_column, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import ColumnElement
+
+from app.schemas.dashboard import Granularity
+from app.services.period import full_buckets
+
+
+async def aggregate_two_periods(
+    db: AsyncSession,
+    agg: Callable[[Any], ColumnElement],
+    columns: Sequence[Any],
+    date_column: Any,
+    filters: Sequence[ColumnElement],
+    date_from: date,
+    date_to: date,
+    prev_from: date,
+    prev_to: date,
+) -> tuple[tuple, tuple]:
+    """
+    Aggregate `columns` over the current and previous windows in one round trip.
+
+    Each column is aggregated twice with `agg(...) FILTER (WHERE date BETWEEN ...)`,
+    and the scan is limited to [prev_from, date_to] so range indexes still apply.
+    Returns (current_values, previous_values); empty windows yield 0.
+    """
+    cur_window = date_column.between(date_from, date_to)
+    prev_window = date_column.between(prev_from, prev_to)
+
+    q = select(
+        *(func.coalesce(agg(c).filter(cur_window), 0) for c in columns),
+        *(func.coalesce(agg(c).filter(prev_window), 0) for c in columns),
+    ).where(
+        *filters,
+        date_column >= min(date_from, prev_from),
+        date_column <= max(date_to, prev_to),
+    )
+    row = (await db.execute(q)).one()
+    n = len(columns)
+    return tuple(row[:n]), tuple(row[n:])
+
+
+def date_bucket(date_column: Any, granularity: Granularity) -> ColumnElement:
+    """
+    First day of the week (Monday) or month of `date_column`
+
+    The unit is inlined rather than bound so the same expression can be
+    repeated in GROUP BY.
+    """
+    unit = literal_column(f"'{Granularity(granularity).value}'")
+    return cast(func.date_trunc(unit, cast(date_column, DateTime)), Date)
+
+
+async def aggregate_buckets(
+    db: AsyncSession,
+    granularity: Granularity,
+    date_from: date,
+    date_to: date,
+    daily_source: Any,
+    daily_columns: Sequence[ColumnElement],
+    daily_filters: Sequence[ColumnElement],
+    period_source: Any | None = None,
+    period_columns: Sequence[Any] = (),
+    period_filters: Sequence[ColumnElement] = (),
+    keys: Sequence[str] = (),
+) -> list[tuple]:
+    """
+    Series of (*keys, bucket_date, *values) over [date_from, date_to], one row per key and bucket.
+
+    `daily_columns` are aggregates over the daily rows of `daily_source`. For
+    week/month buckets with a `period_source` (a *_period_rollups model), the
+    buckets lying entirely inside the range are read from it (`period_columns`,
+    in the same order) and only the partial buckets at the edges are summed
+    from daily rows. Clipped edge buckets are dated with date_from.
+    """
+    granularity = Granularity(granularity)
+    daily_keys = [getattr(daily_source, k).label(k) for k in keys]
+    in_range = daily_source.date.between(date_from, date_to)
+    parts = []
+
+    full = None
+    if period_source is not None and granularity != Granularity.day:
+        full = full_buckets(date_from, date_to, granularity)
+    if full:
+        in_range = and_(in_range, ~daily_source.date.between(*full))
+        parts.append(
+            select(
+                *(getattr(period_source, k).label(k) for k in keys),
+                period_source.period_start.label("bucket"),
+                *period_columns,
+            ).where(
+                *period_filters,
+                period_source.granularity == granularity.value,
+                period_source.period_start.between(*full),
+            )
+        )
+
+    bucket = daily_source.date if granularity == Granularity.day else date_bucket(daily_source.date, granularity)
+    parts.insert(
+        0,
+        select(*daily_keys, bucket.label("bucket"), *daily_columns)
+        .where(*daily_filters, in_range)
+        .group_by(*daily_keys, bucket),
+    )
+
+    q = union_all(*parts) if len(parts) > 1 else parts[0]
+    rows = (await db.execute(q.order_by(*keys, "bucket"))).all()
+    n = len(keys)
+    return [(*r[:n], max(r[n], date_from), *r[n + 1:]) for r in rows]
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import logging
+import uuid
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import async_session
+from app.models.sync_backfill import SyncBackfill, SyncBackfillChunk
+from app.services.response_cache import invalidate_library
+from app.services.rollup_service import refresh_traffic_rollups
+from app.services.sync_service import (
+    fetch_counters_concurrently,
+    get_valid_token,
+    load_matched_counters,
+    write_counter_metrics,
+)
+from app.services.yandex_metrika import YandexMetrikaService
+
+logger = logging.getLogger(__name__)
+
+# Backfills currently running in this process, keyed by backfill id
+_running: dict[uuid.UUID, asyncio.Task] = {}
+
+
+def split_into_months(
+    date_from: datetime.date,
+    date_to: datetime.date,
+) -> list[tuple[datetime.date, datetime.date]]:
+    """Split [date_from, date_to] into calendar-month chunks (the edges may be partial months)"""
+    chunks = []
+    start = date_from
+    while start <= date_to:
+        next_month = (start.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+        end = min(next_month - datetime.timedelta(days=1), date_to)
+        chunks.append((start, end))
+        start = next_month
+    return chunks
+
+
+async def create_backfill(
+    db: AsyncSession,
+    library_id: uuid.UUID,
+    date_from: datetime.date,
+    date_to: datetime.date,
+) -> SyncBackfill:
+    """Persist a backfill and its monthly chunks (status=pending)"""
+    months = split_into_months(date_from, date_to)
+    backfill = SyncBackfill(
+        library_id=library_id,
+        date_from=date_from,
+        date_to=date_to,
+        status="pending",
+        total_chunks=len(months),
+        completed_chunks=0,
+        chunks=[SyncBackfillChunk(date_from=start, date_to=end, status="pending", attempts=0) for start, end in months],
+    )
+    db.add(backfill)
+    await db.commit()
+    await db.refresh(backfill)
+    logger.info(f"Created backfill {backfill.id} for library {library_id}: {len(months)} monthly chunks")
+    return backfill
+
+
+def start_backfill(backfill_id: uuid.UUID) -> bool:
+    """Run a backfill in the background; returns False if it is already running here"""
+    task = _running.get(backfill_id)
+    if task and not task.done():
+        return False
+    task = asyncio.create_task(run_backfill(backfill_id))
+    _running[backfill_id] = task
+    task.add_done_callback(lambda _: _running.pop(backfill_id, None))
+    return True
+
+
+def is_running(backfill_id: uuid.UUID) -> bool:
+    task = _running.get(backfill_id)
+    return bool(task and not task.done())
+
+
+async def resume_backfills() -> int:
+    """Restart backfills left pending/running by a previous process; returns how many"""
+    async with async_session() as db:
+        result = await db.execute(
+            select(SyncBackfill.id).where(SyncBackfill.status.in_(["pending", "running"]))
+        )
+        backfill_ids = result.scalars().all()
+
+    for backfill_id in backfill_ids:
+        logger.info(f"Resuming backfill {backfill_id}")
+        start_backfill(backfill_id)
+    return len(backfill_ids)
+
+
+async def stop_backfills() -> None:
+    """Cancel running backfills on shutdown; unfinished chunks stay pending for resume"""
+    tasks = [task for task in _running.values() if not task.done()]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def run_backfill(backfill_id: uuid.UUID) -> None:
+    """
+    Fetch and store every chunk of a backfill that is not completed yet
+
+    Up to settings.backfill_max_parallel_chunks chunks are fetched at once and all
+    Metrika requests share one settings.yandex_max_concurrent_requests budget.
+    Writes go through a single session guarded by a lock; each chunk is marked
+    completed in the same commit as its metrics, so a crash never loses progress
+    beyond the chunk in flight.
+    """
+    async with async_session() as db:
+        backfill = await db.get(SyncBackfill, backfill_id)
+        if not backfill:
+            logger.warning(f"Backfill {backfill_id} not found")
+            return
+
+        try:
+            token = await get_valid_token(db, backfill.library_id)
+            if not token:
+                raise RuntimeError("No valid Yandex token for library")
+
+            matched, _ = await load_matched_counters(db, backfill.library_id)
+            if not matched:
+                raise RuntimeError("No active counters with matching channels")
+
+            result = await db.execute(
+                select(SyncBackfillChunk)
+                .where(
+                    SyncBackfillChunk.backfill_id == backfill_id,
+                    SyncBackfillChunk.status != "completed",
+                )
+                .order_by(SyncBackfillChunk.date_from)
+            )
+            chunks = result.scalars().all()
+
+            backfill.status = "running"
+            backfill.error_message = None
+            await db.commit()
+
+            logger.info(f"Backfill {backfill_id}: {len(chunks)} of {backfill.total_chunks} chunks to fetch")
+
+            chunk_semaphore = asyncio.Semaphore(settings.backfill_max_parallel_chunks)
+            request_semaphore = asyncio.Semaphore(settings.yandex_max_concurrent_requests)
+            write_lock = asyncio.Lock()
+
+            async with YandexMetrikaService(token.access_token) as ym_service:
+
+                async def _run_chunk(chunk: SyncBackfillChunk) -> None:
+                    async with chunk_semaphore:
+                        results = await fetch_counters_concurrently(
+                            ym_service,
+                            [(counter, chunk.date_from, chunk.date_to) for counter, _ in matched],
+                            semaphore=request_semaphore,
+                        )
+
+                    async with write_lock:
+                        chunk.attempts += 1
+                        errors = []
+                        for (counter, channel), counter_result in zip(matched, results):
+                            if isinstance(counter_result, BaseException):
+                                errors.append(f"{counter.name}: {counter_result}")
+                                continue
+                            try:
+                                async with db.begin_nested():
+                                    await write_counter_metrics(
+                                        db, backfill.library_id, counter, channel, *counter_result,
+                                    )
+                            except Exception as e:
+                                errors.append(f"{counter.name}: {e}")
+
+                        if errors:
+                            chunk.status = "error"
+                            chunk.error_message = "; ".join(errors)[:500]
+                            logger.error(
+                                f"Backfill {backfill_id} chunk {chunk.date_from}..{chunk.date_to} failed: "
+                                f"{chunk.error_message}"
+                            )
+                        else:
+                            chunk.status = "completed"
+                            chunk.error_message = None
+                            chunk.completed_at = datetime.datetime.utcnow()
+                            backfill.completed_chunks += 1
+                            logger.info(
+                                f"Backfill {backfill_id} chunk {chunk.date_from}..{chunk.date_to} done "
+                                f"({backfill.completed_chunks}/{backfill.total_chunks})"
+                            )
+                        await refresh_traffic_rollups(db, backfill.library_id, chunk.date_from, chunk.date_to)
+                        await db.commit()
+                        await invalidate_library(backfill.library_id)
+
+                # A failing chunk cancels its siblings and waits for them, so the
+                # error handler below is the only user of the session afterwards
+                async with asyncio.TaskGroup() as tg:
+                    for chunk in chunks:
+                        tg.create_task(_run_chunk(chunk))
+
+            failed = [chunk for chunk in chunks if chunk.status != "completed"]
+            backfill.status = "error" if failed else "completed"
+            backfill.error_message = f"{len(failed)} chunks failed" if failed else None
+            backfill.finished_at = datetime.datetime.utcnow()
+            await db.commit()
+            logger.info(f"Backfill {backfill_id} finished with status {backfill.status}")
+
+        except asyncio.CancelledError:
+            logger.info(f"Backfill {backfill_id} interrupted, will resume on next start")
+            raise
+        except Exception as e:
+            if isinstance(e, ExceptionGroup):
+                e = e.exceptions[0]
+            logger.error(f"Backfill {backfill_id} failed: {e}", exc_info=e)
+            await db.rollback()
+            backfill.status = "error"
+            backfill.error_message = str(e)[:500]
+            backfill.finished_at = datetime.datetime.utcnow()
+            await db.commit()
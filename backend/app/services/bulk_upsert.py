@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+from typing import Any, Iterator, Sequence
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# asyncpg caps a statement at 32767 bind parameters; stay well below it
+_MAX_BIND_PARAMS = 30_000
+
+
+def chunked(rows: Sequence[dict[str, Any]], size: int) -> Iterator[Sequence[dict[str, Any]]]:
+    """Yield consecutive slices of `rows` with at most `size` items each"""
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+async def upsert_rows(
+    db: AsyncSession,
+    model: type,
+    rows: Sequence[dict[str, Any]],
+    update_columns: Sequence[str],
+    *,
+    constraint: str | None = None,
+    index_elements: Sequence[str] | None = None,
+    chunk_size: int = 1000,
+) -> int:
+    """
+    Upsert `rows` into `model` with one multi-VALUES INSERT ... ON CONFLICT per chunk
+
+    Conflicts are matched by `constraint` name or `index_elements`, and the
+    `update_columns` are overwritten from EXCLUDED. Rows within one call must not
+    repeat a conflict key — PostgreSQL rejects touching the same row twice in a
+    single statement. The caller owns the transaction (nothing is committed here).
+
+    Returns the number of rows sent.
+    """
+    if not rows:
+        return 0
+
+    # +1 for the Python-side primary key default filled in per row
+    params_per_row = len(rows[0]) + 1
+    chunk_size = max(1, min(chunk_size, _MAX_BIND_PARAMS // params_per_row))
+
+    for chunk in chunked(rows, chunk_size):
+        stmt = insert(model).values(list(chunk))
+        stmt = stmt.on_conflict_do_update(
+            constraint=constraint,
+            index_elements=index_elements,
+            set_={col: stmt.excluded[col] for col in update_columns},
+        )
+        await db.execute(stmt)
+
+    return len(rows)
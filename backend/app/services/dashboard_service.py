@@ -1,4 +1,5 @@
 import uuid
+from collections import defaultdict
 from datetime import date
 
 from sqlalchemy import func, select
@@ -9,6 +10,12 @@ from app.models.engagement_metric import EngagementMetric
 from app.models.metric_counter import MetricCounter
 from app.models.review import Review
 from app.models.traffic_metric import TrafficMetric
+from app.models.traffic_rollup import (
+    TrafficChannelDailyRollup,
+    TrafficChannelPeriodRollup,
+    TrafficCounterPeriodRollup,
+    TrafficDailyRollup,
+)
 from app.schemas.dashboard import (
     BehaviorData,
     BehaviorPoint,
@@ -17,12 +24,20 @@ from app.schemas.dashboard import (
     CounterBehaviorTimeline,
     EngagementData,
     EngagementPoint,
+    Granularity,
     KpiOverview,
     Period,
     ReviewItem,
     ReviewsResponse,
 )
-from app.services.period import calc_delta_pct, resolve_period, resolve_period_or_custom
+from app.config import settings
+from app.services.aggregates import aggregate_buckets, aggregate_two_periods
+from app.services.period import calc_delta_pct, resolve_granularity, resolve_period, resolve_period_or_custom
+
+
+def _use_rollups(counter_id: uuid.UUID | None) -> bool:
+    """Library-wide reads come from the daily rollups; per-counter reads need raw rows"""
+    return counter_id is None and settings.traffic_rollups_enabled
 
 
 async def get_overview(
@@ -36,24 +51,22 @@ async def get_overview(
 ) -> KpiOverview:
     date_from, date_to, prev_from, prev_to = resolve_period_or_custom(period, date_from_custom, date_to_custom)
 
-    async def _sum_traffic(d_from, d_to):
-        q = select(
-            func.coalesce(func.sum(TrafficMetric.views), 0),
-            func.coalesce(func.sum(TrafficMetric.visits), 0),
-            func.coalesce(func.sum(TrafficMetric.users), 0),
-        ).where(
-            TrafficMetric.library_id == library_id,
-            TrafficMetric.date >= d_from,
-            TrafficMetric.date <= d_to,
-            TrafficMetric.exclude_robots == exclude_robots,
-        )
-        if counter_id:
-            q = q.where(TrafficMetric.counter_id == counter_id)
-        row = (await db.execute(q)).one()
-        return row[0], row[1], row[2]
-
-    cur_views, cur_visits, cur_users = await _sum_traffic(date_from, date_to)
-    prev_views, prev_visits, prev_users = await _sum_traffic(prev_from, prev_to)
+    source = TrafficDailyRollup if _use_rollups(counter_id) else TrafficMetric
+    filters = [
+        source.library_id == library_id,
+        source.exclude_robots == exclude_robots,
+    ]
+    if counter_id:
+        filters.append(TrafficMetric.counter_id == counter_id)
+
+    (cur_views, cur_visits, cur_users), (prev_views, prev_visits, prev_users) = await aggregate_two_periods(
+        db,
+        func.sum,
+        [source.views, source.visits, source.users],
+        source.date,
+        filters,
+        date_from, date_to, prev_from, prev_to,
+    )
 
     return KpiOverview(
         views=cur_views,
@@ -78,11 +91,12 @@ async def get_channels(
 ) -> list[ChannelMetric]:
     date_from, date_to, _, _ = resolve_period_or_custom(period, date_from_custom, date_to_custom)
 
+    source = TrafficChannelDailyRollup if _use_rollups(counter_id) else TrafficMetric
     join_condition = (
-        (TrafficMetric.channel_id == Channel.id)
-        & (TrafficMetric.date >= date_from)
-        & (TrafficMetric.date <= date_to)
-        & (TrafficMetric.exclude_robots == exclude_robots)
+        (source.channel_id == Channel.id)
+        & (source.date >= date_from)
+        & (source.date <= date_to)
+        & (source.exclude_robots == exclude_robots)
     )
     if counter_id:
         join_condition = join_condition & (TrafficMetric.counter_id == counter_id)
@@ -92,11 +106,11 @@ async def get_channels(
             Channel.id,
             Channel.type,
             Channel.custom_name,
-            func.coalesce(func.sum(TrafficMetric.views), 0),
-            func.coalesce(func.sum(TrafficMetric.visits), 0),
-            func.coalesce(func.sum(TrafficMetric.users), 0),
+            func.coalesce(func.sum(source.views), 0),
+            func.coalesce(func.sum(source.visits), 0),
+            func.coalesce(func.sum(source.users), 0),
         )
-        .outerjoin(TrafficMetric, join_condition)
+        .outerjoin(source, join_condition)
         .where(Channel.library_id == library_id)
         .group_by(Channel.id, Channel.type, Channel.custom_name)
     )
@@ -123,28 +137,37 @@ async def get_channel_trend(
     date_from_custom: date | None = None,
     date_to_custom: date | None = None,
     exclude_robots: bool = True,
+    granularity: Granularity = Granularity.auto,
 ) -> list[ChannelTrendPoint]:
     date_from, date_to, _, _ = resolve_period_or_custom(period, date_from_custom, date_to_custom)
-
-    q = (
-        select(
-            TrafficMetric.date,
-            func.sum(TrafficMetric.views),
-            func.sum(TrafficMetric.visits),
-            func.sum(TrafficMetric.users),
-        )
-        .where(
-            TrafficMetric.library_id == library_id,
-            TrafficMetric.channel_id == channel_id,
-            TrafficMetric.date >= date_from,
-            TrafficMetric.date <= date_to,
-            TrafficMetric.exclude_robots == exclude_robots,
-        )
-        .group_by(TrafficMetric.date)
-        .order_by(TrafficMetric.date)
+    granularity = resolve_granularity(granularity, date_from, date_to)
+
+    use_rollups = _use_rollups(None)
+    source = TrafficChannelDailyRollup if use_rollups else TrafficMetric
+    rows = await aggregate_buckets(
+        db,
+        granularity,
+        date_from,
+        date_to,
+        source,
+        [func.sum(source.views), func.sum(source.visits), func.sum(source.users)],
+        [
+            source.library_id == library_id,
+            source.channel_id == channel_id,
+            source.exclude_robots == exclude_robots,
+        ],
+        period_source=TrafficChannelPeriodRollup if use_rollups else None,
+        period_columns=[
+            TrafficChannelPeriodRollup.views,
+            TrafficChannelPeriodRollup.visits,
+            TrafficChannelPeriodRollup.users,
+        ],
+        period_filters=[
+            TrafficChannelPeriodRollup.library_id == library_id,
+            TrafficChannelPeriodRollup.channel_id == channel_id,
+            TrafficChannelPeriodRollup.exclude_robots == exclude_robots,
+        ],
     )
-
-    rows = (await db.execute(q)).all()
     return [
         ChannelTrendPoint(date=r[0], views=r[1], visits=r[2], users=r[3])
         for r in rows
@@ -159,95 +182,146 @@ async def get_behavior(
     date_from_custom: date | None = None,
     date_to_custom: date | None = None,
     exclude_robots: bool = True,
+    granularity: Granularity = Granularity.auto,
 ) -> BehaviorData:
     date_from, date_to, prev_from, prev_to = resolve_period_or_custom(period, date_from_custom, date_to_custom)
+    granularity = resolve_granularity(granularity, date_from, date_to)
 
     # Get all active counters for this library
-    counters_q = select(MetricCounter).where(
+    counters_q = select(MetricCounter.id, MetricCounter.name).where(
         MetricCounter.library_id == library_id,
         MetricCounter.is_active == True,
     )
     if counter_id:
         counters_q = counters_q.where(MetricCounter.id == counter_id)
 
-    counters = (await db.execute(counters_q)).scalars().all()
+    counters = (await db.execute(counters_q)).all()
 
     # For overall delta calculation (all counters combined)
-    async def _avg_behavior_all(d_from, d_to):
-        q = select(
-            func.coalesce(func.avg(TrafficMetric.avg_time), 0),
-            func.coalesce(func.avg(TrafficMetric.depth), 0),
-            func.coalesce(func.avg(TrafficMetric.bounce_rate), 0),
-            func.coalesce(func.avg(TrafficMetric.return_rate), 0),
-        ).where(
+    if _use_rollups(counter_id):
+        # AVG over raw rows == sum of the daily sums / sum of the daily row counts
+        cur_sums, prev_sums = await aggregate_two_periods(
+            db,
+            func.sum,
+            [
+                TrafficDailyRollup.avg_time_sum,
+                TrafficDailyRollup.depth_sum,
+                TrafficDailyRollup.bounce_rate_sum,
+                TrafficDailyRollup.return_rate_sum,
+                TrafficDailyRollup.row_count,
+            ],
+            TrafficDailyRollup.date,
+            [
+                TrafficDailyRollup.library_id == library_id,
+                TrafficDailyRollup.exclude_robots == exclude_robots,
+            ],
+            date_from, date_to, prev_from, prev_to,
+        )
+        cur_all, prev_all = (
+            tuple(total / sums[4] if sums[4] else 0 for total in sums[:4])
+            for sums in (cur_sums, prev_sums)
+        )
+    else:
+        filters = [
             TrafficMetric.library_id == library_id,
-            TrafficMetric.date >= d_from,
-            TrafficMetric.date <= d_to,
             TrafficMetric.exclude_robots == exclude_robots,
-        )
+        ]
         if counter_id:
-            q = q.where(TrafficMetric.counter_id == counter_id)
-        row = (await db.execute(q)).one()
-        return row[0], row[1], row[2], row[3]
+            filters.append(TrafficMetric.counter_id == counter_id)
+
+        cur_all, prev_all = await aggregate_two_periods(
+            db,
+            func.avg,
+            [
+                TrafficMetric.avg_time,
+                TrafficMetric.depth,
+                TrafficMetric.bounce_rate,
+                TrafficMetric.return_rate,
+            ],
+            TrafficMetric.date,
+            filters,
+            date_from, date_to, prev_from, prev_to,
+        )
 
-    cur_all = await _avg_behavior_all(date_from, date_to)
-    prev_all = await _avg_behavior_all(prev_from, prev_to)
+    # Timelines and period averages for all counters in two grouped queries
+    counter_ids = [c.id for c in counters]
+    timelines: dict[uuid.UUID, list[BehaviorPoint]] = defaultdict(list)
+    current_avgs: dict[uuid.UUID, tuple] = {}
 
-    # Build timeline for each counter
-    counter_timelines = []
-    for counter in counters:
-        # Get timeline data
-        timeline_q = (
+    if counter_ids:
+        counter_filters = [
+            TrafficMetric.library_id == library_id,
+            TrafficMetric.counter_id.in_(counter_ids),
+            TrafficMetric.date >= date_from,
+            TrafficMetric.date <= date_to,
+            TrafficMetric.exclude_robots == exclude_robots,
+        ]
+
+        # Per-bucket averages as sums / row counts, so full weeks/months can
+        # come from traffic_counter_period_rollups
+        timeline_rows = await aggregate_buckets(
+            db,
+            granularity,
+            date_from,
+            date_to,
+            TrafficMetric,
+            [
+                func.count(),
+                func.sum(TrafficMetric.avg_time),
+                func.sum(TrafficMetric.depth),
+                func.sum(TrafficMetric.bounce_rate),
+                func.sum(TrafficMetric.return_rate),
+            ],
+            counter_filters,
+            period_source=TrafficCounterPeriodRollup if settings.traffic_rollups_enabled else None,
+            period_columns=[
+                TrafficCounterPeriodRollup.row_count,
+                TrafficCounterPeriodRollup.avg_time_sum,
+                TrafficCounterPeriodRollup.depth_sum,
+                TrafficCounterPeriodRollup.bounce_rate_sum,
+                TrafficCounterPeriodRollup.return_rate_sum,
+            ],
+            period_filters=[
+                TrafficCounterPeriodRollup.library_id == library_id,
+                TrafficCounterPeriodRollup.counter_id.in_(counter_ids),
+                TrafficCounterPeriodRollup.exclude_robots == exclude_robots,
+            ],
+            keys=("counter_id",),
+        )
+        for counter, bucket, row_count, *sums in timeline_rows:
+            avg_time, depth, bounce_rate, return_rate = (total / row_count for total in sums)
+            timelines[counter].append(
+                BehaviorPoint(
+                    date=bucket,
+                    avg_time=round(avg_time, 1),
+                    depth=round(depth, 2),
+                    bounce_rate=round(bounce_rate, 1),
+                    return_rate=round(return_rate, 1),
+                )
+            )
+
+        current_q = (
             select(
-                TrafficMetric.date,
+                TrafficMetric.counter_id,
                 func.avg(TrafficMetric.avg_time),
                 func.avg(TrafficMetric.depth),
                 func.avg(TrafficMetric.bounce_rate),
                 func.avg(TrafficMetric.return_rate),
             )
-            .where(
-                TrafficMetric.library_id == library_id,
-                TrafficMetric.counter_id == counter.id,
-                TrafficMetric.date >= date_from,
-                TrafficMetric.date <= date_to,
-                TrafficMetric.exclude_robots == exclude_robots,
-            )
-            .group_by(TrafficMetric.date)
-            .order_by(TrafficMetric.date)
-        )
-        rows = (await db.execute(timeline_q)).all()
-
-        timeline = [
-            BehaviorPoint(
-                date=r[0],
-                avg_time=round(r[1], 1),
-                depth=round(r[2], 2),
-                bounce_rate=round(r[3], 1),
-                return_rate=round(r[4], 1),
-            )
-            for r in rows
-        ]
-
-        # Get current period averages for this counter
-        current_q = select(
-            func.coalesce(func.avg(TrafficMetric.avg_time), 0),
-            func.coalesce(func.avg(TrafficMetric.depth), 0),
-            func.coalesce(func.avg(TrafficMetric.bounce_rate), 0),
-            func.coalesce(func.avg(TrafficMetric.return_rate), 0),
-        ).where(
-            TrafficMetric.library_id == library_id,
-            TrafficMetric.counter_id == counter.id,
-            TrafficMetric.date >= date_from,
-            TrafficMetric.date <= date_to,
-            TrafficMetric.exclude_robots == exclude_robots,
+            .where(*counter_filters)
+            .group_by(TrafficMetric.counter_id)
         )
-        current_row = (await db.execute(current_q)).one()
+        for r in (await db.execute(current_q)).all():
+            current_avgs[r[0]] = (r[1], r[2], r[3], r[4])
 
+    counter_timelines = []
+    for counter in counters:
+        current_row = current_avgs.get(counter.id, (0, 0, 0, 0))
         counter_timelines.append(
             CounterBehaviorTimeline(
                 counter_id=counter.id,
                 counter_name=counter.name,
-                timeline=timeline,
+                timeline=timelines.get(counter.id, []),
                 current_avg_time=round(current_row[0], 1),
                 current_depth=round(current_row[1], 2),
                 current_bounce_rate=round(current_row[2], 1),
@@ -270,43 +344,34 @@ async def get_engagement(
     period: Period,
     date_from_custom: date | None = None,
     date_to_custom: date | None = None,
+    granularity: Granularity = Granularity.auto,
 ) -> EngagementData:
     date_from, date_to, prev_from, prev_to = resolve_period_or_custom(period, date_from_custom, date_to_custom)
+    granularity = resolve_granularity(granularity, date_from, date_to)
+
+    cur, prev = await aggregate_two_periods(
+        db,
+        func.sum,
+        [EngagementMetric.likes, EngagementMetric.reposts, EngagementMetric.comments],
+        EngagementMetric.date,
+        [EngagementMetric.library_id == library_id],
+        date_from, date_to, prev_from, prev_to,
+    )
 
-    async def _sum_engagement(d_from, d_to):
-        q = select(
-            func.coalesce(func.sum(EngagementMetric.likes), 0),
-            func.coalesce(func.sum(EngagementMetric.reposts), 0),
-            func.coalesce(func.sum(EngagementMetric.comments), 0),
-        ).where(
-            EngagementMetric.library_id == library_id,
-            EngagementMetric.date >= d_from,
-            EngagementMetric.date <= d_to,
-        )
-        row = (await db.execute(q)).one()
-        return row[0], row[1], row[2]
-
-    cur = await _sum_engagement(date_from, date_to)
-    prev = await _sum_engagement(prev_from, prev_to)
-
-    # Timeline
-    q = (
-        select(
-            EngagementMetric.date,
+    # Timeline (engagement is entered by hand, a few rows a day: bucketed straight from the table)
+    rows = await aggregate_buckets(
+        db,
+        granularity,
+        date_from,
+        date_to,
+        EngagementMetric,
+        [
             func.sum(EngagementMetric.likes),
             func.sum(EngagementMetric.reposts),
             func.sum(EngagementMetric.comments),
-        )
-        .where(
-            EngagementMetric.library_id == library_id,
-            EngagementMetric.date >= date_from,
-            EngagementMetric.date <= date_to,
-        )
-        .group_by(EngagementMetric.date)
-        .order_by(EngagementMetric.date)
+        ],
+        [EngagementMetric.library_id == library_id],
     )
-
-    rows = (await db.execute(q)).all()
     timeline = [
         EngagementPoint(date=r[0], likes=r[1], reposts=r[2], comments=r[3])
         for r in rows
@@ -332,26 +397,17 @@ async def get_reviews(
     count_q = select(func.count()).select_from(Review).where(Review.library_id == library_id)
     total = (await db.execute(count_q)).scalar() or 0
 
+    # Only the ReviewItem columns, as plain rows (no Review entities)
     q = (
-        select(Review)
+        select(Review.id, Review.platform, Review.date, Review.rating, Review.text, Review.sentiment)
         .where(Review.library_id == library_id)
         .order_by(Review.date.desc())
         .limit(limit)
         .offset(offset)
     )
-    rows = (await db.execute(q)).scalars().all()
+    rows = (await db.execute(q)).all()
 
     return ReviewsResponse(
-        items=[
-            ReviewItem(
-                id=r.id,
-                platform=r.platform,
-                date=r.date,
-                rating=r.rating,
-                text=r.text,
-                sentiment=r.sentiment,
-            )
-            for r in rows
-        ],
+        items=[ReviewItem(**r._mapping) for r in rows],
         total=total,
     )
@@ -0,0 +1,72 @@
+"""
+Shared HTTP client
+
+One connection-pooled httpx.AsyncClient for the whole app, opened in the FastAPI
+lifespan, so Yandex API calls reuse keep-alive connections (and HTTP/2 when the
+`h2` package is installed) instead of paying a TLS handshake per sync.
+Auth headers are passed per request, never set on the client.
+"""
+
+import logging
+
+import httpx
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_client: httpx.AsyncClient | None = None
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _create_client() -> httpx.AsyncClient:
+    http2 = settings.http_client_http2
+    if http2 and not _http2_available():
+        logger.warning("HTTP/2 requested but 'h2' is not installed, falling back to HTTP/1.1")
+        http2 = False
+
+    return httpx.AsyncClient(
+        http2=http2,
+        timeout=settings.http_client_timeout_seconds,
+        limits=httpx.Limits(
+            max_connections=settings.http_client_max_connections,
+            max_keepalive_connections=settings.http_client_max_keepalive_connections,
+            keepalive_expiry=settings.http_client_keepalive_expiry_seconds,
+        ),
+    )
+
+
+async def start_http_client() -> httpx.AsyncClient:
+    """Open the shared client (called from the app lifespan)"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _create_client()
+    return _client
+
+
+async def close_http_client() -> None:
+    """Close the shared client and its pooled connections"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Return the shared client
+
+    Created lazily when used outside the app lifespan (scripts, benchmarks);
+    the owner is then responsible for calling close_http_client().
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _create_client()
+    return _client
@@ -1,6 +1,7 @@
 from datetime import date, timedelta
 
-from app.schemas.dashboard import Period
+from app.config import settings
+from app.schemas.dashboard import Granularity, Period
 
 
 def resolve_period(period: Period) -> tuple[date, date, date, date]:
@@ -55,3 +56,51 @@ def calc_delta_pct(current: float, previous: float) -> float | None:
     if previous == 0:
         return None
     return round((current - previous) / previous * 100, 1)
+
+
+def bucket_start(day: date, granularity: Granularity) -> date:
+    """First day of the week (Monday) or month containing `day`"""
+    if granularity == Granularity.week:
+        return day - timedelta(days=day.weekday())
+    if granularity == Granularity.month:
+        return day.replace(day=1)
+    return day
+
+
+def bucket_end(day: date, granularity: Granularity) -> date:
+    """Last day of the week or month containing `day`"""
+    if granularity == Granularity.week:
+        return bucket_start(day, granularity) + timedelta(days=6)
+    if granularity == Granularity.month:
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    return day
+
+
+def bucket_count(date_from: date, date_to: date, granularity: Granularity) -> int:
+    """Number of points a series over [date_from, date_to] has at this granularity"""
+    if granularity == Granularity.week:
+        return (bucket_start(date_to, granularity) - bucket_start(date_from, granularity)).days // 7 + 1
+    if granularity == Granularity.month:
+        return (date_to.year - date_from.year) * 12 + date_to.month - date_from.month + 1
+    return (date_to - date_from).days + 1
+
+
+def resolve_granularity(granularity: Granularity, date_from: date, date_to: date) -> Granularity:
+    """Auto: the finest level that keeps a series within settings.trend_max_points"""
+    if granularity != Granularity.auto:
+        return granularity
+    for candidate in (Granularity.day, Granularity.week):
+        if bucket_count(date_from, date_to, candidate) <= settings.trend_max_points:
+            return candidate
+    return Granularity.month
+
+
+def full_buckets(date_from: date, date_to: date, granularity: Granularity) -> tuple[date, date] | None:
+    """Span of the weeks/months lying entirely inside [date_from, date_to], None if there are none"""
+    start = bucket_start(date_from, granularity)
+    if start < date_from:
+        start = bucket_end(date_from, granularity) + timedelta(days=1)
+    end = bucket_end(date_to, granularity)
+    if end > date_to:
+        end = bucket_start(date_to, granularity) - timedelta(days=1)
+    return (start, end) if start <= end else None
@@ -0,0 +1,253 @@
+"""
+Response cache for the public dashboard endpoints
+
+Dashboard data only changes when a sync or backfill writes metrics, a VK
+upload finishes or is deleted, or an admin edits data. Each of those writes
+calls invalidate_library(), which bumps the library's data version
+("<epoch>.<generation>"; the random epoch keeps versions from repeating
+after a restart or a Redis flush). Responses are cached per (library, data
+version, endpoint, normalized query params), so stale entries are never read
+again and simply age out of the LRU / TTL. The same key, hashed, is the
+response's strong ETag: a matching If-None-Match gets 304 Not Modified.
+
+Backends: an in-process LRU with TTL (default), or Redis when
+settings.cache_redis_url is set (`pip install ".[cache]"`), which shares
+entries and generations between processes.
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import secrets
+import time
+import uuid
+from collections import OrderedDict
+from datetime import date
+from enum import Enum
+from typing import Any, Callable
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+from app.config import settings
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # optional dependency
+    redis_asyncio = None
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryCacheBackend:
+    """In-process LRU with a per-entry TTL"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._generations: dict[str, int] = {}
+        self._epoch = secrets.token_hex(4)
+
+    async def get(self, key: str) -> str | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def version(self, library_key: str) -> str:
+        return f"{self._epoch}.{self._generations.get(library_key, 0)}"
+
+    async def bump_generation(self, library_key: str) -> int:
+        self._generations[library_key] = self._generations.get(library_key, 0) + 1
+        return self._generations[library_key]
+
+    async def close(self) -> None:
+        self._entries.clear()
+
+
+class RedisCacheBackend:
+    """Shared backend: entries with SETEX, generations with INCR, epoch set once with SET NX"""
+
+    def __init__(self, url: str, ttl_seconds: float, prefix: str = "libbord:cache:"):
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self._redis = redis_asyncio.from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> str | None:
+        return await self._redis.get(self.prefix + key)
+
+    async def set(self, key: str, value: str) -> None:
+        await self._redis.set(self.prefix + key, value, ex=int(self.ttl_seconds))
+
+    async def version(self, library_key: str) -> str:
+        epoch_key = f"{self.prefix}epoch"
+        epoch, generation = await self._redis.mget(epoch_key, f"{self.prefix}gen:{library_key}")
+        if epoch is None:
+            await self._redis.set(epoch_key, secrets.token_hex(4), nx=True)
+            epoch = await self._redis.get(epoch_key)
+        return f"{epoch}.{generation or 0}"
+
+    async def bump_generation(self, library_key: str) -> int:
+        return await self._redis.incr(f"{self.prefix}gen:{library_key}")
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+_backend: MemoryCacheBackend | RedisCacheBackend | None = None
+
+
+def get_cache_backend() -> MemoryCacheBackend | RedisCacheBackend:
+    """Backend chosen from settings, created on first use"""
+    global _backend
+    if _backend is None:
+        if settings.cache_redis_url and redis_asyncio is not None:
+            _backend = RedisCacheBackend(settings.cache_redis_url, settings.response_cache_ttl_seconds)
+        else:
+            if settings.cache_redis_url:
+                logger.warning("CACHE_REDIS_URL is set but redis is not installed, using in-process cache")
+            _backend = MemoryCacheBackend(
+                settings.response_cache_max_entries, settings.response_cache_ttl_seconds
+            )
+    return _backend
+
+
+async def close_cache_backend() -> None:
+    global _backend
+    if _backend is not None:
+        await _backend.close()
+        _backend = None
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (uuid.UUID, date)):
+        return str(value)
+    return value
+
+
+def params_hash(params: dict[str, Any]) -> str:
+    """Stable hash of query params (order-independent, enums/UUIDs/dates as strings)"""
+    normalized = {name: _normalize(value) for name, value in params.items()}
+    # Relative periods ("month", ...) resolve against today
+    normalized["_today"] = str(date.today())
+    encoded = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()[:32]
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """If-None-Match check (weak comparison, as RFC 9110 requires for it)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(","))
+
+
+async def invalidate_library(library_id: uuid.UUID) -> None:
+    """Drop every cached response of a library; call after committing a data change"""
+    try:
+        await get_cache_backend().bump_generation(str(library_id))
+    except Exception as e:
+        logger.warning(f"Failed to invalidate response cache for library {library_id}: {e}")
+
+
+# Extra parameters injected into cached endpoints for conditional requests
+_REQUEST_PARAM = "cache_request"
+_RESPONSE_PARAM = "cache_response"
+
+
+def cached_response(
+    endpoint: str,
+    exclude: tuple[str, ...] = ("db",),
+    normalize: dict[str, Callable[[Any], Any]] | None = None,
+):
+    """
+    Cache a dashboard endpoint's JSON response per library and query params
+
+    The endpoint must take `library_id`; parameters listed in `exclude`
+    (dependencies such as the session) are not part of the key, and values of
+    parameters in `normalize` are mapped through it first, so equivalent
+    spellings share one entry and ETag. Hits are
+    returned as ready-made JSON without running the endpoint, so they never
+    touch the database. Every response carries a strong ETag for the data
+    version and params, and a matching If-None-Match short-circuits to 304.
+    Errors (HTTPException) are neither cached nor tagged.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(**kwargs):
+            request: Request = kwargs.pop(_REQUEST_PARAM)
+            response: Response = kwargs.pop(_RESPONSE_PARAM)
+            if not settings.response_cache_enabled and not settings.response_etag_enabled:
+                return await func(**kwargs)
+
+            library_id = kwargs["library_id"]
+            params = {name: value for name, value in kwargs.items() if name not in exclude}
+            for name, normalizer in (normalize or {}).items():
+                params[name] = normalizer(params[name])
+            backend = get_cache_backend()
+            try:
+                version = await backend.version(str(library_id))
+            except Exception as e:
+                logger.warning(f"Response cache unavailable, serving {endpoint} uncached: {e}")
+                return await func(**kwargs)
+
+            key = f"{library_id}:{version}:{endpoint}:{params_hash(params)}"
+            headers = {}
+            if settings.response_etag_enabled:
+                etag = f'"{hashlib.sha256(key.encode()).hexdigest()[:32]}"'
+                # Clients must revalidate, which costs them a 304 at most
+                headers = {"ETag": etag, "Cache-Control": "no-cache"}
+                if etag_matches(request.headers.get("if-none-match"), etag):
+                    return Response(status_code=304, headers=headers)
+
+            cached = None
+            if settings.response_cache_enabled:
+                try:
+                    cached = await backend.get(key)
+                except Exception as e:
+                    logger.warning(f"Response cache unavailable, serving {endpoint} uncached: {e}")
+            if cached is not None:
+                return Response(content=cached, media_type="application/json", headers=headers)
+
+            result = await func(**kwargs)
+            response.headers.update(headers)
+            if settings.response_cache_enabled:
+                body = json.dumps(
+                    jsonable_encoder(result), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+                )
+                try:
+                    await backend.set(key, body)
+                except Exception as e:
+                    logger.warning(f"Failed to store {endpoint} in response cache: {e}")
+            return result
+
+        # FastAPI reads the signature: expose the endpoint's parameters plus the
+        # request (for If-None-Match) and response (for headers on a miss)
+        signature = inspect.signature(func)
+        wrapper.__signature__ = signature.replace(parameters=[
+            *signature.parameters.values(),
+            inspect.Parameter(_REQUEST_PARAM, inspect.Parameter.KEYWORD_ONLY, annotation=Request),
+            inspect.Parameter(_RESPONSE_PARAM, inspect.Parameter.KEYWORD_ONLY, annotation=Response),
+        ])
+        return wrapper
+
+    return decorator
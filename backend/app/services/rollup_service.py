@@ -0,0 +1,243 @@
+"""
+Traffic rollups
+
+Keeps traffic_daily_rollups (per library) and traffic_channel_daily_rollups
+(per channel) in step with traffic_metrics: every write path rebuilds the
+affected dates with DELETE + INSERT ... SELECT inside its own transaction.
+The dashboard reads the rollups whenever no counter filter is applied.
+
+Weekly and monthly rollups (traffic_channel_period_rollups per channel,
+traffic_counter_period_rollups per counter) are rebuilt in the same pass for
+every week/month touching the refreshed dates; long-range trends read them
+instead of one row per day.
+"""
+
+import logging
+import uuid
+from datetime import date
+
+from sqlalchemy import delete, exists, func, insert, literal, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import async_session
+from app.models.library import Library
+from app.models.traffic_metric import TrafficMetric
+from app.models.traffic_rollup import (
+    TrafficChannelDailyRollup,
+    TrafficChannelPeriodRollup,
+    TrafficCounterPeriodRollup,
+    TrafficDailyRollup,
+)
+from app.schemas.dashboard import Granularity
+from app.services.aggregates import date_bucket
+from app.services.period import bucket_end, bucket_start
+
+logger = logging.getLogger(__name__)
+
+PERIOD_GRANULARITIES = (Granularity.week, Granularity.month)
+
+
+def _date_range(date_column, date_from: date | None, date_to: date | None) -> list:
+    conditions = []
+    if date_from is not None:
+        conditions.append(date_column >= date_from)
+    if date_to is not None:
+        conditions.append(date_column <= date_to)
+    return conditions
+
+
+async def refresh_traffic_rollups(
+    db: AsyncSession,
+    library_id: uuid.UUID,
+    date_from: date | None = None,
+    date_to: date | None = None,
+) -> None:
+    """
+    Rebuild a library's rollup rows for [date_from, date_to] from traffic_metrics
+
+    Omitted bounds mean the whole history. Runs in the caller's transaction
+    (the caller commits); concurrent refreshes of one library are serialized
+    with a transaction-level advisory lock.
+    """
+    await db.execute(select(func.pg_advisory_xact_lock(func.hashtext(f"traffic_rollups:{library_id}"))))
+
+    source_filters = [
+        TrafficMetric.library_id == library_id,
+        *_date_range(TrafficMetric.date, date_from, date_to),
+    ]
+
+    await db.execute(
+        delete(TrafficDailyRollup).where(
+            TrafficDailyRollup.library_id == library_id,
+            *_date_range(TrafficDailyRollup.date, date_from, date_to),
+        )
+    )
+    await db.execute(
+        insert(TrafficDailyRollup).from_select(
+            [
+                "library_id", "exclude_robots", "date", "views", "visits", "users",
+                "row_count", "avg_time_sum", "depth_sum", "bounce_rate_sum", "return_rate_sum",
+            ],
+            select(
+                TrafficMetric.library_id,
+                TrafficMetric.exclude_robots,
+                TrafficMetric.date,
+                func.coalesce(func.sum(TrafficMetric.views), 0),
+                func.coalesce(func.sum(TrafficMetric.visits), 0),
+                func.coalesce(func.sum(TrafficMetric.users), 0),
+                func.count(),
+                func.coalesce(func.sum(TrafficMetric.avg_time), 0),
+                func.coalesce(func.sum(TrafficMetric.depth), 0),
+                func.coalesce(func.sum(TrafficMetric.bounce_rate), 0),
+                func.coalesce(func.sum(TrafficMetric.return_rate), 0),
+            )
+            .where(*source_filters)
+            .group_by(TrafficMetric.library_id, TrafficMetric.exclude_robots, TrafficMetric.date),
+        )
+    )
+
+    await db.execute(
+        delete(TrafficChannelDailyRollup).where(
+            TrafficChannelDailyRollup.library_id == library_id,
+            *_date_range(TrafficChannelDailyRollup.date, date_from, date_to),
+        )
+    )
+    await db.execute(
+        insert(TrafficChannelDailyRollup).from_select(
+            ["library_id", "channel_id", "exclude_robots", "date", "views", "visits", "users"],
+            select(
+                TrafficMetric.library_id,
+                TrafficMetric.channel_id,
+                TrafficMetric.exclude_robots,
+                TrafficMetric.date,
+                func.coalesce(func.sum(TrafficMetric.views), 0),
+                func.coalesce(func.sum(TrafficMetric.visits), 0),
+                func.coalesce(func.sum(TrafficMetric.users), 0),
+            )
+            .where(*source_filters)
+            .group_by(
+                TrafficMetric.library_id,
+                TrafficMetric.channel_id,
+                TrafficMetric.exclude_robots,
+                TrafficMetric.date,
+            ),
+        )
+    )
+
+    for granularity in PERIOD_GRANULARITIES:
+        await _refresh_period_rollups(db, library_id, granularity, date_from, date_to)
+
+
+async def _refresh_period_rollups(
+    db: AsyncSession,
+    library_id: uuid.UUID,
+    granularity: Granularity,
+    date_from: date | None,
+    date_to: date | None,
+) -> None:
+    """Rebuild every week/month of a library touching [date_from, date_to], in whole buckets"""
+    bucket_from = bucket_start(date_from, granularity) if date_from is not None else None
+    bucket_to = bucket_end(date_to, granularity) if date_to is not None else None
+
+    # Channels: from the daily channel rollups, which are current for the whole bucket
+    channel_bucket = date_bucket(TrafficChannelDailyRollup.date, granularity)
+    await db.execute(
+        delete(TrafficChannelPeriodRollup).where(
+            TrafficChannelPeriodRollup.library_id == library_id,
+            TrafficChannelPeriodRollup.granularity == granularity.value,
+            *_date_range(TrafficChannelPeriodRollup.period_start, bucket_from, bucket_to),
+        )
+    )
+    await db.execute(
+        insert(TrafficChannelPeriodRollup).from_select(
+            [
+                "library_id", "channel_id", "exclude_robots", "granularity", "period_start",
+                "views", "visits", "users",
+            ],
+            select(
+                TrafficChannelDailyRollup.library_id,
+                TrafficChannelDailyRollup.channel_id,
+                TrafficChannelDailyRollup.exclude_robots,
+                literal(granularity.value),
+                channel_bucket,
+                func.sum(TrafficChannelDailyRollup.views),
+                func.sum(TrafficChannelDailyRollup.visits),
+                func.sum(TrafficChannelDailyRollup.users),
+            )
+            .where(
+                TrafficChannelDailyRollup.library_id == library_id,
+                *_date_range(TrafficChannelDailyRollup.date, bucket_from, bucket_to),
+            )
+            .group_by(
+                TrafficChannelDailyRollup.library_id,
+                TrafficChannelDailyRollup.channel_id,
+                TrafficChannelDailyRollup.exclude_robots,
+                channel_bucket,
+            ),
+        )
+    )
+
+    # Counters: behavior sums from the raw rows
+    counter_bucket = date_bucket(TrafficMetric.date, granularity)
+    await db.execute(
+        delete(TrafficCounterPeriodRollup).where(
+            TrafficCounterPeriodRollup.library_id == library_id,
+            TrafficCounterPeriodRollup.granularity == granularity.value,
+            *_date_range(TrafficCounterPeriodRollup.period_start, bucket_from, bucket_to),
+        )
+    )
+    await db.execute(
+        insert(TrafficCounterPeriodRollup).from_select(
+            [
+                "library_id", "counter_id", "exclude_robots", "granularity", "period_start",
+                "row_count", "avg_time_sum", "depth_sum", "bounce_rate_sum", "return_rate_sum",
+            ],
+            select(
+                TrafficMetric.library_id,
+                TrafficMetric.counter_id,
+                TrafficMetric.exclude_robots,
+                literal(granularity.value),
+                counter_bucket,
+                func.count(),
+                func.coalesce(func.sum(TrafficMetric.avg_time), 0),
+                func.coalesce(func.sum(TrafficMetric.depth), 0),
+                func.coalesce(func.sum(TrafficMetric.bounce_rate), 0),
+                func.coalesce(func.sum(TrafficMetric.return_rate), 0),
+            )
+            .where(
+                TrafficMetric.library_id == library_id,
+                TrafficMetric.counter_id.is_not(None),
+                *_date_range(TrafficMetric.date, bucket_from, bucket_to),
+            )
+            .group_by(
+                TrafficMetric.library_id,
+                TrafficMetric.counter_id,
+                TrafficMetric.exclude_robots,
+                counter_bucket,
+            ),
+        )
+    )
+
+
+async def ensure_traffic_rollups() -> int:
+    """
+    Build rollups for libraries that have traffic but none yet; returns how many
+
+    Covers databases where the tables were created by create_all instead of
+    migrations 009/010 (which also fill them).
+    """
+    async with async_session() as db:
+        q = select(Library.id).where(
+            exists().where(TrafficMetric.library_id == Library.id),
+            or_(
+                ~exists().where(TrafficDailyRollup.library_id == Library.id),
+                ~exists().where(TrafficChannelPeriodRollup.library_id == Library.id),
+            ),
+        )
+        library_ids = (await db.execute(q)).scalars().all()
+
+        for library_id in library_ids:
+            logger.info(f"Building traffic rollups for library {library_id}")
+            await refresh_traffic_rollups(db, library_id)
+            await db.commit()
+    return len(library_ids)
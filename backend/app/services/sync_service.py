@@ -1,43 +1,150 @@
 from __future__ import annotations
 
+import asyncio
 import datetime
 import logging
 import uuid
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.dialects.postgresql import insert
 
+from app.config import settings
 from app.models.yandex_token import YandexToken
 from app.models.metric_counter import MetricCounter, SyncStatus
 from app.models.traffic_metric import TrafficMetric
 from app.models.channel import Channel
+from app.services.bulk_upsert import upsert_rows
+from app.services.response_cache import invalidate_library
+from app.services.rollup_service import refresh_traffic_rollups
 from app.services.yandex_metrika import YandexMetrikaService
 
 logger = logging.getLogger(__name__)
 
+# Metric columns written from a fetch_metrics() day entry
+TRAFFIC_METRIC_FIELDS = [
+    "views",
+    "visits",
+    "users",
+    "avg_time",
+    "depth",
+    "bounce_rate",
+    "return_rate",
+]
+
 
 async def sync_library_metrics(
     db: AsyncSession,
     library_id: uuid.UUID,
     date_from: datetime.date | None = None,
     date_to: datetime.date | None = None,
+    incremental: bool = True,
 ) -> None:
     """
     Синхронизация метрик для библиотеки из Яндекс.Метрики
 
+    Если date_from не задан, окно загрузки считается для каждого счётчика отдельно:
+    в инкрементальном режиме — от synced_through минус settings.sync_restatement_days
+    (Метрика уточняет данные задним числом), для новых счётчиков и при
+    incremental=False — последние settings.sync_full_window_days дней.
+
     1. Получить токен для библиотеки
     2. Проверить срок действия токена, обновить при необходимости
     3. Получить все активные счётчики библиотеки
-    4. Для каждого счётчика:
-       a. Обновить sync_status на 'syncing'
-       b. Получить метрики за указанный период (по умолчанию: последние 7 дней)
-       c. Сохранить метрики в traffic_metrics (upsert)
-       d. Обновить last_sync_at, sync_status='success'
+    4. Для всех счётчиков:
+       a. Сопоставить с каналом, обновить sync_status на 'syncing'
+       b. Параллельно получить метрики за окно счётчика,
+          не более settings.yandex_max_concurrent_requests запросов одновременно
+       c. Последовательно сохранить метрики в traffic_metrics (пакетный upsert)
+          и в той же транзакции пересчитать агрегаты (traffic_*_rollups) за окно счётчика
+       d. Обновить last_sync_at, sync_status='success' и synced_through
+          (только если окно примыкает к нему: ручной прошлый период не сдвигает его)
     5. Обработать ошибки: sync_status='error', sync_error_message
+    6. Сбросить кэш ответов дашборда библиотеки
     """
     logger.info(f"Starting sync for library {library_id}")
 
-    # 1. Get Yandex token for library
+    # 1-2. Get Yandex token for library, refreshing it if expired
+    token = await get_valid_token(db, library_id)
+    if not token:
+        return
+
+    # 3. Get all active counters and match them to channels
+    matched, unmatched = await load_matched_counters(db, library_id)
+    if not matched and not unmatched:
+        return
+
+    effective_date_to = date_to or datetime.date.today()
+
+    # 4a. Mark counters as syncing (or as errored when no channel matched)
+    for counter in unmatched:
+        counter_name = (counter.name or "").strip()
+        counter.sync_status = SyncStatus.ERROR
+        counter.sync_error_message = f"No matching channel for '{counter_name}'"
+    for counter, _ in matched:
+        counter.sync_status = SyncStatus.SYNCING
+        counter.sync_error_message = None
+    await db.commit()
+
+    if not matched:
+        logger.info(f"No counters with matching channels for library {library_id}")
+        return
+
+    jobs = []
+    for counter, _ in matched:
+        counter_date_from = date_from or _incremental_date_from(counter, effective_date_to, incremental)
+        logger.info(
+            f"Fetching metrics for counter {counter.id} from {counter_date_from} to {effective_date_to}"
+            f" ({(effective_date_to - counter_date_from).days + 1} days)"
+        )
+        jobs.append((counter, counter_date_from, effective_date_to))
+
+    # 4b. Fetch all counters (both robot variants) concurrently
+    async with YandexMetrikaService(token.access_token) as ym_service:
+        results = await fetch_counters_concurrently(ym_service, jobs)
+
+    # 4c. Single writer: upsert metrics, rebuild rollups and update status per counter
+    for (counter, channel), result, (_, counter_date_from, _) in zip(matched, results, jobs):
+        try:
+            if isinstance(result, BaseException):
+                raise result
+            metrics_data, metrics_data_with_robots = result
+
+            # Savepoint: a failed upsert must not abort the other counters' writes.
+            # Rollups commit together with the metrics, so they never lag behind
+            # (a failure leaves synced_through as is and the next sync retries the window)
+            async with db.begin_nested():
+                await write_counter_metrics(
+                    db, library_id, counter, channel, metrics_data, metrics_data_with_robots,
+                )
+                await refresh_traffic_rollups(db, library_id, counter_date_from, effective_date_to)
+
+            counter.sync_status = SyncStatus.SUCCESS
+            counter.last_sync_at = datetime.datetime.utcnow()
+            _advance_synced_through(counter, counter_date_from, effective_date_to)
+            counter.sync_error_message = None
+            await db.commit()
+
+            logger.info(
+                f"Successfully synced counter {counter.id}: "
+                f"{len(metrics_data)} days (filtered), "
+                f"{len(metrics_data_with_robots)} days (with robots)"
+            )
+
+        except Exception as e:
+            logger.error(f"Error syncing counter {counter.id}: {e}", exc_info=True)
+
+            # Set error status
+            counter.sync_status = SyncStatus.ERROR
+            counter.sync_error_message = str(e)[:500]  # Truncate to 500 chars
+            await db.commit()
+
+    # 6. Cached dashboard responses of the library are stale now
+    await invalidate_library(library_id)
+
+    logger.info(f"Finished sync for library {library_id}")
+
+
+async def get_valid_token(db: AsyncSession, library_id: uuid.UUID) -> YandexToken | None:
+    """Return the library's Yandex token, refreshing it first if it has expired"""
     result = await db.execute(
         select(YandexToken).where(YandexToken.library_id == library_id)
     )
@@ -45,9 +152,8 @@ async def sync_library_metrics(
 
     if not token:
         logger.warning(f"No Yandex token found for library {library_id}")
-        return
+        return None
 
-    # 2. Check token expiry and refresh if needed
     now = datetime.datetime.utcnow()
     expires_at = token.expires_at.replace(tzinfo=None) if token.expires_at and token.expires_at.tzinfo else token.expires_at
     if expires_at and expires_at < now:
@@ -67,9 +173,20 @@ async def sync_library_metrics(
             logger.info("Token refreshed successfully")
         except Exception as e:
             logger.error(f"Failed to refresh token: {e}")
-            return
+            return None
+
+    return token
+
+
+async def load_matched_counters(
+    db: AsyncSession,
+    library_id: uuid.UUID,
+) -> tuple[list[tuple[MetricCounter, Channel]], list[MetricCounter]]:
+    """
+    Load active counters and match each one to a non-manual channel by name
 
-    # 3. Get all active counters for library
+    Returns ([(counter, channel), ...], [counters without a matching channel]).
+    """
     result = await db.execute(
         select(MetricCounter).where(
             MetricCounter.library_id == library_id, MetricCounter.is_active == True
@@ -79,7 +196,7 @@ async def sync_library_metrics(
 
     if not counters:
         logger.info(f"No active counters found for library {library_id}")
-        return
+        return [], []
 
     # Get all non-manual channels and build name->channel map
     channels_result = await db.execute(
@@ -96,116 +213,136 @@ async def sync_library_metrics(
 
     logger.info(f"Found {len(counters)} active counters, {len(all_channels)} channels to sync")
 
-    # 4. Sync each counter
-    async with YandexMetrikaService(token.access_token) as ym_service:
-        for counter in counters:
-            try:
-                logger.info(f"Syncing counter {counter.id} ({counter.name})")
-
-                # a. Set syncing status
-                counter.sync_status = SyncStatus.SYNCING
-                counter.sync_error_message = None
-                await db.commit()
-
-                # b. Fetch metrics for the requested period (default: last 7 days)
-                effective_date_to = date_to or datetime.date.today()
-                effective_date_from = date_from or (effective_date_to - datetime.timedelta(days=7))
-
-                logger.info(
-                    f"Fetching metrics from {effective_date_from} to {effective_date_to}"
-                    f" ({(effective_date_to - effective_date_from).days + 1} days)"
-                )
+    matched: list[tuple[MetricCounter, Channel]] = []
+    unmatched: list[MetricCounter] = []
+    for counter in counters:
+        channel = _match_channel(counter, all_channels, channel_by_name)
+        if channel:
+            matched.append((counter, channel))
+        else:
+            logger.warning(f"No matching channel found for counter '{(counter.name or '').strip()}'")
+            unmatched.append(counter)
+    return matched, unmatched
 
-                # Fetch metrics both with and without robot filter
-                metrics_data = await ym_service.fetch_metrics(
-                    counter.yandex_counter_id, effective_date_from, effective_date_to,
-                    exclude_robots=True,
-                )
-                metrics_data_with_robots = await ym_service.fetch_metrics(
-                    counter.yandex_counter_id, effective_date_from, effective_date_to,
-                    exclude_robots=False,
-                )
 
-                # Match counter to its channel by name
-                counter_name = (counter.name or "").strip()
-                channel = channel_by_name.get(counter_name)
-
-                if not channel and all_channels:
-                    # Fallback: try to find by partial match
-                    for ch in all_channels:
-                        ch_name = (ch.custom_name or "").strip()
-                        if ch_name and counter_name and (
-                            ch_name in counter_name or counter_name in ch_name
-                        ):
-                            channel = ch
-                            break
-
-                if not channel:
-                    logger.warning(f"No matching channel found for counter '{counter_name}'")
-                    counter.sync_status = SyncStatus.ERROR
-                    counter.sync_error_message = f"No matching channel for '{counter_name}'"
-                    await db.commit()
-                    continue
-
-                # c. Upsert traffic metrics — both with and without robot filter
-                all_datasets = [
-                    (metrics_data, True),
-                    (metrics_data_with_robots, False),
-                ]
-                for dataset, excl_robots in all_datasets:
-                    for date_str, metrics in dataset.items():
-                        date_obj = datetime.date.fromisoformat(date_str)
-
-                        stmt = insert(TrafficMetric).values(
-                            library_id=library_id,
-                            channel_id=channel.id,
-                            counter_id=counter.id,
-                            date=date_obj,
-                            exclude_robots=excl_robots,
-                            views=metrics["views"],
-                            visits=metrics["visits"],
-                            users=metrics["users"],
-                            avg_time=metrics["avg_time"],
-                            depth=metrics["depth"],
-                            bounce_rate=metrics["bounce_rate"],
-                            return_rate=metrics["return_rate"],
-                        )
-
-                        stmt = stmt.on_conflict_do_update(
-                            constraint="uq_traffic_metric",
-                            set_={
-                                "views": stmt.excluded.views,
-                                "visits": stmt.excluded.visits,
-                                "users": stmt.excluded.users,
-                                "avg_time": stmt.excluded.avg_time,
-                                "depth": stmt.excluded.depth,
-                                "bounce_rate": stmt.excluded.bounce_rate,
-                                "return_rate": stmt.excluded.return_rate,
-                            },
-                        )
-
-                        await db.execute(stmt)
-
-                await db.commit()
-
-                # d. Update sync status
-                counter.sync_status = SyncStatus.SUCCESS
-                counter.last_sync_at = datetime.datetime.utcnow()
-                counter.sync_error_message = None
-                await db.commit()
-
-                logger.info(
-                    f"Successfully synced counter {counter.id}: "
-                    f"{len(metrics_data)} days (filtered), "
-                    f"{len(metrics_data_with_robots)} days (with robots)"
-                )
+def _incremental_date_from(
+    counter: MetricCounter,
+    date_to: datetime.date,
+    incremental: bool,
+) -> datetime.date:
+    """
+    Start of the fetch window for a counter when no explicit date_from is given
 
-            except Exception as e:
-                logger.error(f"Error syncing counter {counter.id}: {e}", exc_info=True)
+    Incremental mode resumes from the synced_through watermark minus a restatement
+    lookback, so steady-state syncs pull only the last day or two. New counters
+    (no watermark) and non-incremental syncs use the full default window.
+    """
+    full_window_from = date_to - datetime.timedelta(days=settings.sync_full_window_days)
+    if not incremental or counter.synced_through is None:
+        return full_window_from
 
-                # Set error status
-                counter.sync_status = SyncStatus.ERROR
-                counter.sync_error_message = str(e)[:500]  # Truncate to 500 chars
-                await db.commit()
+    watermark_from = counter.synced_through - datetime.timedelta(days=settings.sync_restatement_days)
+    return min(watermark_from, date_to)
 
-    logger.info(f"Finished sync for library {library_id}")
+
+def _advance_synced_through(counter: MetricCounter, date_from: datetime.date, date_to: datetime.date) -> None:
+    """
+    Move the watermark to date_to after [date_from, date_to] was written
+
+    Only windows that start at or before the day after the watermark extend it,
+    and it never moves back, so a manual sync of a past range cannot make the
+    next incremental run skip the days in between.
+    """
+    current = counter.synced_through
+    if current is None or date_from <= current + datetime.timedelta(days=1):
+        counter.synced_through = max(current or date_to, date_to)
+
+
+def _match_channel(
+    counter: MetricCounter,
+    all_channels: list[Channel],
+    channel_by_name: dict[str, Channel],
+) -> Channel | None:
+    """Match counter to its channel by name, falling back to a partial match"""
+    counter_name = (counter.name or "").strip()
+    channel = channel_by_name.get(counter_name)
+
+    if not channel and all_channels:
+        for ch in all_channels:
+            ch_name = (ch.custom_name or "").strip()
+            if ch_name and counter_name and (
+                ch_name in counter_name or counter_name in ch_name
+            ):
+                return ch
+    return channel
+
+
+async def fetch_counters_concurrently(
+    ym_service: YandexMetrikaService,
+    jobs: list[tuple[MetricCounter, datetime.date, datetime.date]],
+    semaphore: asyncio.Semaphore | None = None,
+) -> list[tuple[dict, dict] | BaseException]:
+    """
+    Fetch (filtered, with robots) datasets for every (counter, date_from, date_to) job
+
+    All requests run in parallel, bounded by settings.yandex_max_concurrent_requests
+    to stay within Metrika rate limits. Results keep the order of `jobs`; a failed
+    job yields its exception instead of a tuple so one counter cannot fail the rest.
+    Pass `semaphore` to share one request budget across several concurrent calls.
+    With settings.yandex_combined_robots_fetch both variants come from a single
+    request per counter (see YandexMetrikaService.fetch_metrics_by_robot).
+    Does not touch the database.
+    """
+    semaphore = semaphore or asyncio.Semaphore(settings.yandex_max_concurrent_requests)
+
+    async def _fetch(counter_id: str, d_from: datetime.date, d_to: datetime.date, exclude_robots: bool):
+        async with semaphore:
+            return await ym_service.fetch_metrics(counter_id, d_from, d_to, exclude_robots=exclude_robots)
+
+    async def _fetch_combined(counter_id: str, d_from: datetime.date, d_to: datetime.date):
+        async with semaphore:
+            return await ym_service.fetch_metrics_by_robot(counter_id, d_from, d_to)
+
+    async def _fetch_counter(counter: MetricCounter, d_from: datetime.date, d_to: datetime.date):
+        if settings.yandex_combined_robots_fetch:
+            return await _fetch_combined(counter.yandex_counter_id, d_from, d_to)
+        return await asyncio.gather(
+            _fetch(counter.yandex_counter_id, d_from, d_to, True),
+            _fetch(counter.yandex_counter_id, d_from, d_to, False),
+        )
+
+    return await asyncio.gather(
+        *(_fetch_counter(counter, d_from, d_to) for counter, d_from, d_to in jobs),
+        return_exceptions=True,
+    )
+
+
+async def write_counter_metrics(
+    db: AsyncSession,
+    library_id: uuid.UUID,
+    counter: MetricCounter,
+    channel: Channel,
+    metrics_data: dict,
+    metrics_data_with_robots: dict,
+) -> None:
+    """Upsert traffic metrics for one counter — both with and without robot filter"""
+    all_datasets = [
+        (metrics_data, True),
+        (metrics_data_with_robots, False),
+    ]
+    rows = [
+        {
+            "library_id": library_id,
+            "channel_id": channel.id,
+            "counter_id": counter.id,
+            "date": datetime.date.fromisoformat(date_str),
+            "exclude_robots": excl_robots,
+            **{field: metrics[field] for field in TRAFFIC_METRIC_FIELDS},
+        }
+        for dataset, excl_robots in all_datasets
+        for date_str, metrics in dataset.items()
+    ]
+    await upsert_rows(
+        db, TrafficMetric, rows, TRAFFIC_METRIC_FIELDS,
+        constraint="uq_traffic_metric",
+    )
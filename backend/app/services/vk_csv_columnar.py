@@ -0,0 +1,292 @@
+"""
+Columnar VK CSV ingestion
+
+Alternative to the row-by-row parser for very large VK exports: rows are cut
+into date / metric-name / value columns (one split per chunk, or the stdlib
+csv module in batches for irregular text) and summed per (date, metric) in one
+group-by per batch. With NumPy
+installed (`pip install ".[columnar]"`) the date, metric-name and value
+columns are dictionary-encoded (each distinct string is decoded once per batch)
+and summed with a vectorized group-by; without it the same batches are summed
+in plain Python.
+
+Output matches parse_vk_csv / VkCsvStreamParser exactly: a dict of
+date -> VkDailyMetrics. Selected with settings.vk_csv_engine = "columnar".
+"""
+
+import csv
+from datetime import date
+from itertools import islice
+from operator import itemgetter, methodcaller
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from app.services.vk_csv_service import (
+    METRIC_FIELDS,
+    METRIC_NAME_SLOTS,
+    VkCsvStreamParser,
+    VkDailyMetrics,
+    decode_date,
+)
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+# Rows summed per group-by. Kept small: holding many row lists at once makes the
+# cyclic GC rescan them repeatedly, which costs more than the vectorization saves
+DEFAULT_BATCH_ROWS = 10_000
+
+_count_semicolons = methodcaller("count", ";")
+
+
+def _first_line(field: str) -> str:
+    """Strip the next row(s) glued to a last field by the chunk-wide split"""
+    return field.partition("\n")[0]
+
+
+def _factorize(column: Sequence[str]) -> tuple[list, "np.ndarray"]:
+    """Dictionary-encode a text column: (distinct values, int code per row)"""
+    keys = list(dict.fromkeys(column))
+    index = {key: code for code, key in enumerate(keys)}
+    codes = np.fromiter(map(index.__getitem__, column), dtype=np.int64, count=len(column))
+    return keys, codes
+
+
+def _int_or_none(value: str) -> Optional[int]:
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def _aggregate_columns_numpy(
+    dates: Sequence[str],
+    names: Sequence[str],
+    values: Sequence[str],
+    daily_metrics: Dict[date, VkDailyMetrics],
+    glued_values: bool,
+) -> List[date]:
+    n_slots = len(METRIC_FIELDS)
+
+    # Dictionary-encode the columns and decode each distinct date / name / value once;
+    # exports repeat a few hundred dates, a dozen names and a small range of values
+    date_keys, date_idx = _factorize(dates)
+    name_keys, name_idx = _factorize(names)
+    value_keys, value_idx = _factorize(values)
+
+    date_objs = [decode_date(key) for key in date_keys]
+    date_valid = np.array([date_obj is not None for date_obj in date_objs], dtype=bool)
+    name_slots = np.array([METRIC_NAME_SLOTS.get(key, -1) for key in name_keys], dtype=np.int64)
+    if glued_values:
+        value_keys = list(map(_first_line, value_keys))
+    parsed_values = [_int_or_none(key) for key in value_keys]
+    value_valid = np.array([value is not None for value in parsed_values], dtype=bool)
+    value_ints = np.array([value or 0 for value in parsed_values], dtype=np.int64)
+
+    valid = value_valid[value_idx] & date_valid[date_idx]
+    row_slots = name_slots[name_idx]
+    keep = valid & (row_slots >= 0)
+
+    # Group-by (date, slot) sum; float64 weights are exact for batch totals below 2**53
+    sums = np.bincount(
+        date_idx[keep] * n_slots + row_slots[keep],
+        weights=value_ints[value_idx[keep]],
+        minlength=len(date_keys) * n_slots,
+    )
+    sums = np.rint(sums).astype(np.int64).reshape(len(date_keys), n_slots).tolist()
+
+    # Any row with a valid date and value creates the day, even for unmapped metrics
+    present = np.zeros(len(date_keys), dtype=bool)
+    present[date_idx[valid]] = True
+
+    for i in np.flatnonzero(present).tolist():
+        date_obj = date_objs[i]
+        daily = daily_metrics.get(date_obj)
+        if daily is None:
+            daily = daily_metrics[date_obj] = VkDailyMetrics(date_obj)
+        daily.values = [a + b for a, b in zip(daily.values, sums[i])]
+
+    return [date_obj for date_obj in date_objs if date_obj is not None]
+
+
+def _aggregate_columns_python(
+    dates: Sequence[str],
+    names: Sequence[str],
+    values: Sequence[str],
+    daily_metrics: Dict[date, VkDailyMetrics],
+    glued_values: bool,
+) -> List[date]:
+    sums: Dict[tuple, int] = {}
+    days = set()
+    if glued_values:
+        values = list(map(_first_line, values))
+
+    for date_str, name, value_str in zip(dates, names, values):
+        date_obj = decode_date(date_str)
+        if date_obj is None:
+            continue
+        try:
+            value = int(value_str)
+        except ValueError:
+            continue
+        days.add(date_obj)
+        slot = METRIC_NAME_SLOTS.get(name)
+        if slot is not None:
+            key = (date_obj, slot)
+            sums[key] = sums.get(key, 0) + value
+
+    for date_obj in days:
+        if date_obj not in daily_metrics:
+            daily_metrics[date_obj] = VkDailyMetrics(date_obj)
+    for (date_obj, slot), total in sums.items():
+        daily_metrics[date_obj].values[slot] += total
+
+    return [date_obj for date_obj in map(decode_date, set(dates)) if date_obj is not None]
+
+
+def aggregate_batch(rows: List[List[str]], daily_metrics: Dict[date, VkDailyMetrics]) -> List[date]:
+    """
+    Sum a batch of CSV rows (header excluded) into daily_metrics
+
+    Returns the distinct valid dates of the batch (including rows whose value
+    is invalid or that have fewer than 9 columns), for period tracking.
+    """
+    if min(map(len, rows), default=0) >= 9:
+        # Common case, every row complete: transpose the batch into columns in one go
+        columns = list(zip(*rows))
+        dates, names, values = columns[2], columns[7], columns[8]
+        seen_dates: List[date] = []
+    else:
+        full_rows = [row for row in rows if len(row) >= 9]
+        # Short rows still count towards the period, as in extract_period_from_csv
+        short_dates = {row[2] for row in rows if 3 <= len(row) < 9}
+        seen_dates = [date_obj for date_obj in map(decode_date, short_dates) if date_obj is not None]
+        if not full_rows:
+            return seen_dates
+        dates = list(map(itemgetter(2), full_rows))
+        names = list(map(itemgetter(7), full_rows))
+        values = list(map(itemgetter(8), full_rows))
+
+    return seen_dates + aggregate_columns(dates, names, values, daily_metrics)
+
+
+def aggregate_columns(
+    dates: Sequence[str],
+    names: Sequence[str],
+    values: Sequence[str],
+    daily_metrics: Dict[date, VkDailyMetrics],
+    glued_values: bool = False,
+) -> List[date]:
+    """
+    Sum date / metric-name / value columns into daily_metrics; returns the distinct valid dates
+
+    glued_values: values may carry the following line(s) after a newline
+    (see VkCsvColumnarParser._consume_columns); only the first line is used.
+    """
+    if np is not None:
+        return _aggregate_columns_numpy(dates, names, values, daily_metrics, glued_values)
+    return _aggregate_columns_python(dates, names, values, daily_metrics, glued_values)
+
+
+def parse_vk_csv_columnar(
+    file_path: str,
+    batch_rows: int = DEFAULT_BATCH_ROWS,
+) -> Dict[date, VkDailyMetrics]:
+    """Columnar equivalent of parse_vk_csv(file_path)"""
+    daily_metrics: Dict[date, VkDailyMetrics] = {}
+
+    with open(file_path, "r", encoding="utf-8") as f:
+        reader = csv.reader(f, delimiter=";")
+        next(reader)  # Skip header
+
+        while batch := list(islice(reader, batch_rows)):
+            aggregate_batch(batch, daily_metrics)
+
+    return daily_metrics
+
+
+class VkCsvColumnarParser(VkCsvStreamParser):
+    """
+    Streaming parser that aggregates whole chunks column-wise
+
+    Same feed()/finish() interface, validation and period tracking as
+    VkCsvStreamParser. Once the header and first data row are validated, each
+    fed chunk without quote characters whose rows all have exactly 9 fields is
+    cut into date / name / value columns with one str.split (no per-row csv
+    lists); other chunks fall back to csv.reader batches, so results are
+    always identical.
+    """
+
+    def __init__(self, encoding: str = "utf-8", batch_rows: int = DEFAULT_BATCH_ROWS):
+        super().__init__(encoding)
+        self._batch_rows = batch_rows
+        self._batch: List[List[str]] = []
+
+    def _consume_lines(self, lines: List[str]) -> None:
+        if self._first_row_seen and self._consume_columns(lines):
+            return
+        super()._consume_lines(lines)
+
+    def _consume_columns(self, lines: List[str]) -> bool:
+        """Fast path; returns False (having consumed nothing) if the chunk needs csv.reader"""
+        text = "\n".join(lines)
+        if '"' in text:
+            return False
+        # Only chunks where every non-blank line has exactly 9 fields
+        semicolons = list(map(_count_semicolons, lines))
+        data_lines = semicolons.count(8)
+        if data_lines + lines.count("") + lines.count("\r") != len(lines):
+            return False
+
+        self._flush()
+        self.rows_processed += data_lines
+        if not data_lines:
+            return True
+
+        # Splitting the whole chunk on ";" glues each row's last field to the next
+        # row's first one, so row k's fields 3, 8 and 9 sit at 8k+2, 8k+7 and 8k+8
+        fields = text.split(";")
+        dates = fields[2::8]
+        names = fields[7::8]
+        values = fields[8::8]
+        self._record_period(
+            aggregate_columns(dates, names, values, self.daily_metrics, glued_values=True)
+        )
+        return True
+
+    def _consume_rows(self, rows: Iterable[List[str]]) -> None:
+        rows = list(rows)
+        # Header and first data row are validated row by row by the base class
+        start = 0
+        while start < len(rows) and not self._first_row_seen:
+            super()._consume_rows(rows[start:start + 1])
+            start += 1
+
+        data_rows = [row for row in rows[start:] if row]  # skip blank lines
+        self.rows_processed += len(data_rows)
+        self._batch.extend(data_rows)
+        if len(self._batch) >= self._batch_rows:
+            self._flush()
+
+    def _consume_row(self, row: List[str]) -> None:
+        self._batch.append(row)
+
+    def _flush(self) -> None:
+        batch, self._batch = self._batch, []
+        if batch:
+            self._record_period(aggregate_batch(batch, self.daily_metrics))
+
+    def _record_period(self, batch_dates: List[date]) -> None:
+        if not batch_dates:
+            return
+        batch_start, batch_end = min(batch_dates), max(batch_dates)
+        if self.period_start is None or batch_start < self.period_start:
+            self.period_start = batch_start
+        if self.period_end is None or batch_end > self.period_end:
+            self.period_end = batch_end
+
+
+def numpy_available() -> Optional[str]:
+    """NumPy version used for vectorized batches, or None for the pure-Python fallback"""
+    return np.__version__ if np is not None else None
@@ -4,10 +4,13 @@ VK CSV Parser Service
 Parses VK community statistics CSV exports and maps metrics to database models.
 """
 
+import codecs
 import csv
 from collections import defaultdict
 from datetime import date, datetime
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.config import settings
 
 
 # Mapping of VK CSV metric names to VkMetric model fields
@@ -32,37 +35,89 @@ ENGAGEMENT_METRIC_MAPPING = {
 }
 
 
+# Accumulator slot per model field: VK metrics first, then engagement metrics
+METRIC_FIELDS = [*VK_METRIC_MAPPING.values(), *ENGAGEMENT_METRIC_MAPPING.values()]
+METRIC_SLOTS = {field: slot for slot, field in enumerate(METRIC_FIELDS)}
+
+# CSV metric name ("Параметр легенды") -> accumulator slot, resolved with one dict lookup per row
+METRIC_NAME_SLOTS = {
+    name: METRIC_SLOTS[field]
+    for name, field in {**VK_METRIC_MAPPING, **ENGAGEMENT_METRIC_MAPPING}.items()
+}
+
+
 class VkDailyMetrics:
-    """Container for daily VK metrics"""
+    """
+    Container for daily VK metrics
+
+    Values live in a flat list indexed by METRIC_SLOTS; every model field
+    (visitors, views, ..., likes, reposts, comments) is exposed as an attribute.
+    """
+
+    __slots__ = ("date", "values")
 
     def __init__(self, date_obj: date):
         self.date = date_obj
-        # VK-specific metrics
-        self.visitors = 0
-        self.views = 0
-        self.posts = 0
-        self.stories = 0
-        self.clips = 0
-        self.videos = 0
-        self.subscribed = 0
-        self.unsubscribed = 0
-        self.total_subscribers = 0
-        self.site_clicks = 0
-        # Engagement metrics
-        self.likes = 0
-        self.reposts = 0
-        self.comments = 0
+        self.values = [0] * len(METRIC_FIELDS)
 
     def add_metric(self, metric_name: str, value: int):
         """Add metric value"""
-        # VK metrics
-        if metric_name in VK_METRIC_MAPPING:
-            field_name = VK_METRIC_MAPPING[metric_name]
-            setattr(self, field_name, getattr(self, field_name, 0) + value)
-        # Engagement metrics
-        elif metric_name in ENGAGEMENT_METRIC_MAPPING:
-            field_name = ENGAGEMENT_METRIC_MAPPING[metric_name]
-            setattr(self, field_name, getattr(self, field_name, 0) + value)
+        slot = METRIC_NAME_SLOTS.get(metric_name)
+        if slot is not None:
+            self.values[slot] += value
+
+
+def _slot_property(slot: int) -> property:
+    def fget(self: VkDailyMetrics) -> int:
+        return self.values[slot]
+
+    def fset(self: VkDailyMetrics, value: int) -> None:
+        self.values[slot] = value
+
+    return property(fget, fset)
+
+
+for _field, _slot in METRIC_SLOTS.items():
+    setattr(VkDailyMetrics, _field, _slot_property(_slot))
+
+
+_date_cache: Dict[str, Optional[date]] = {}
+
+
+def decode_date(date_str: str) -> Optional[date]:
+    """
+    Parse a DD.MM.YYYY date, returning None if it is invalid
+
+    Exports repeat the same few hundred dates across all rows, so results
+    (including failures) are memoized. Well-formed values are decoded by
+    slicing; anything else falls back to strptime, which also accepts e.g.
+    unpadded "1.2.2025".
+    """
+    try:
+        return _date_cache[date_str]
+    except KeyError:
+        pass
+
+    date_obj: Optional[date]
+    try:
+        if (
+            len(date_str) == 10
+            and date_str[2] == "."
+            and date_str[5] == "."
+            and date_str[0:2].isdigit()
+            and date_str[3:5].isdigit()
+            and date_str[6:10].isdigit()
+        ):
+            date_obj = date(int(date_str[6:10]), int(date_str[3:5]), int(date_str[0:2]))
+        else:
+            date_obj = datetime.strptime(date_str, "%d.%m.%Y").date()
+    except ValueError:
+        date_obj = None
+
+    # Bound the cache: garbage in a huge file must not grow it forever
+    if len(_date_cache) < 100_000:
+        _date_cache[date_str] = date_obj
+    return date_obj
 
 
 def parse_vk_csv(file_path: str) -> Dict[date, VkDailyMetrics]:
@@ -87,6 +142,7 @@ def parse_vk_csv(file_path: str) -> Dict[date, VkDailyMetrics]:
     [8] Значение (metric value)
     """
     daily_metrics: Dict[date, VkDailyMetrics] = {}
+    metric_slots = METRIC_NAME_SLOTS
 
     with open(file_path, "r", encoding="utf-8") as f:
         reader = csv.reader(f, delimiter=";")
@@ -96,27 +152,24 @@ def parse_vk_csv(file_path: str) -> Dict[date, VkDailyMetrics]:
             if len(row) < 9:
                 continue
 
-            date_str = row[2]
-            metric_name = row[7]
-            value_str = row[8]
-
+            date_obj = decode_date(row[2])
+            if date_obj is None:
+                # Skip invalid rows
+                continue
             try:
-                # Parse date
-                date_obj = datetime.strptime(date_str, "%d.%m.%Y").date()
-
-                # Parse value
-                value = int(value_str)
-
-                # Get or create daily metrics container
-                if date_obj not in daily_metrics:
-                    daily_metrics[date_obj] = VkDailyMetrics(date_obj)
+                value = int(row[8])
+            except ValueError:
+                continue
 
-                # Add metric
-                daily_metrics[date_obj].add_metric(metric_name, value)
+            # Get or create daily metrics container
+            daily = daily_metrics.get(date_obj)
+            if daily is None:
+                daily = daily_metrics[date_obj] = VkDailyMetrics(date_obj)
 
-            except (ValueError, IndexError):
-                # Skip invalid rows
-                continue
+            # Add metric
+            slot = metric_slots.get(row[7])
+            if slot is not None:
+                daily.values[slot] += value
 
     return daily_metrics
 
@@ -138,12 +191,9 @@ def extract_period_from_csv(file_path: str) -> Tuple[date, date]:
             if len(row) < 3:
                 continue
 
-            date_str = row[2]
-            try:
-                date_obj = datetime.strptime(date_str, "%d.%m.%Y").date()
+            date_obj = decode_date(row[2])
+            if date_obj is not None:
                 dates.append(date_obj)
-            except ValueError:
-                continue
 
     if not dates:
         raise ValueError("No valid dates found in CSV")
@@ -183,3 +233,123 @@ def validate_csv_format(file_path: str) -> bool:
             raise ValueError(f"Invalid date format in CSV: {e}")
 
     return True
+
+
+class VkCsvStreamParser:
+    """
+    Single-pass, constant-memory parser for VK CSV exports
+
+    Feed raw bytes as they arrive (e.g. UploadFile chunks), then call finish().
+    Bytes are decoded incrementally and split into lines, so memory stays bounded
+    by the chunk size plus one VkDailyMetrics per day. In the same pass the
+    parser validates the header and first data row (like validate_csv_format),
+    tracks the min/max date (like extract_period_from_csv) and aggregates
+    metrics (like parse_vk_csv).
+
+    Quoted fields spanning several lines are not supported (VK exports have none).
+    """
+
+    def __init__(self, encoding: str = "utf-8"):
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self._tail = ""
+        self._header_seen = False
+        self._first_row_seen = False
+        self.daily_metrics: Dict[date, VkDailyMetrics] = {}
+        self.period_start: Optional[date] = None
+        self.period_end: Optional[date] = None
+        self.rows_processed = 0
+
+    def feed(self, data: bytes) -> None:
+        """Consume the next chunk of the file; raises ValueError on an invalid format"""
+        text = self._tail + self._decoder.decode(data)
+        lines = text.split("\n")
+        # The last element is an incomplete line (or "") — keep it for the next chunk
+        self._tail = lines.pop()
+        if lines:
+            self._consume_lines(lines)
+
+    def finish(self) -> Dict[date, VkDailyMetrics]:
+        """Flush the last line and return metrics by date; raises ValueError if nothing was parsed"""
+        text = self._tail + self._decoder.decode(b"", final=True)
+        self._tail = ""
+        if text:
+            self._consume_lines([text])
+        self._flush()
+
+        if not self._header_seen:
+            raise ValueError("Empty CSV file")
+        if not self._first_row_seen:
+            raise ValueError("No data rows in CSV")
+        if self.period_start is None:
+            raise ValueError("No valid dates found in CSV")
+        return self.daily_metrics
+
+    def _flush(self) -> None:
+        """Hook for subclasses that buffer rows before aggregating them"""
+
+    def _consume_lines(self, lines: List[str]) -> None:
+        self._consume_rows(csv.reader(lines, delimiter=";"))
+
+    def _consume_rows(self, rows: Iterable[List[str]]) -> None:
+        for row in rows:
+            if not self._header_seen:
+                if len(row) < 9:
+                    raise ValueError(f"Invalid header: expected 9 columns, got {len(row)}")
+                self._header_seen = True
+                continue
+
+            if not row:
+                # Blank line
+                continue
+
+            if not self._first_row_seen:
+                if len(row) < 9:
+                    raise ValueError(f"Invalid data row: expected 9 columns, got {len(row)}")
+                try:
+                    datetime.strptime(row[2], "%d.%m.%Y")
+                except ValueError as e:
+                    raise ValueError(f"Invalid date format in CSV: {e}")
+                self._first_row_seen = True
+
+            self.rows_processed += 1
+            self._consume_row(row)
+
+    def _consume_row(self, row: List[str]) -> None:
+        if len(row) < 3:
+            return
+
+        date_obj = decode_date(row[2])
+        if date_obj is None:
+            return
+
+        if self.period_start is None or date_obj < self.period_start:
+            self.period_start = date_obj
+        if self.period_end is None or date_obj > self.period_end:
+            self.period_end = date_obj
+
+        if len(row) < 9:
+            return
+
+        try:
+            value = int(row[8])
+        except ValueError:
+            return
+
+        daily = self.daily_metrics.get(date_obj)
+        if daily is None:
+            daily = self.daily_metrics[date_obj] = VkDailyMetrics(date_obj)
+        slot = METRIC_NAME_SLOTS.get(row[7])
+        if slot is not None:
+            daily.values[slot] += value
+
+
+def create_vk_csv_parser() -> VkCsvStreamParser:
+    """Return a streaming parser for the engine chosen by settings.vk_csv_engine"""
+    engine = settings.vk_csv_engine
+    if engine == "columnar":
+        from app.services.vk_csv_columnar import VkCsvColumnarParser
+
+        return VkCsvColumnarParser()
+    if engine != "stream":
+        raise ValueError(f"Unknown vk_csv_engine: {engine!r} (expected 'stream' or 'columnar')")
+    return VkCsvStreamParser()
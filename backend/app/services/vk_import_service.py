@@ -0,0 +1,83 @@
+"""
+VK Import Service
+
+Bulk-loads parsed VK daily metrics into vk_metrics and engagement_metrics.
+"""
+
+import logging
+import uuid
+from datetime import date
+from typing import Dict, NamedTuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.engagement_metric import EngagementMetric
+from app.models.vk_metric import VkMetric
+from app.services.bulk_upsert import upsert_rows
+from app.services.vk_csv_service import (
+    ENGAGEMENT_METRIC_MAPPING,
+    VK_METRIC_MAPPING,
+    VkDailyMetrics,
+)
+
+logger = logging.getLogger(__name__)
+
+VK_METRIC_FIELDS = list(VK_METRIC_MAPPING.values())
+ENGAGEMENT_METRIC_FIELDS = list(ENGAGEMENT_METRIC_MAPPING.values())
+
+
+class VkImportCounts(NamedTuple):
+    """Rows upserted per table"""
+
+    vk_metrics: int
+    engagement_metrics: int
+
+
+async def load_vk_daily_metrics(
+    db: AsyncSession,
+    library_id: uuid.UUID,
+    channel_id: uuid.UUID,
+    upload_id: uuid.UUID,
+    daily_metrics: Dict[date, VkDailyMetrics],
+) -> VkImportCounts:
+    """
+    Upsert all days of an upload with a few multi-row statements
+
+    Every day goes to vk_metrics; days with any likes/reposts/comments also go
+    to engagement_metrics. Runs inside the caller's transaction — the caller
+    commits (or rolls back) once for the whole upload.
+    """
+    vk_rows = []
+    engagement_rows = []
+
+    for date_obj, metrics in daily_metrics.items():
+        vk_rows.append({
+            "library_id": library_id,
+            "channel_id": channel_id,
+            "upload_id": upload_id,
+            "date": date_obj,
+            **{field: getattr(metrics, field) for field in VK_METRIC_FIELDS},
+        })
+
+        if metrics.likes > 0 or metrics.reposts > 0 or metrics.comments > 0:
+            engagement_rows.append({
+                "library_id": library_id,
+                "channel_id": channel_id,
+                "date": date_obj,
+                **{field: getattr(metrics, field) for field in ENGAGEMENT_METRIC_FIELDS},
+            })
+
+    vk_count = await upsert_rows(
+        db, VkMetric, vk_rows, ["upload_id", *VK_METRIC_FIELDS],
+        index_elements=["library_id", "channel_id", "date"],
+    )
+    engagement_count = await upsert_rows(
+        db, EngagementMetric, engagement_rows, ENGAGEMENT_METRIC_FIELDS,
+        index_elements=["library_id", "channel_id", "date"],
+    )
+
+    logger.info(
+        f"Upserted {vk_count} VK metrics and {engagement_count} engagement metrics"
+        f" for upload {upload_id}"
+    )
+    return VkImportCounts(vk_metrics=vk_count, engagement_metrics=engagement_count)
@@ -0,0 +1,230 @@
+import heapq
+import uuid
+from datetime import date, timedelta
+from operator import itemgetter
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.engagement_metric import EngagementMetric
+from app.models.vk_metric import VkMetric
+from app.models.vk_upload import VkUpload
+from app.schemas.vk import (
+    VkContentPoint,
+    VkEngagementPoint,
+    VkKpi,
+    VkPeriodInfo,
+    VkReachPoint,
+    VkStatsResponse,
+    VkTopPost,
+)
+from app.services.aggregates import aggregate_two_periods
+from app.services.insights_engine import generate_vk_insights
+from app.services.period import calc_delta_pct
+
+TOP_POSTS_LIMIT = 10
+
+
+def previous_window(date_from: date, date_to: date) -> tuple[date, date]:
+    """Window of the same length right before [date_from, date_to]"""
+    period_days = (date_to - date_from).days + 1
+    prev_to = date_from - timedelta(days=1)
+    return prev_to - timedelta(days=period_days - 1), prev_to
+
+
+async def _latest_subscribers(
+    db: AsyncSession,
+    filters: list,
+    date_from: date,
+    date_to: date,
+    prev_from: date,
+) -> tuple[int | None, int | None]:
+    """
+    Subscribers at the end of the current and previous windows
+
+    Each channel's latest row per window (row_number over channel + window),
+    summed across channels. None when a window has no rows.
+    """
+    is_current = (VkMetric.date >= date_from).label("is_current")
+    ranked = (
+        select(
+            VkMetric.total_subscribers,
+            is_current,
+            func.row_number()
+            .over(partition_by=(VkMetric.channel_id, is_current), order_by=VkMetric.date.desc())
+            .label("rn"),
+        )
+        .where(*filters, VkMetric.date >= prev_from, VkMetric.date <= date_to)
+        .subquery()
+    )
+    q = select(
+        func.sum(ranked.c.total_subscribers).filter(ranked.c.is_current),
+        func.sum(ranked.c.total_subscribers).filter(~ranked.c.is_current),
+    ).where(ranked.c.rn == 1)
+    current, previous = (await db.execute(q)).one()
+    return current, previous
+
+
+async def get_vk_stats(
+    db: AsyncSession,
+    library_id: uuid.UUID,
+    date_from: date,
+    date_to: date,
+    channel_id: uuid.UUID | None = None,
+) -> VkStatsResponse:
+    """
+    VK statistics for [date_from, date_to], optionally for one channel
+
+    KPIs and deltas to the previous window of the same length are SQL
+    aggregates; trends are one row per day summed across channels.
+    Callers decide what an empty period means (see reach_trend/engagement_trend).
+    """
+    prev_from, prev_to = previous_window(date_from, date_to)
+
+    vk_filters = [VkMetric.library_id == library_id]
+    eng_filters = [EngagementMetric.library_id == library_id]
+    upload_filters = [VkUpload.library_id == library_id, VkUpload.status == "completed"]
+    if channel_id:
+        vk_filters.append(VkMetric.channel_id == channel_id)
+        eng_filters.append(EngagementMetric.channel_id == channel_id)
+        upload_filters.append(VkUpload.channel_id == channel_id)
+
+    # KPIs for both windows
+    (reach, views), (prev_reach, prev_views) = await aggregate_two_periods(
+        db,
+        func.sum,
+        [VkMetric.visitors, VkMetric.views],
+        VkMetric.date,
+        vk_filters,
+        date_from, date_to, prev_from, prev_to,
+    )
+    (likes, reposts, comments), (prev_likes, prev_reposts, prev_comments) = await aggregate_two_periods(
+        db,
+        func.sum,
+        [EngagementMetric.likes, EngagementMetric.reposts, EngagementMetric.comments],
+        EngagementMetric.date,
+        eng_filters,
+        date_from, date_to, prev_from, prev_to,
+    )
+    subscribers, prev_subscribers = await _latest_subscribers(db, vk_filters, date_from, date_to, prev_from)
+
+    # ER (engagement rate)
+    er_pct = ((likes + reposts + comments) / reach * 100) if reach > 0 else 0
+    prev_er_pct = ((prev_likes + prev_reposts + prev_comments) / prev_reach * 100) if prev_reach > 0 else 0
+
+    kpis = VkKpi(
+        reach=reach,
+        views=views,
+        subscribers=subscribers or 0,
+        er_pct=round(er_pct, 2),
+        reposts=reposts,
+        comments=comments,
+        reach_delta_pct=calc_delta_pct(reach, prev_reach),
+        views_delta_pct=calc_delta_pct(views, prev_views),
+        subscribers_delta_pct=calc_delta_pct(subscribers or 0, prev_subscribers or 0),
+        er_delta_pct=calc_delta_pct(round(er_pct, 2), round(prev_er_pct, 2)),
+    )
+
+    # Daily series for the charts
+    vk_q = (
+        select(
+            VkMetric.date,
+            func.sum(VkMetric.visitors).label("visitors"),
+            func.sum(VkMetric.views).label("views"),
+            func.sum(VkMetric.posts).label("posts"),
+            func.sum(VkMetric.stories).label("stories"),
+            func.sum(VkMetric.clips).label("clips"),
+            func.sum(VkMetric.videos).label("videos"),
+        )
+        .where(*vk_filters, VkMetric.date >= date_from, VkMetric.date <= date_to)
+        .group_by(VkMetric.date)
+        .order_by(VkMetric.date)
+    )
+    vk_days = (await db.execute(vk_q)).all()
+
+    eng_q = (
+        select(
+            EngagementMetric.date,
+            func.sum(EngagementMetric.likes).label("likes"),
+            func.sum(EngagementMetric.reposts).label("reposts"),
+            func.sum(EngagementMetric.comments).label("comments"),
+        )
+        .where(*eng_filters, EngagementMetric.date >= date_from, EngagementMetric.date <= date_to)
+        .group_by(EngagementMetric.date)
+        .order_by(EngagementMetric.date)
+    )
+    eng_days = (await db.execute(eng_q)).all()
+
+    reach_trend = [VkReachPoint(date=str(d.date), reach=d.visitors, views=d.views) for d in vk_days]
+
+    content_trend = [
+        VkContentPoint(date=str(d.date), posts=d.posts, stories=d.stories, clips=d.clips, videos=d.videos)
+        for d in vk_days
+    ]
+
+    # Engagement trend (ER against the same day's reach, joined by date)
+    vk_by_date = {d.date: d for d in vk_days}
+    engagement_trend = []
+    day_er = []
+    for m in eng_days:
+        vk_m = vk_by_date.get(m.date)
+        day_reach = vk_m.visitors if vk_m else 0
+        total_eng = m.likes + m.reposts + m.comments
+        er = (total_eng / day_reach * 100) if day_reach > 0 else 0
+        day_er.append((er, m, vk_m))
+        engagement_trend.append(
+            VkEngagementPoint(
+                date=str(m.date),
+                likes=m.likes,
+                reposts=m.reposts,
+                comments=m.comments,
+                er=round(er, 2),
+            )
+        )
+
+    # Top posts: the TOP_POSTS_LIMIT days with the highest ER over the whole period
+    top_posts = []
+    for er, m, vk_m in heapq.nlargest(TOP_POSTS_LIMIT, day_er, key=itemgetter(0)):
+        content_type = "Пост"
+        if vk_m:
+            if vk_m.stories > 0:
+                content_type = "История"
+            elif vk_m.clips > 0:
+                content_type = "Клип"
+            elif vk_m.videos > 0:
+                content_type = "Видео"
+        top_posts.append(
+            VkTopPost(
+                date=str(m.date),
+                type=content_type,
+                reach=vk_m.visitors if vk_m else 0,
+                er=round(er, 2),
+                likes=m.likes,
+                comments=m.comments,
+            )
+        )
+
+    # Latest upload (metadata only)
+    upload_q = (
+        select(VkUpload.uploaded_at)
+        .where(*upload_filters)
+        .order_by(VkUpload.uploaded_at.desc())
+        .limit(1)
+    )
+    uploaded_at = (await db.execute(upload_q)).scalar_one_or_none()
+
+    period_info = VkPeriodInfo(
+        start=str(date_from),
+        end=str(date_to),
+        upload_date=str(uploaded_at.date()) if uploaded_at else None,
+    )
+
+    return VkStatsResponse(
+        kpis=kpis,
+        reach_trend=reach_trend,
+        engagement_trend=engagement_trend,
+        content_trend=content_trend,
+        top_posts=top_posts,
+        period_info=period_info,
+        insights=generate_vk_insights(kpis),
+    )
@@ -0,0 +1,268 @@
+"""
+VK Upload Jobs
+
+Runs VK CSV imports in the background: the upload endpoint only stores the
+file and creates a VkUpload (status=processing). The job parses the file in a
+worker thread, so the event loop stays responsive, then upserts the metrics
+with its own session. Live progress is kept in memory and checkpointed to
+vk_uploads for GET /api/vk/uploads/{id}.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+
+from fastapi import UploadFile
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.database import async_session
+from app.models.vk_upload import VkUpload
+from app.services.vk_csv_service import VkCsvStreamParser, create_vk_csv_parser
+from app.services.response_cache import invalidate_library
+from app.services.vk_import_service import load_vk_daily_metrics
+
+logger = logging.getLogger(__name__)
+
+_CHUNK_SIZE = 1024 * 1024  # bytes per write when storing / per parser feed when parsing
+
+
+class UploadCancelled(Exception):
+    """Raised in the parser thread when the job is stopped (shutdown)"""
+
+
+class UploadProgress:
+    """Live counters of a running upload; the parser thread updates them in place"""
+
+    def __init__(self, bytes_total: int):
+        self.phase = "queued"  # queued | parsing | saving
+        self.bytes_total = bytes_total
+        self.bytes_processed = 0
+        self.rows_processed = 0
+        self.parse_started: float | None = None
+        self.cancelled = False
+
+    def rows_per_second(self) -> float | None:
+        if self.parse_started is None:
+            return None
+        elapsed = time.monotonic() - self.parse_started
+        return self.rows_processed / elapsed if elapsed > 0 else None
+
+    def eta_seconds(self) -> float | None:
+        """Remaining parse time extrapolated from the bytes read so far"""
+        if self.phase != "parsing" or self.parse_started is None or not self.bytes_processed:
+            return None
+        elapsed = time.monotonic() - self.parse_started
+        remaining = max(0, self.bytes_total - self.bytes_processed)
+        return remaining * elapsed / self.bytes_processed
+
+
+# Jobs running in this process, keyed by upload id
+_progress: dict[uuid.UUID, UploadProgress] = {}
+_tasks: dict[uuid.UUID, asyncio.Task] = {}
+
+
+def get_progress(upload_id: uuid.UUID) -> UploadProgress | None:
+    return _progress.get(upload_id)
+
+
+def is_running(upload_id: uuid.UUID) -> bool:
+    task = _tasks.get(upload_id)
+    return task is not None and not task.done()
+
+
+def _upload_dir() -> str:
+    return settings.vk_upload_dir or os.path.join(tempfile.gettempdir(), "libbord-vk-uploads")
+
+
+def upload_file_path(upload_id: uuid.UUID) -> str:
+    return os.path.join(_upload_dir(), f"{upload_id}.csv")
+
+
+async def store_upload_file(file: UploadFile, upload_id: uuid.UUID) -> int:
+    """Copy the uploaded file to the job directory chunk by chunk; returns its size"""
+    os.makedirs(_upload_dir(), exist_ok=True)
+    path = upload_file_path(upload_id)
+    size = 0
+    try:
+        with open(path, "wb") as out:
+            while chunk := await file.read(_CHUNK_SIZE):
+                await asyncio.to_thread(out.write, chunk)
+                size += len(chunk)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return size
+
+
+def start_upload_job(upload_id: uuid.UUID, bytes_total: int) -> None:
+    """Run the import of a stored upload in the background"""
+    if is_running(upload_id):
+        return
+    _progress[upload_id] = UploadProgress(bytes_total)
+    task = asyncio.create_task(run_upload_job(upload_id))
+    _tasks[upload_id] = task
+
+    def _cleanup(_: asyncio.Task) -> None:
+        _tasks.pop(upload_id, None)
+        _progress.pop(upload_id, None)
+
+    task.add_done_callback(_cleanup)
+
+
+def _parse_file(path: str, progress: UploadProgress) -> VkCsvStreamParser:
+    """Parse the stored CSV (runs in a worker thread)"""
+    parser = create_vk_csv_parser()
+    with open(path, "rb") as f:
+        while chunk := f.read(_CHUNK_SIZE):
+            if progress.cancelled:
+                raise UploadCancelled()
+            parser.feed(chunk)
+            progress.bytes_processed += len(chunk)
+            progress.rows_processed = parser.rows_processed
+    parser.finish()
+    progress.rows_processed = parser.rows_processed
+    return parser
+
+
+async def _checkpoint(db: AsyncSession, upload: VkUpload, progress: UploadProgress) -> None:
+    upload.bytes_processed = progress.bytes_processed
+    upload.rows_processed = progress.rows_processed
+    await db.commit()
+
+
+async def run_upload_job(upload_id: uuid.UUID) -> None:
+    """
+    Parse and import one stored upload
+
+    1. Parse the file in a worker thread, checkpointing progress every
+       settings.vk_upload_progress_interval_seconds
+    2. Bulk upsert vk_metrics + engagement_metrics
+    3. Mark the upload completed (same transaction as step 2) or error
+    """
+    progress = _progress[upload_id]
+    path = upload_file_path(upload_id)
+    cancelled = False
+
+    async with async_session() as db:
+        upload = await db.get(VkUpload, upload_id)
+        if not upload:
+            logger.warning(f"VK upload {upload_id} not found")
+            return
+
+        try:
+            upload.started_at = datetime.now(timezone.utc)
+            upload.bytes_total = progress.bytes_total
+            await db.commit()
+
+            # 1. Parse off the event loop
+            progress.phase = "parsing"
+            progress.parse_started = time.monotonic()
+            parse_task = asyncio.ensure_future(asyncio.to_thread(_parse_file, path, progress))
+            try:
+                while True:
+                    done, _ = await asyncio.wait(
+                        {parse_task}, timeout=settings.vk_upload_progress_interval_seconds
+                    )
+                    if done:
+                        break
+                    await _checkpoint(db, upload, progress)
+            except asyncio.CancelledError:
+                progress.cancelled = True
+                raise
+
+            try:
+                parser = parse_task.result()
+            except ValueError as e:
+                raise ValueError(f"Invalid CSV format: {e}")
+            daily_metrics = parser.daily_metrics
+            if not daily_metrics:
+                raise ValueError("No metrics found in CSV")
+
+            logger.info(
+                f"Parsed {len(daily_metrics)} days of metrics from {parser.rows_processed}"
+                f" CSV rows for upload {upload_id}"
+            )
+
+            # 2-3. Upsert metrics and mark the upload completed in one transaction
+            progress.phase = "saving"
+            upload.period_start = parser.period_start
+            upload.period_end = parser.period_end
+            upload.total_rows = len(daily_metrics)
+            counts = await load_vk_daily_metrics(
+                db, upload.library_id, upload.channel_id, upload.id, daily_metrics
+            )
+            upload.vk_metrics_count = counts.vk_metrics
+            upload.engagement_metrics_count = counts.engagement_metrics
+            upload.bytes_processed = progress.bytes_processed
+            upload.rows_processed = progress.rows_processed
+            upload.status = "completed"
+            upload.finished_at = datetime.now(timezone.utc)
+            await db.commit()
+            await invalidate_library(upload.library_id)
+
+            logger.info(f"Upload {upload_id} completed successfully")
+
+        except asyncio.CancelledError:
+            # Left in 'processing' with the file kept, resumed on next start
+            cancelled = True
+            logger.info(f"Upload {upload_id} interrupted, will resume on next start")
+            raise
+        except Exception as e:
+            logger.error(f"Error processing VK upload {upload_id}: {e}", exc_info=True)
+
+            # Discard partial upserts, then record the error on the upload
+            await db.rollback()
+            upload.status = "error"
+            upload.error_message = str(e)[:500]
+            upload.finished_at = datetime.now(timezone.utc)
+            await db.commit()
+        finally:
+            if not cancelled and os.path.exists(path):
+                try:
+                    os.unlink(path)
+                except OSError as e:
+                    logger.warning(f"Failed to clean up upload file {path}: {e}")
+
+
+async def resume_upload_jobs() -> int:
+    """
+    Restart uploads left in 'processing' by a previous process; returns how many
+
+    Uploads whose stored file is gone (e.g. a redeploy wiped the disk) are
+    marked as errors so the user knows to upload again.
+    """
+    async with async_session() as db:
+        result = await db.execute(select(VkUpload).where(VkUpload.status == "processing"))
+        uploads = result.scalars().all()
+
+        resumed = 0
+        for upload in uploads:
+            path = upload_file_path(upload.id)
+            if os.path.exists(path):
+                logger.info(f"Resuming VK upload {upload.id}")
+                start_upload_job(upload.id, os.path.getsize(path))
+                resumed += 1
+            else:
+                upload.status = "error"
+                upload.error_message = "Upload interrupted by a server restart, please upload the file again"
+                upload.finished_at = datetime.now(timezone.utc)
+        await db.commit()
+    return resumed
+
+
+async def stop_upload_jobs() -> None:
+    """Cancel running uploads on shutdown; they are resumed on next start"""
+    for progress in _progress.values():
+        progress.cancelled = True
+    tasks = [task for task in _tasks.values() if not task.done()]
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
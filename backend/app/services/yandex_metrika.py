@@ -1,10 +1,109 @@
 from __future__ import annotations
 
+import asyncio
 import datetime
+import email.utils
+import logging
+import random
 import httpx
 from typing import Any
 
 from app.config import settings
+from app.services.http_client import get_http_client
+from app.services.yandex_rate_limit import CircuitOpen, get_token_guard
+
+logger = logging.getLogger(__name__)
+
+# Responses worth retrying: rate limited or a transient server-side failure
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+# Metrics requested from /stat/v1/data; parsing relies on this order
+STAT_METRICS = [
+    "ym:s:pageviews",  # просмотры (views)
+    "ym:s:visits",  # визиты
+    "ym:s:users",  # пользователи
+    "ym:s:avgVisitDurationSeconds",  # среднее время (avg_time)
+    "ym:s:pageDepth",  # глубина
+    "ym:s:bounceRate",  # показатель отказов
+    "ym:s:newUsers",  # новые пользователи (для расчета return_rate)
+]
+
+# ym:s:isRobot dimension values (id or localized name), lowercased
+_IS_ROBOT_NO = {"no", "люди", "people"}
+_IS_ROBOT_YES = {"yes", "роботы", "robots"}
+
+
+class YandexApiError(Exception):
+    """Yandex API request failed (non-200 response, exhausted retries or open circuit)"""
+
+    def __init__(self, message: str, status_code: int | None = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _parse_metric_values(metrics_values: list) -> dict[str, Any]:
+    """Raw values of one /stat/v1/data row, in STAT_METRICS order"""
+    return {
+        "views": int(metrics_values[0]) if len(metrics_values) > 0 else 0,
+        "visits": int(metrics_values[1]) if len(metrics_values) > 1 else 0,
+        "users": int(metrics_values[2]) if len(metrics_values) > 2 else 0,
+        "avg_time": float(metrics_values[3]) if len(metrics_values) > 3 else 0.0,
+        "depth": float(metrics_values[4]) if len(metrics_values) > 4 else 0.0,
+        "bounce_rate": float(metrics_values[5]) if len(metrics_values) > 5 else 0.0,
+        "new_users": int(metrics_values[6]) if len(metrics_values) > 6 else 0,
+    }
+
+
+def _day_metrics(raw: dict[str, Any]) -> dict[str, Any]:
+    """Turn raw row values into the fetch_metrics() day entry"""
+    users = raw["users"]
+    # Calculate return_rate as (users - new_users) / users
+    return_rate = max(0.0, (users - raw["new_users"]) / users) if users > 0 else 0.0
+    return {
+        "views": raw["views"],
+        "visits": raw["visits"],
+        "users": users,
+        "avg_time": raw["avg_time"],
+        "depth": raw["depth"],
+        "bounce_rate": raw["bounce_rate"],
+        "return_rate": return_rate,
+    }
+
+
+def _is_robot(dimension: dict[str, Any]) -> bool:
+    for value in (dimension.get("id"), dimension.get("name")):
+        value = str(value or "").strip().lower()
+        if value in _IS_ROBOT_NO:
+            return False
+        if value in _IS_ROBOT_YES:
+            return True
+    raise YandexApiError(f"Unexpected ym:s:isRobot value: {dimension}")
+
+
+def _retry_after_seconds(response: httpx.Response) -> float | None:
+    """Parse Retry-After (delta-seconds or HTTP date)"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.datetime.now(retry_at.tzinfo)).total_seconds())
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter"""
+    cap = min(
+        settings.yandex_retry_max_delay_seconds,
+        settings.yandex_retry_base_delay_seconds * 2 ** attempt,
+    )
+    return random.uniform(0, cap)
 
 
 class YandexMetrikaService:
@@ -13,17 +112,15 @@ class YandexMetrikaService:
     OAUTH_BASE_URL = "https://oauth.yandex.com"
     API_BASE_URL = "https://api-metrika.yandex.net"
 
-    def __init__(self, access_token: str):
-        """Initialize service with access token"""
+    def __init__(self, access_token: str, client: httpx.AsyncClient | None = None):
+        """Initialize service with access token; requests go through the shared pooled client"""
         self.access_token = access_token
-        self.client = httpx.AsyncClient(
-            headers={"Authorization": f"OAuth {access_token}"},
-            timeout=30.0,
-        )
+        self.client = client or get_http_client()
+        self.headers = {"Authorization": f"OAuth {access_token}"}
+        self.guard = get_token_guard(access_token)
 
     async def close(self):
-        """Close HTTP client"""
-        await self.client.aclose()
+        """No-op: the pooled client is shared and closed with the app"""
 
     async def __aenter__(self):
         return self
@@ -31,66 +128,152 @@ class YandexMetrikaService:
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         await self.close()
 
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Send an authorized API request through the token's rate limiter and circuit breaker
+
+        429/5xx responses and transport errors are retried up to
+        settings.yandex_retry_attempts times with exponential backoff and jitter;
+        a Retry-After header replaces the backoff and is honored in full, pausing
+        every request made with this token. Returns the first non-retryable
+        response (which may be a 4xx — callers check the status); raises
+        YandexApiError when retries are exhausted, the circuit is open, or
+        Retry-After asks for longer than what is left of
+        settings.yandex_retry_budget_seconds.
+        """
+        bucket, breaker = self.guard.bucket, self.guard.breaker
+        attempts = max(1, settings.yandex_retry_attempts)
+        waited = 0.0
+
+        for attempt in range(attempts):
+            try:
+                is_probe = breaker.before_request()
+            except CircuitOpen as e:
+                raise YandexApiError(f"Yandex API unavailable: {e}") from e
+
+            try:
+                await bucket.acquire()
+                response = await self.client.request(method, url, headers=self.headers, **kwargs)
+            except httpx.TransportError as e:
+                breaker.record_failure()
+                if attempt == attempts - 1:
+                    raise YandexApiError(f"Yandex API request failed: {e!r}") from e
+                delay = _backoff_delay(attempt)
+                logger.warning(f"Yandex API {e!r}, retry {attempt + 1}/{attempts - 1} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                waited += delay
+                continue
+            except BaseException:
+                # Cancelled (job timeout, backfill cancel) or an unexpected error:
+                # a probe without an outcome would keep the circuit half-open forever
+                if is_probe:
+                    breaker.record_failure()
+                raise
+
+            if response.status_code not in RETRYABLE_STATUS_CODES:
+                # 4xx other than 429 is the caller's problem, not the API's health
+                breaker.record_success()
+                return response
+
+            if response.status_code == 429:
+                # Quota hit: the API is healthy, just slow everyone on this token down
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+
+            if attempt == attempts - 1:
+                raise YandexApiError(
+                    f"Yandex API {response.status_code} after {attempts} attempts: {response.text}",
+                    status_code=response.status_code,
+                )
+
+            retry_after = _retry_after_seconds(response)
+            if retry_after is not None:
+                # Retrying before the server's time is up only burns attempts
+                # and feeds the circuit breaker; other requests on the token wait too
+                bucket.pause(retry_after)
+                remaining = settings.yandex_retry_budget_seconds - waited
+                if retry_after > remaining:
+                    raise YandexApiError(
+                        f"Yandex API {response.status_code} asks to retry in {retry_after:.0f}s,"
+                        f" more than the {max(0.0, remaining):.0f}s left of the retry budget",
+                        status_code=response.status_code,
+                    )
+                delay = retry_after
+            else:
+                delay = _backoff_delay(attempt)
+            logger.warning(
+                f"Yandex API {response.status_code}, retry {attempt + 1}/{attempts - 1} in {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
+            waited += delay
+
+        raise YandexApiError("Yandex API retries exhausted")
+
     @staticmethod
     async def exchange_code_for_token(code: str) -> dict[str, Any]:
         """Exchange authorization code for access token"""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{YandexMetrikaService.OAUTH_BASE_URL}/token",
-                data={
-                    "grant_type": "authorization_code",
-                    "code": code,
-                    "client_id": settings.yandex_client_id,
-                    "client_secret": settings.yandex_client_secret,
-                    "redirect_uri": settings.yandex_redirect_uri,  # Required!
-                },
-            )
-            response.raise_for_status()
-            data = response.json()
+        client = get_http_client()
+        response = await client.post(
+            f"{YandexMetrikaService.OAUTH_BASE_URL}/token",
+            data={
+                "grant_type": "authorization_code",
+                "code": code,
+                "client_id": settings.yandex_client_id,
+                "client_secret": settings.yandex_client_secret,
+                "redirect_uri": settings.yandex_redirect_uri,  # Required!
+            },
+        )
+        response.raise_for_status()
+        data = response.json()
 
-            # Calculate expires_at (timezone-naive UTC)
-            expires_in = data.get("expires_in", 31536000)  # Default 1 year
-            expires_at = datetime.datetime.utcnow() + datetime.timedelta(
-                seconds=expires_in
-            )
+        # Calculate expires_at (timezone-naive UTC)
+        expires_in = data.get("expires_in", 31536000)  # Default 1 year
+        expires_at = datetime.datetime.utcnow() + datetime.timedelta(
+            seconds=expires_in
+        )
 
-            return {
-                "access_token": data["access_token"],
-                "refresh_token": data.get("refresh_token"),
-                "expires_at": expires_at,
-            }
+        return {
+            "access_token": data["access_token"],
+            "refresh_token": data.get("refresh_token"),
+            "expires_at": expires_at,
+        }
 
     @staticmethod
     async def refresh_access_token(refresh_token: str) -> dict[str, Any]:
         """Refresh access token using refresh token"""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{YandexMetrikaService.OAUTH_BASE_URL}/token",
-                data={
-                    "grant_type": "refresh_token",
-                    "refresh_token": refresh_token,
-                    "client_id": settings.yandex_client_id,
-                    "client_secret": settings.yandex_client_secret,
-                },
-            )
-            response.raise_for_status()
-            data = response.json()
+        client = get_http_client()
+        response = await client.post(
+            f"{YandexMetrikaService.OAUTH_BASE_URL}/token",
+            data={
+                "grant_type": "refresh_token",
+                "refresh_token": refresh_token,
+                "client_id": settings.yandex_client_id,
+                "client_secret": settings.yandex_client_secret,
+            },
+        )
+        response.raise_for_status()
+        data = response.json()
 
-            expires_in = data.get("expires_in", 31536000)
-            expires_at = datetime.datetime.utcnow() + datetime.timedelta(
-                seconds=expires_in
-            )
+        expires_in = data.get("expires_in", 31536000)
+        expires_at = datetime.datetime.utcnow() + datetime.timedelta(
+            seconds=expires_in
+        )
 
-            return {
-                "access_token": data["access_token"],
-                "refresh_token": data.get("refresh_token"),
-                "expires_at": expires_at,
-            }
+        return {
+            "access_token": data["access_token"],
+            "refresh_token": data.get("refresh_token"),
+            "expires_at": expires_at,
+        }
 
     async def list_counters(self) -> list[dict[str, Any]]:
         """Get list of available counters"""
-        response = await self.client.get(f"{self.API_BASE_URL}/management/v1/counters")
-        response.raise_for_status()
+        response = await self._request("GET", f"{self.API_BASE_URL}/management/v1/counters")
+        if response.status_code != 200:
+            raise YandexApiError(
+                f"Yandex API {response.status_code}: {response.text}",
+                status_code=response.status_code,
+            )
         data = response.json()
 
         counters = data.get("counters", [])
@@ -127,16 +310,6 @@ class YandexMetrikaService:
             ...
         }
         """
-        metrics = [
-            "ym:s:pageviews",  # просмотры (views)
-            "ym:s:visits",  # визиты
-            "ym:s:users",  # пользователи
-            "ym:s:avgVisitDurationSeconds",  # среднее время (avg_time)
-            "ym:s:pageDepth",  # глубина
-            "ym:s:bounceRate",  # показатель отказов
-            "ym:s:newUsers",  # новые пользователи (для расчета return_rate)
-        ]
-
         # Calculate the number of days in the requested period to set the API limit.
         # Yandex Metrika API defaults to limit=100 rows — without an explicit limit,
         # requests for quarter/year periods silently return only the first 100 days.
@@ -148,7 +321,7 @@ class YandexMetrikaService:
             "ids": counter_id,
             "date1": date_from.strftime("%Y-%m-%d"),
             "date2": date_to.strftime("%Y-%m-%d"),
-            "metrics": ",".join(metrics),
+            "metrics": ",".join(STAT_METRICS),
             "dimensions": "ym:s:date",
             "group": "day",
             "accuracy": "high",
@@ -157,13 +330,14 @@ class YandexMetrikaService:
         if exclude_robots:
             params["filters"] = "ym:s:isRobot=='No'"
 
-        response = await self.client.get(
-            f"{self.API_BASE_URL}/stat/v1/data", params=params
+        response = await self._request(
+            "GET", f"{self.API_BASE_URL}/stat/v1/data", params=params
         )
         if response.status_code != 200:
             error_body = response.text
-            raise Exception(
-                f"Yandex API {response.status_code}: {error_body}"
+            raise YandexApiError(
+                f"Yandex API {response.status_code}: {error_body}",
+                status_code=response.status_code,
             )
         data = response.json()
 
@@ -180,26 +354,83 @@ class YandexMetrikaService:
 
             date_str = dimensions[0]["name"]  # Format: YYYY-MM-DD
 
-            # Extract metrics (order matches request)
-            views = int(metrics_values[0]) if len(metrics_values) > 0 else 0
-            visits = int(metrics_values[1]) if len(metrics_values) > 1 else 0
-            users = int(metrics_values[2]) if len(metrics_values) > 2 else 0
-            avg_time = float(metrics_values[3]) if len(metrics_values) > 3 else 0.0
-            depth = float(metrics_values[4]) if len(metrics_values) > 4 else 0.0
-            bounce_rate = float(metrics_values[5]) if len(metrics_values) > 5 else 0.0
-            new_users = int(metrics_values[6]) if len(metrics_values) > 6 else 0
-
-            # Calculate return_rate as (users - new_users) / users
-            return_rate = max(0.0, (users - new_users) / users) if users > 0 else 0.0
-
-            result[date_str] = {
-                "views": views,
-                "visits": visits,
-                "users": users,
-                "avg_time": avg_time,
-                "depth": depth,
-                "bounce_rate": bounce_rate,
-                "return_rate": return_rate,
-            }
+            result[date_str] = _day_metrics(_parse_metric_values(metrics_values))
 
         return result
+
+    async def fetch_metrics_by_robot(
+        self,
+        counter_id: str,
+        date_from: datetime.date,
+        date_to: datetime.date,
+    ) -> tuple[dict[str, Any], dict[str, Any]]:
+        """
+        Fetch both robot variants in one request: (exclude_robots=True, exclude_robots=False)
+
+        Requests ym:s:isRobot as a second dimension and derives the two datasets
+        locally: the "No" rows are the filtered series; the with-robots series sums
+        both rows per day, with avg_time, depth and bounce_rate weighted by visits
+        (all three are per-visit averages, so this matches the unfiltered report).
+        users/new_users are summed too, which is only approximately the unfiltered
+        value — a visitor seen both as a robot and as a person is counted twice.
+        The day entries have the same shape as fetch_metrics().
+        """
+        days_in_period = (date_to - date_from).days + 1
+        # Up to two rows per day
+        api_limit = min(max(2 * days_in_period + 10, 100), 100_000)
+
+        params = {
+            "ids": counter_id,
+            "date1": date_from.strftime("%Y-%m-%d"),
+            "date2": date_to.strftime("%Y-%m-%d"),
+            "metrics": ",".join(STAT_METRICS),
+            "dimensions": "ym:s:date,ym:s:isRobot",
+            "group": "day",
+            "accuracy": "high",
+            "limit": api_limit,
+        }
+
+        response = await self._request(
+            "GET", f"{self.API_BASE_URL}/stat/v1/data", params=params
+        )
+        if response.status_code != 200:
+            raise YandexApiError(
+                f"Yandex API {response.status_code}: {response.text}",
+                status_code=response.status_code,
+            )
+        data = response.json()
+
+        humans: dict[str, dict[str, Any]] = {}
+        totals: dict[str, dict[str, Any]] = {}
+
+        for row in data.get("data", []):
+            dimensions = row.get("dimensions", [])
+            metrics_values = row.get("metrics", [])
+
+            if len(dimensions) < 2 or not metrics_values:
+                continue
+
+            date_str = dimensions[0]["name"]  # Format: YYYY-MM-DD
+            raw = _parse_metric_values(metrics_values)
+            if not _is_robot(dimensions[1]):
+                humans[date_str] = raw
+
+            total = totals.setdefault(date_str, {
+                "views": 0, "visits": 0, "users": 0, "new_users": 0,
+                "avg_time": 0.0, "depth": 0.0, "bounce_rate": 0.0,
+            })
+            for key in ("views", "visits", "users", "new_users"):
+                total[key] += raw[key]
+            # Visit-weighted sums, divided by total visits below
+            for key in ("avg_time", "depth", "bounce_rate"):
+                total[key] += raw[key] * raw["visits"]
+
+        for total in totals.values():
+            visits = total["visits"]
+            for key in ("avg_time", "depth", "bounce_rate"):
+                total[key] = total[key] / visits if visits > 0 else 0.0
+
+        return (
+            {date_str: _day_metrics(raw) for date_str, raw in humans.items()},
+            {date_str: _day_metrics(raw) for date_str, raw in totals.items()},
+        )
@@ -0,0 +1,146 @@
+"""
+Yandex API rate limiting
+
+Client-side guards shared by every YandexMetrikaService built for the same
+OAuth token: a token bucket that keeps request rate under the API quota and a
+circuit breaker that fails fast while the API keeps erroring for that token.
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Async token bucket: `rate` requests per second with bursts up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Hold all requests for this token, e.g. after a 429 with Retry-After"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+
+class CircuitOpen(Exception):
+    """Raised by CircuitBreaker.before_request while the circuit is open"""
+
+    def __init__(self, retry_in: float):
+        super().__init__(f"circuit open, retry in {retry_in:.1f}s")
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+
+    closed → open after `failure_threshold` failures in a row; open → half-open
+    after `reset_timeout` seconds, letting a single probe through; the probe's
+    outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def before_request(self) -> bool:
+        """
+        Admit a request or raise CircuitOpen; True when it is the half-open probe
+
+        The probe's caller must record an outcome however the request ends
+        (record_failure() when it is cancelled or errors unexpectedly),
+        otherwise no further probe is ever let through.
+        """
+        state = self.state
+        if state == "closed":
+            return False
+        if state == "half-open" and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+        retry_in = max(0.0, self.reset_timeout - (time.monotonic() - (self.opened_at or 0.0)))
+        raise CircuitOpen(retry_in)
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.probe_in_flight or self.failures >= self.failure_threshold:
+            if self.opened_at is None or self.probe_in_flight:
+                logger.warning(f"Yandex API circuit opened after {self.failures} consecutive failures")
+            self.opened_at = time.monotonic()
+            self.probe_in_flight = False
+
+
+class TokenGuard:
+    """Rate limiter and circuit breaker for one OAuth token"""
+
+    def __init__(self):
+        self.bucket = TokenBucket(
+            rate=settings.yandex_rate_limit_per_second,
+            capacity=settings.yandex_rate_limit_burst,
+        )
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.yandex_circuit_failure_threshold,
+            reset_timeout=settings.yandex_circuit_reset_seconds,
+        )
+
+
+# Guards keyed by a hash of the access token, so raw tokens are not kept around
+_guards: dict[str, TokenGuard] = {}
+
+
+def get_token_guard(access_token: str) -> TokenGuard:
+    """Return the process-wide guard for an OAuth token"""
+    key = hashlib.sha256(access_token.encode()).hexdigest()
+    guard = _guards.get(key)
+    if guard is None:
+        guard = _guards[key] = TokenGuard()
+    return guard
+
+
+def reset_token_guards() -> None:
+    """Forget all limiter/breaker state (used by benchmarks)"""
+    _guards.clear()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Regression check: a half-open circuit's probe always records an outcome.
+
+Drives YandexMetrikaService._request through an in-process mock transport.
+The circuit is opened, its reset timeout lets one probe through, and that
+probe is made to end without a response:
+
+- cancelled during the HTTP call (e.g. the scheduler's wait_for timeout)
+- cancelled while waiting for the rate limiter
+- failing with an httpx error that is not a TransportError
+
+After each, the next probe must be admitted once the reset timeout passes
+again, and a successful probe must close the circuit. Exits non-zero if a
+case fails. No network, database or credentials are needed.
+
+Usage (from backend/):
+    python -m benchmarks.circuit_breaker_check
+"""
+
+import asyncio
+import secrets
+
+import httpx
+
+from app.config import settings
+from app.services.yandex_metrika import YandexApiError, YandexMetrikaService
+from app.services.yandex_rate_limit import reset_token_guards
+
+RESET_SECONDS = 0.05
+URL = "https://api-metrika.yandex.net/stat/v1/data"
+
+
+async def hang(request: httpx.Request) -> httpx.Response:
+    await asyncio.sleep(3600)
+    raise AssertionError("unreachable")
+
+
+async def decoding_error(request: httpx.Request) -> httpx.Response:
+    raise httpx.DecodingError("malformed body", request=request)
+
+
+async def ok(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, json={"data": []})
+
+
+def make_service(handler) -> YandexMetrikaService:
+    """Service on a fresh token whose circuit is open and due for a probe"""
+    service = YandexMetrikaService(
+        secrets.token_hex(8), client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    breaker = service.guard.breaker
+    breaker.reset_timeout = RESET_SECONDS
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    assert breaker.state == "open", breaker.state
+    return service
+
+
+async def probe_without_outcome(service: YandexMetrikaService, name: str) -> None:
+    if name == "cancelled in HTTP call":
+        try:
+            await asyncio.wait_for(service._request("GET", URL), timeout=0.05)
+        except asyncio.TimeoutError:
+            pass
+    elif name == "cancelled in rate limiter":
+        service.guard.bucket.pause(3600)
+        try:
+            await asyncio.wait_for(service._request("GET", URL), timeout=0.05)
+        except asyncio.TimeoutError:
+            pass
+        service.guard.bucket.paused_until = 0.0
+        service.guard.bucket.tokens = service.guard.bucket.capacity
+    else:
+        try:
+            await service._request("GET", URL)
+        except httpx.DecodingError:
+            pass
+
+
+async def check(name: str, handler) -> bool:
+    service = make_service(handler)
+    breaker = service.guard.breaker
+    await asyncio.sleep(RESET_SECONDS)
+    assert breaker.state == "half-open"
+
+    await probe_without_outcome(service, name)
+    problems = []
+    if breaker.probe_in_flight:
+        problems.append("probe still marked in flight")
+
+    # Next probe after the reset timeout must be admitted and close the circuit
+    await asyncio.sleep(RESET_SECONDS)
+    service.client = httpx.AsyncClient(transport=httpx.MockTransport(ok))
+    try:
+        response = await service._request("GET", URL)
+        if response.status_code != 200:
+            problems.append(f"probe got {response.status_code}")
+    except YandexApiError as e:
+        problems.append(f"next probe rejected: {e}")
+    if breaker.state != "closed":
+        problems.append(f"circuit {breaker.state} after a successful probe")
+
+    print(f"  {name:<28} {'ok' if not problems else 'FAIL: ' + '; '.join(problems)}")
+    return not problems
+
+
+async def main() -> None:
+    settings.yandex_retry_attempts = 1
+    reset_token_guards()
+    print("Half-open probe ending without a response:")
+    results = [
+        await check("cancelled in HTTP call", hang),
+        await check("cancelled in rate limiter", ok),
+        await check("non-transport httpx error", decoding_error),
+    ]
+    if not all(results):
+        raise SystemExit(1)
+    print("\nAll probes released the circuit")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Compare dashboard query plans before and after the covering indexes (migration 006).
+
+Seeds a scratch library with several years of daily traffic, VK and engagement rows,
+prints EXPLAIN (ANALYZE, BUFFERS) for the main dashboard queries with the legacy
+indexes ("before") and with the covering indexes ("after"), then deletes the seed.
+
+The "before" plans run inside a transaction that swaps the indexes and is rolled
+back, so the schema is left untouched. DROP INDEX takes an exclusive lock on the
+table — run this against a development database, not production.
+
+Usage (from backend/):
+    python -m benchmarks.dashboard_indexes [--years 3] [--channels 4]
+"""
+
+import argparse
+import asyncio
+import datetime
+import uuid
+
+from sqlalchemy import text
+
+from app.database import engine
+
+# Indexes from 001/003 that migration 006 replaces
+LEGACY_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_traffic_metrics_library_date ON traffic_metrics(library_id, date)",
+    "CREATE INDEX IF NOT EXISTS idx_traffic_metrics_channel_date ON traffic_metrics(channel_id, date)",
+    "CREATE INDEX IF NOT EXISTS idx_vk_metrics_library ON vk_metrics(library_id)",
+    "CREATE INDEX IF NOT EXISTS idx_engagement_metrics_library_date ON engagement_metrics(library_id, date)",
+]
+
+COVERING_INDEXES = [
+    "idx_traffic_metrics_library_robots_date",
+    "idx_traffic_metrics_counter_robots_date",
+    "idx_traffic_metrics_channel_robots_date",
+    "idx_vk_metrics_library_date",
+    "idx_engagement_metrics_library_date_cov",
+]
+
+QUERIES = {
+    "overview (current + previous sums)": """
+        SELECT
+          coalesce(sum(views) FILTER (WHERE date BETWEEN :date_from AND :date_to), 0),
+          coalesce(sum(visits) FILTER (WHERE date BETWEEN :date_from AND :date_to), 0),
+          coalesce(sum(views) FILTER (WHERE date BETWEEN :prev_from AND :prev_to), 0),
+          coalesce(sum(visits) FILTER (WHERE date BETWEEN :prev_from AND :prev_to), 0)
+        FROM traffic_metrics
+        WHERE library_id = :library_id AND exclude_robots = true
+          AND date >= :prev_from AND date <= :date_to
+    """,
+    "behavior timeline by counter": """
+        SELECT counter_id, date, avg(avg_time), avg(depth), avg(bounce_rate), avg(return_rate)
+        FROM traffic_metrics
+        WHERE library_id = :library_id AND counter_id = :counter_id AND exclude_robots = true
+          AND date >= :date_from AND date <= :date_to
+        GROUP BY counter_id, date
+    """,
+    "channel trend": """
+        SELECT date, sum(views), sum(visits), sum(users)
+        FROM traffic_metrics
+        WHERE library_id = :library_id AND channel_id = :channel_id AND exclude_robots = true
+          AND date >= :date_from AND date <= :date_to
+        GROUP BY date ORDER BY date
+    """,
+    "vk reach": """
+        SELECT date, visitors, views, posts, stories, clips, videos, total_subscribers
+        FROM vk_metrics
+        WHERE library_id = :library_id AND date >= :date_from AND date <= :date_to
+        ORDER BY date
+    """,
+    "engagement totals": """
+        SELECT coalesce(sum(likes), 0), coalesce(sum(reposts), 0), coalesce(sum(comments), 0)
+        FROM engagement_metrics
+        WHERE library_id = :library_id AND date >= :date_from AND date <= :date_to
+    """,
+}
+
+
+async def seed(library_id: uuid.UUID, years: int, channels: int) -> tuple[uuid.UUID, uuid.UUID]:
+    """Insert a scratch library with `years` of daily rows per channel and robots variant."""
+    days = years * 365
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("INSERT INTO libraries (id, name) VALUES (:id, 'benchmark: dashboard indexes')"),
+            {"id": library_id},
+        )
+        channel_ids = [uuid.uuid4() for _ in range(channels)]
+        counter_ids = [uuid.uuid4() for _ in range(channels)]
+        for i, (channel_id, counter_id) in enumerate(zip(channel_ids, counter_ids)):
+            await conn.execute(
+                text(
+                    "INSERT INTO channels (id, library_id, type, custom_name, is_manual)"
+                    " VALUES (:id, :library_id, 'website', :name, false)"
+                ),
+                {"id": channel_id, "library_id": library_id, "name": f"bench {i}"},
+            )
+            await conn.execute(
+                text(
+                    "INSERT INTO metric_counters (id, library_id, name, yandex_counter_id)"
+                    " VALUES (:id, :library_id, :name, '0')"
+                ),
+                {"id": counter_id, "library_id": library_id, "name": f"bench {i}"},
+            )
+            await conn.execute(
+                text("""
+                    INSERT INTO traffic_metrics
+                      (library_id, channel_id, counter_id, date, exclude_robots,
+                       views, visits, users, avg_time, depth, bounce_rate, return_rate)
+                    SELECT :library_id, :channel_id, :counter_id, d::date, r,
+                      (800 + random() * 400)::int, (300 + random() * 200)::int,
+                      (200 + random() * 150)::int, 120 + random() * 60,
+                      2.5 + random() * 1.5, 10 + random() * 15, 30 + random() * 20
+                    FROM generate_series(CURRENT_DATE - :days, CURRENT_DATE, interval '1 day') AS d,
+                         (VALUES (true), (false)) AS robots(r)
+                """),
+                {"library_id": library_id, "channel_id": channel_id, "counter_id": counter_id, "days": days},
+            )
+        await conn.execute(
+            text("""
+                INSERT INTO vk_metrics (library_id, channel_id, date, visitors, views, posts, total_subscribers)
+                SELECT :library_id, :channel_id, d::date, (random() * 500)::int,
+                  (random() * 2000)::int, (random() * 3)::int, 5000
+                FROM generate_series(CURRENT_DATE - :days, CURRENT_DATE, interval '1 day') AS d
+            """),
+            {"library_id": library_id, "channel_id": channel_ids[0], "days": days},
+        )
+        await conn.execute(
+            text("""
+                INSERT INTO engagement_metrics (library_id, channel_id, date, likes, reposts, comments)
+                SELECT :library_id, :channel_id, d::date, (random() * 50)::int,
+                  (random() * 10)::int, (random() * 10)::int
+                FROM generate_series(CURRENT_DATE - :days, CURRENT_DATE, interval '1 day') AS d
+            """),
+            {"library_id": library_id, "channel_id": channel_ids[0], "days": days},
+        )
+
+    # VACUUM refreshes the visibility map that index-only scans depend on
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for table in ("traffic_metrics", "vk_metrics", "engagement_metrics"):
+            await conn.execute(text(f"VACUUM ANALYZE {table}"))
+
+    return channel_ids[0], counter_ids[0]
+
+
+async def explain_all(conn, params: dict) -> None:
+    for title, sql in QUERIES.items():
+        plan = await conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"), params)
+        print(f"--- {title}")
+        for (line,) in plan:
+            print(f"    {line}")
+
+
+async def main(years: int, channels: int) -> None:
+    library_id = uuid.uuid4()
+    print(f"[..] Seeding {years} years x {channels} channels for library {library_id}")
+    channel_id, counter_id = await seed(library_id, years, channels)
+
+    today = datetime.date.today()
+    params = {
+        "library_id": library_id,
+        "channel_id": channel_id,
+        "counter_id": counter_id,
+        "date_from": today - datetime.timedelta(days=364),
+        "date_to": today,
+        "prev_from": today - datetime.timedelta(days=729),
+        "prev_to": today - datetime.timedelta(days=365),
+    }
+
+    try:
+        print("\n========== BEFORE (legacy indexes) ==========")
+        async with engine.connect() as conn:
+            trans = await conn.begin()
+            for name in COVERING_INDEXES:
+                await conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+            for ddl in LEGACY_INDEXES:
+                await conn.execute(text(ddl))
+            await conn.execute(text("ANALYZE traffic_metrics"))
+            await explain_all(conn, params)
+            await trans.rollback()
+
+        print("\n========== AFTER (covering indexes) ==========")
+        async with engine.connect() as conn:
+            await explain_all(conn, params)
+    finally:
+        async with engine.begin() as conn:
+            await conn.execute(text("DELETE FROM libraries WHERE id = :id"), {"id": library_id})
+        print(f"\n[OK] Removed benchmark library {library_id}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--channels", type=int, default=4)
+    args = parser.parse_args()
+    asyncio.run(main(args.years, args.channels))
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Compare ORM-entity reads with column-tuple reads on dashboard-sized results.
+
+Fills an in-memory SQLite database with a year of VK metrics for a few
+channels and a few hundred reviews, then runs each read both ways — select(Model)
++ .scalars() (full entities, identity map, instrumentation) and select(columns)
++ plain rows straight into the Pydantic response — and prints, per request,
+the mean time and the peak memory allocated (tracemalloc) for both paths.
+
+SQLite stands in for Postgres so no server is needed: the driver cost differs
+from asyncpg, but the ORM overhead being measured is the same.
+
+Usage (from backend/):
+    python -m benchmarks.orm_row_fetch [--channels 3] [--reviews 500] [--repeat 50]
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+import uuid
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+import app.models  # noqa: F401  (registers all mappers)
+from app.models.base import Base
+from app.models.review import Review
+from app.models.vk_metric import VkMetric
+from app.schemas.dashboard import ReviewItem
+from app.schemas.vk import VkContentPoint, VkReachPoint
+
+VK_COLUMNS = ("date", "visitors", "views", "posts", "stories", "clips", "videos")
+
+
+def populate(engine, library_id: uuid.UUID, channels: int, reviews: int) -> None:
+    rng = random.Random(42)
+    start = date(2025, 1, 1)
+    Base.metadata.create_all(engine, tables=[VkMetric.__table__, Review.__table__])
+    with Session(engine) as session:
+        session.execute(insert(VkMetric), [
+            {
+                "id": uuid.uuid4(),
+                "library_id": library_id,
+                "channel_id": channel_id,
+                "date": start + timedelta(days=day),
+                **{field: rng.randrange(0, 1000) for field in VK_COLUMNS[1:]},
+                "subscribed": 1, "unsubscribed": 0, "total_subscribers": 1000 + day, "site_clicks": 0,
+            }
+            for channel_id in (uuid.uuid4() for _ in range(channels))
+            for day in range(365)
+        ])
+        session.execute(insert(Review), [
+            {
+                "id": uuid.uuid4(),
+                "library_id": library_id,
+                "platform": rng.choice(["yandex", "2gis", "google"]),
+                "date": start + timedelta(days=rng.randrange(365)),
+                "rating": rng.randrange(1, 6),
+                "text": "Отзыв " * rng.randrange(5, 50),
+                "sentiment": rng.choice(["positive", "neutral", "negative"]),
+            }
+            for _ in range(reviews)
+        ])
+        session.commit()
+
+
+def vk_entities(session: Session, library_id: uuid.UUID) -> list:
+    metrics = session.execute(
+        select(VkMetric).where(VkMetric.library_id == library_id).order_by(VkMetric.date)
+    ).scalars().all()
+    return [VkReachPoint(date=str(m.date), reach=m.visitors, views=m.views) for m in metrics] + [
+        VkContentPoint(date=str(m.date), posts=m.posts, stories=m.stories, clips=m.clips, videos=m.videos)
+        for m in metrics
+    ]
+
+
+def vk_tuples(session: Session, library_id: uuid.UUID) -> list:
+    rows = session.execute(
+        select(*(getattr(VkMetric, c) for c in VK_COLUMNS))
+        .where(VkMetric.library_id == library_id)
+        .order_by(VkMetric.date)
+    ).all()
+    return [VkReachPoint(date=str(r.date), reach=r.visitors, views=r.views) for r in rows] + [
+        VkContentPoint(date=str(r.date), posts=r.posts, stories=r.stories, clips=r.clips, videos=r.videos)
+        for r in rows
+    ]
+
+
+def reviews_entities(session: Session, library_id: uuid.UUID) -> list:
+    reviews = session.execute(
+        select(Review).where(Review.library_id == library_id).order_by(Review.date.desc()).limit(100)
+    ).scalars().all()
+    return [
+        ReviewItem(id=r.id, platform=r.platform, date=r.date, rating=r.rating, text=r.text, sentiment=r.sentiment)
+        for r in reviews
+    ]
+
+
+def reviews_tuples(session: Session, library_id: uuid.UUID) -> list:
+    rows = session.execute(
+        select(Review.id, Review.platform, Review.date, Review.rating, Review.text, Review.sentiment)
+        .where(Review.library_id == library_id)
+        .order_by(Review.date.desc())
+        .limit(100)
+    ).all()
+    return [ReviewItem(**r._mapping) for r in rows]
+
+
+def measure(engine, fn, library_id: uuid.UUID, repeat: int) -> tuple[float, int, list]:
+    """Mean seconds per request (fresh session each time) and tracemalloc peak bytes"""
+    for _ in range(3):  # warm statement caches
+        with Session(engine) as session:
+            fn(session, library_id)
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        with Session(engine) as session:
+            fn(session, library_id)
+    elapsed = (time.perf_counter() - started) / repeat
+
+    tracemalloc.start()
+    with Session(engine) as session:
+        result = fn(session, library_id)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def main(channels: int, reviews: int, repeat: int) -> None:
+    engine = create_engine("sqlite://")
+    library_id = uuid.uuid4()
+    populate(engine, library_id, channels, reviews)
+    print(f"{channels} channels x 365 days of VK metrics, {reviews} reviews; mean of {repeat} requests\n")
+    print(f"  {'request':<22} {'path':<9} {'time':>9} {'peak alloc':>12}")
+
+    for name, entity_fn, tuple_fn in [
+        ("VK trends (year)", vk_entities, vk_tuples),
+        ("reviews page (100)", reviews_entities, reviews_tuples),
+    ]:
+        results = []
+        for path, fn in [("entities", entity_fn), ("tuples", tuple_fn)]:
+            elapsed, peak, result = measure(engine, fn, library_id, repeat)
+            results.append((elapsed, peak, result))
+            print(f"  {name:<22} {path:<9} {elapsed * 1000:7.2f}ms {peak / 1024:9.0f} KiB")
+        (t_entities, m_entities, r_entities), (t_tuples, m_tuples, r_tuples) = results
+        assert r_entities == r_tuples, f"{name}: results differ"
+        print(f"  {'':<22} {'saved':<9} {1 - t_tuples / t_entities:8.0%} {1 - m_tuples / m_entities:11.0%}")
+
+    print("\nBoth paths return identical responses")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--channels", type=int, default=3)
+    parser.add_argument("--reviews", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    main(args.channels, args.reviews, args.repeat)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Compare the combined robots fetch with the two-request path on real Metrika data.
+
+For every active counter of a library, fetches the period twice — once with
+fetch_metrics() for each robot variant (2 requests) and once with
+fetch_metrics_by_robot() (1 request) — and prints, per variant and metric, how
+many days match and the largest difference. Run it before turning on
+YANDEX_COMBINED_ROBOTS_FETCH. Read-only: nothing is written to the database.
+
+Usage (from backend/):
+    python -m benchmarks.robots_fetch_check --library-id <uuid> [--days 30]
+"""
+
+import argparse
+import asyncio
+import datetime
+import time
+import uuid
+
+from app.database import async_session
+from app.services.http_client import close_http_client
+from app.services.sync_service import TRAFFIC_METRIC_FIELDS, get_valid_token, load_matched_counters
+from app.services.yandex_metrika import YandexMetrikaService
+
+# Relative tolerance for float metrics (the API rounds averages)
+FLOAT_TOLERANCE = 1e-6
+
+
+def compare(name: str, expected: dict, actual: dict) -> bool:
+    """Print a per-metric comparison of two fetch_metrics() results; True if identical"""
+    ok = True
+    missing = sorted(set(expected) ^ set(actual))
+    if missing:
+        ok = False
+        print(f"    {name}: days present in only one result: {missing[:5]}{'…' if len(missing) > 5 else ''}")
+
+    common = sorted(set(expected) & set(actual))
+    for field in TRAFFIC_METRIC_FIELDS:
+        mismatched = 0
+        max_diff = 0.0
+        for date_str in common:
+            a, b = expected[date_str][field], actual[date_str][field]
+            diff = abs(a - b)
+            if diff > FLOAT_TOLERANCE * max(1.0, abs(a)):
+                mismatched += 1
+                max_diff = max(max_diff, diff)
+        if mismatched:
+            ok = False
+        status = "ok" if not mismatched else f"{mismatched} days differ, max diff {max_diff:.4g}"
+        print(f"    {name:<13} {field:<12} {len(common) - mismatched}/{len(common)} match  {status}")
+    return ok
+
+
+async def main(library_id: uuid.UUID, days: int) -> None:
+    date_to = datetime.date.today()
+    date_from = date_to - datetime.timedelta(days=days - 1)
+
+    async with async_session() as db:
+        token = await get_valid_token(db, library_id)
+        if not token:
+            raise SystemExit("No valid Yandex token for this library")
+        matched, _ = await load_matched_counters(db, library_id)
+        access_token = token.access_token
+
+    if not matched:
+        raise SystemExit("No active counters with matching channels")
+
+    all_ok = True
+    try:
+        async with YandexMetrikaService(access_token) as ym_service:
+            for counter, _ in matched:
+                print(f"\nCounter {counter.yandex_counter_id} ({counter.name}), {date_from} → {date_to}")
+
+                started = time.monotonic()
+                filtered = await ym_service.fetch_metrics(
+                    counter.yandex_counter_id, date_from, date_to, exclude_robots=True
+                )
+                with_robots = await ym_service.fetch_metrics(
+                    counter.yandex_counter_id, date_from, date_to, exclude_robots=False
+                )
+                two_call = time.monotonic() - started
+
+                started = time.monotonic()
+                combined_filtered, combined_with_robots = await ym_service.fetch_metrics_by_robot(
+                    counter.yandex_counter_id, date_from, date_to
+                )
+                one_call = time.monotonic() - started
+
+                print(f"  two requests {two_call:.2f}s, combined request {one_call:.2f}s")
+                all_ok &= compare("no robots", filtered, combined_filtered)
+                # users/return_rate with robots are expected to differ slightly
+                all_ok &= compare("with robots", with_robots, combined_with_robots)
+    finally:
+        await close_http_client()
+
+    print("\nAll metrics match" if all_ok else "\nDifferences found (see above)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--library-id", type=uuid.UUID, required=True)
+    parser.add_argument("--days", type=int, default=30)
+    args = parser.parse_args()
+    asyncio.run(main(args.library_id, args.days))
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Measure VK CSV parsing throughput on a synthetic export.
+
+Writes a temporary `;`-delimited export shaped like VK community statistics
+(a year of dates, every metric name, some junk rows), then times:
+
+  before — the original row loop (strptime per row, add_metric via getattr/setattr)
+  after  — parse_vk_csv (memoized date decoder, metric-name→slot index)
+  stream — VkCsvStreamParser fed in 1 MiB chunks
+  columnar / columnar-py — VkCsvColumnarParser with NumPy (if installed) and
+           with its pure-Python batch fallback
+
+and checks that all engines produce the same totals. No database is needed.
+
+Usage (from backend/):
+    python -m benchmarks.vk_csv_parse [--rows 1000000] [--repeat 3]
+"""
+
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from app.services.vk_csv_service import (
+    ENGAGEMENT_METRIC_MAPPING,
+    METRIC_FIELDS,
+    VK_METRIC_MAPPING,
+    VkCsvStreamParser,
+    parse_vk_csv,
+)
+from app.services import vk_csv_columnar
+
+HEADER = [
+    "Раздел", "Подраздел", "Дата", "Время", "Вид данных",
+    "Сортировка: гранулярность", "Сортировка: вид разреза", "Параметр легенды", "Значение",
+]
+
+
+def write_export(path: str, rows: int) -> None:
+    rng = random.Random(42)
+    names = [*VK_METRIC_MAPPING, *ENGAGEMENT_METRIC_MAPPING, "Охват подписчиков"]
+    dates = [(date(2025, 1, 1) + timedelta(days=i)).strftime("%d.%m.%Y") for i in range(365)]
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(HEADER)
+        for i in range(rows):
+            value = str(rng.randrange(0, 500)) if i % 50 else "—"
+            writer.writerow([
+                "Статистика", "Охват", rng.choice(dates), "", "Сумма", "День", "Все",
+                rng.choice(names), value,
+            ])
+
+
+def legacy_parse(file_path: str) -> dict:
+    """The pre-optimization parse_vk_csv loop, kept here as the baseline"""
+
+    class LegacyDailyMetrics:
+        def __init__(self, date_obj):
+            self.date = date_obj
+            for field in METRIC_FIELDS:
+                setattr(self, field, 0)
+
+        def add_metric(self, metric_name, value):
+            if metric_name in VK_METRIC_MAPPING:
+                field_name = VK_METRIC_MAPPING[metric_name]
+                setattr(self, field_name, getattr(self, field_name, 0) + value)
+            elif metric_name in ENGAGEMENT_METRIC_MAPPING:
+                field_name = ENGAGEMENT_METRIC_MAPPING[metric_name]
+                setattr(self, field_name, getattr(self, field_name, 0) + value)
+
+    daily_metrics = {}
+    with open(file_path, "r", encoding="utf-8") as f:
+        reader = csv.reader(f, delimiter=";")
+        next(reader)
+        for row in reader:
+            if len(row) < 9:
+                continue
+            try:
+                date_obj = datetime.strptime(row[2], "%d.%m.%Y").date()
+                value = int(row[8])
+                if date_obj not in daily_metrics:
+                    daily_metrics[date_obj] = LegacyDailyMetrics(date_obj)
+                daily_metrics[date_obj].add_metric(row[7], value)
+            except (ValueError, IndexError):
+                continue
+    return daily_metrics
+
+
+def feed_file(parser: VkCsvStreamParser, file_path: str) -> dict:
+    with open(file_path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            parser.feed(chunk)
+    return parser.finish()
+
+
+def stream_parse(file_path: str) -> dict:
+    return feed_file(VkCsvStreamParser(), file_path)
+
+
+def columnar_parse(file_path: str) -> dict:
+    return feed_file(vk_csv_columnar.VkCsvColumnarParser(), file_path)
+
+
+def columnar_python_parse(file_path: str) -> dict:
+    numpy_module, vk_csv_columnar.np = vk_csv_columnar.np, None
+    try:
+        return columnar_parse(file_path)
+    finally:
+        vk_csv_columnar.np = numpy_module
+
+
+def totals(daily_metrics: dict) -> dict:
+    return {
+        day: tuple(getattr(metrics, field) for field in METRIC_FIELDS)
+        for day, metrics in daily_metrics.items()
+    }
+
+
+def main(rows: int, repeat: int) -> None:
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    os.close(fd)
+    try:
+        write_export(path, rows)
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        print(f"Synthetic export: {rows:,} rows, {size_mb:.1f} MiB\n")
+
+        engines = [
+            ("before", legacy_parse),
+            ("after", parse_vk_csv),
+            ("stream", stream_parse),
+            ("columnar-py", columnar_python_parse),
+        ]
+        if vk_csv_columnar.numpy_available():
+            engines.append((f"columnar (numpy {vk_csv_columnar.numpy_available()})", columnar_parse))
+
+        results = {}
+        for name, engine in engines:
+            best = float("inf")
+            for _ in range(repeat):
+                started = time.perf_counter()
+                parsed = engine(path)
+                best = min(best, time.perf_counter() - started)
+            results[name] = totals(parsed)
+            print(f"  {name:<26} {best:6.2f}s  {rows / best:>12,.0f} rows/s")
+
+        baseline = results["before"]
+        for name, result in results.items():
+            assert result == baseline, f"{name} totals differ from the baseline"
+        print("\nAll engines produce identical totals")
+    finally:
+        os.unlink(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    main(args.rows, args.repeat)
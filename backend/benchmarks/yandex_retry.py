@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Exercise the Yandex API retry/rate-limit layer against a local fake Metrika server.
+
+The fake server enforces a per-token quota (429 + Retry-After when exceeded) and
+fails a share of requests with 503. Many counters are then fetched in parallel
+through fetch_counters_concurrently(), first with retries and client-side rate
+limiting disabled, then with the configured settings, and the number of failed
+counters, server responses and achieved request rate are printed for both runs.
+
+No database or Yandex credentials are needed.
+
+Usage (from backend/):
+    python -m benchmarks.yandex_retry [--counters 40] [--quota 10] [--error-rate 0.1]
+"""
+
+import argparse
+import asyncio
+import datetime
+import random
+import socket
+import time
+from collections import Counter, defaultdict, deque
+from types import SimpleNamespace
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app.config import settings
+from app.services.http_client import close_http_client
+from app.services.sync_service import fetch_counters_concurrently
+from app.services.yandex_metrika import YandexMetrikaService
+from app.services.yandex_rate_limit import reset_token_guards
+
+
+def build_fake_metrika(quota: float, error_rate: float, stats: Counter) -> Starlette:
+    """Fake /stat/v1/data: per-token sliding-window quota, random 503s, small latency"""
+    recent: dict[str, deque] = defaultdict(deque)
+
+    async def stat_data(request: Request) -> JSONResponse:
+        token = request.headers.get("Authorization", "")
+        now = time.monotonic()
+        window = recent[token]
+        while window and now - window[0] >= 1.0:
+            window.popleft()
+
+        if len(window) >= quota:
+            stats["429"] += 1
+            return JSONResponse(
+                {"message": "Quota exceeded"}, status_code=429, headers={"Retry-After": "1"}
+            )
+        window.append(now)
+
+        await asyncio.sleep(random.uniform(0.01, 0.05))
+        if random.random() < error_rate:
+            stats["503"] += 1
+            return JSONResponse({"message": "Service unavailable"}, status_code=503)
+
+        stats["200"] += 1
+        date1 = datetime.date.fromisoformat(request.query_params["date1"])
+        date2 = datetime.date.fromisoformat(request.query_params["date2"])
+        rows = [
+            {
+                "dimensions": [{"name": str(date1 + datetime.timedelta(days=i))}],
+                "metrics": [100, 40, 30, 95.5, 2.1, 0.3, 10],
+            }
+            for i in range((date2 - date1).days + 1)
+        ]
+        return JSONResponse({"data": rows})
+
+    return Starlette(routes=[Route("/stat/v1/data", stat_data)])
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_scenario(name: str, counters: int, stats: Counter) -> None:
+    stats.clear()
+    reset_token_guards()
+    jobs = [
+        (
+            SimpleNamespace(yandex_counter_id=str(1000 + i)),
+            datetime.date(2026, 1, 1),
+            datetime.date(2026, 1, 31),
+        )
+        for i in range(counters)
+    ]
+
+    started = time.monotonic()
+    async with YandexMetrikaService("fake-token") as ym_service:
+        results = await fetch_counters_concurrently(ym_service, jobs)
+    elapsed = time.monotonic() - started
+
+    failed = [r for r in results if isinstance(r, BaseException)]
+    sent = sum(stats.values())
+    print(f"\n=== {name} ===")
+    print(f"  counters ok/failed : {counters - len(failed)}/{len(failed)}")
+    print(f"  server responses   : 200={stats['200']} 429={stats['429']} 503={stats['503']}")
+    print(f"  elapsed            : {elapsed:.2f}s, {sent / elapsed:.1f} req/s sent,"
+          f" {stats['200'] / elapsed:.1f} req/s succeeded")
+    if failed:
+        print(f"  first error        : {failed[0]}")
+
+
+async def main(counters: int, quota: float, error_rate: float) -> None:
+    stats: Counter = Counter()
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(
+        build_fake_metrika(quota, error_rate, stats), host="127.0.0.1", port=port, log_level="warning",
+    ))
+    serve_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    YandexMetrikaService.API_BASE_URL = f"http://127.0.0.1:{port}"
+    print(f"Fake Metrika on port {port}: quota {quota} req/s per token, {error_rate:.0%} 503s;"
+          f" {counters} counters x 2 requests, {settings.yandex_max_concurrent_requests} in flight")
+
+    try:
+        configured = (
+            settings.yandex_retry_attempts,
+            settings.yandex_rate_limit_per_second,
+            settings.yandex_rate_limit_burst,
+        )
+
+        settings.yandex_retry_attempts = 1
+        settings.yandex_rate_limit_per_second = settings.yandex_rate_limit_burst = 1_000_000
+        await run_scenario("no retries, no client-side limit", counters, stats)
+
+        (
+            settings.yandex_retry_attempts,
+            settings.yandex_rate_limit_per_second,
+            settings.yandex_rate_limit_burst,
+        ) = configured
+        # Keep the client just under the server quota, as in production
+        settings.yandex_rate_limit_per_second = min(settings.yandex_rate_limit_per_second, quota * 0.9)
+        settings.yandex_rate_limit_burst = min(settings.yandex_rate_limit_burst, quota * 0.9)
+        await run_scenario(
+            f"retries={settings.yandex_retry_attempts},"
+            f" token bucket {settings.yandex_rate_limit_per_second:g} req/s",
+            counters,
+            stats,
+        )
+    finally:
+        await close_http_client()
+        server.should_exit = True
+        await serve_task
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--counters", type=int, default=40)
+    parser.add_argument("--quota", type=float, default=10.0, help="fake server requests/s per token")
+    parser.add_argument("--error-rate", type=float, default=0.1, help="share of requests failed with 503")
+    args = parser.parse_args()
+    asyncio.run(main(args.counters, args.quota, args.error_rate))
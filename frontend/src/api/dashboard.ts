@@ -1,7 +1,9 @@
 import type {
   BehaviorData,
+  BundleSection,
   ChannelMetric,
   ChannelTrendPoint,
+  DashboardBundle,
   EngagementData,
   Insight,
   KpiOverview,
@@ -129,3 +131,19 @@ export async function fetchVkDashboard(
   const { data } = await apiClient.get('/dashboard/vk', { params })
   return data
 }
+
+export async function fetchDashboardBundle(
+  libraryId: string,
+  period: Period,
+  dateFrom?: string,
+  dateTo?: string,
+  counterId?: string,
+  excludeRobots = true,
+  sections?: BundleSection[],
+): Promise<DashboardBundle> {
+  const params: Record<string, unknown> = { library_id: libraryId, period, exclude_robots: excludeRobots, ...dateParams(dateFrom, dateTo) }
+  if (counterId) params.counter_id = counterId
+  if (sections) params.sections = sections.join(',')
+  const { data } = await apiClient.get('/dashboard/bundle', { params })
+  return data
+}
@@ -3,21 +3,21 @@ import type {
   Period,
   VkStatsResponse,
   VkUpload,
-  VkUploadSummary,
+  VkUploadProgress,
 } from '@/types'
 
 /**
- * Upload VK CSV file
+ * Upload VK CSV file (processed in the background, poll fetchVkUploadStatus)
  */
 export async function uploadVkCsv(
   libraryId: string,
   channelId: string,
   file: File
-): Promise<VkUploadSummary> {
+): Promise<VkUploadProgress> {
   const formData = new FormData()
   formData.append('file', file)
 
-  const response = await apiClient.post<VkUploadSummary>(
+  const response = await apiClient.post<VkUploadProgress>(
     `/vk/upload?library_id=${libraryId}&channel_id=${channelId}`,
     formData,
     {
@@ -72,6 +72,14 @@ export async function listVkUploads(
   return response.data
 }
 
+/**
+ * Fetch VK upload status and progress
+ */
+export async function fetchVkUploadStatus(uploadId: string): Promise<VkUploadProgress> {
+  const response = await apiClient.get<VkUploadProgress>(`/vk/uploads/${uploadId}`)
+  return response.data
+}
+
 /**
  * Delete VK upload
  */
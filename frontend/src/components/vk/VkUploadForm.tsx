@@ -1,6 +1,6 @@
-import { useState } from 'react'
+import { useEffect, useState } from 'react'
 import { useMutation, useQuery, useQueryClient } from '@tanstack/react-query'
-import { uploadVkCsv } from '@/api/vk'
+import { fetchVkUploadStatus, uploadVkCsv } from '@/api/vk'
 import { fetchLibraries } from '@/api/dashboard'
 import { fetchAdminChannels } from '@/api/admin'
 
@@ -13,6 +13,7 @@ export default function VkUploadForm({ onSuccess, onClose }: Props) {
   const [file, setFile] = useState<File | null>(null)
   const [channelId, setChannelId] = useState('')
   const [isDragging, setIsDragging] = useState(false)
+  const [uploadId, setUploadId] = useState<string | null>(null)
   const queryClient = useQueryClient()
 
   const { data: libraries } = useQuery({ queryKey: ['libraries'], queryFn: fetchLibraries })
@@ -32,14 +33,36 @@ export default function VkUploadForm({ onSuccess, onClose }: Props) {
       if (!file || !channelId) throw new Error('File and channel required')
       return uploadVkCsv(libraryId, channelId, file)
     },
-    onSuccess: () => {
+    onSuccess: (data) => {
+      // The file is processed in the background — poll its status
+      setUploadId(data.id)
+      queryClient.invalidateQueries({ queryKey: ['vk-uploads'] })
+    },
+  })
+
+  const { data: uploadStatus } = useQuery({
+    queryKey: ['vk-upload', uploadId],
+    queryFn: () => fetchVkUploadStatus(uploadId!),
+    enabled: !!uploadId,
+    refetchInterval: (query) => {
+      const status = query.state.data?.status
+      return status === 'completed' || status === 'error' ? false : 1000
+    },
+  })
+
+  const isProcessing = uploadStatus?.status === 'processing'
+
+  useEffect(() => {
+    if (uploadStatus?.status === 'completed') {
       queryClient.invalidateQueries({ queryKey: ['vk-stats'] })
       queryClient.invalidateQueries({ queryKey: ['vk-uploads'] })
       setFile(null)
       setChannelId('')
       onSuccess?.()
-    },
-  })
+    } else if (uploadStatus?.status === 'error') {
+      queryClient.invalidateQueries({ queryKey: ['vk-uploads'] })
+    }
+  }, [uploadStatus?.status])
 
   const handleFileChange = (e: React.ChangeEvent<HTMLInputElement>) => {
     const selectedFile = e.target.files?.[0]
@@ -68,6 +91,7 @@ export default function VkUploadForm({ onSuccess, onClose }: Props) {
 
   const handleSubmit = (e: React.FormEvent) => {
     e.preventDefault()
+    setUploadId(null)
     uploadMutation.mutate()
   }
 
@@ -151,31 +175,47 @@ export default function VkUploadForm({ onSuccess, onClose }: Props) {
         </div>
 
         {/* Upload progress/status */}
-        {uploadMutation.isPending && (
+        {(uploadMutation.isPending || isProcessing) && (
           <div className="bg-blue-50 border border-blue-200 rounded-lg p-3">
             <div className="flex items-center">
               <div className="animate-spin rounded-full h-4 w-4 border-b-2 border-blue-600 mr-2"></div>
-              <span className="text-sm text-blue-700">Загрузка и обработка файла...</span>
+              <span className="text-sm text-blue-700">
+                {uploadMutation.isPending
+                  ? 'Загрузка файла...'
+                  : uploadStatus?.phase === 'saving'
+                    ? 'Сохранение метрик...'
+                    : 'Обработка файла...'}
+              </span>
             </div>
+            {isProcessing && uploadStatus && (
+              <p className="text-xs text-blue-600 mt-1">
+                {uploadStatus.rows_processed.toLocaleString('ru-RU')} строк
+                {uploadStatus.progress_pct !== null && ` · ${uploadStatus.progress_pct}%`}
+                {uploadStatus.rows_per_second !== null &&
+                  ` · ${Math.round(uploadStatus.rows_per_second).toLocaleString('ru-RU')} строк/с`}
+                {uploadStatus.eta_seconds !== null && ` · осталось ~${Math.ceil(uploadStatus.eta_seconds)} с`}
+              </p>
+            )}
           </div>
         )}
 
-        {uploadMutation.isSuccess && (
+        {uploadStatus?.status === 'completed' && (
           <div className="bg-green-50 border border-green-200 rounded-lg p-3">
             <p className="text-sm text-green-700">✓ CSV файл успешно загружен и обработан</p>
-            {uploadMutation.data && (
-              <p className="text-xs text-green-600 mt-1">
-                Обработано {uploadMutation.data.vk_metrics_count} дней метрик (
-                {uploadMutation.data.period_start} – {uploadMutation.data.period_end})
-              </p>
-            )}
+            <p className="text-xs text-green-600 mt-1">
+              Обработано {uploadStatus.vk_metrics_count} дней метрик (
+              {uploadStatus.period_start} – {uploadStatus.period_end})
+            </p>
           </div>
         )}
 
-        {uploadMutation.isError && (
+        {(uploadMutation.isError || uploadStatus?.status === 'error') && (
           <div className="bg-red-50 border border-red-200 rounded-lg p-3">
             <p className="text-sm text-red-700">
-              Ошибка: {(uploadMutation.error as Error).message}
+              Ошибка:{' '}
+              {uploadMutation.isError
+                ? (uploadMutation.error as Error).message
+                : uploadStatus?.error_message}
             </p>
           </div>
         )}
@@ -183,10 +223,10 @@ export default function VkUploadForm({ onSuccess, onClose }: Props) {
         {/* Submit button */}
         <button
           type="submit"
-          disabled={!file || !channelId || uploadMutation.isPending}
+          disabled={!file || !channelId || uploadMutation.isPending || isProcessing}
           className="w-full py-2.5 bg-blue-600 text-white rounded-lg text-sm font-medium hover:bg-blue-700 disabled:opacity-50 disabled:cursor-not-allowed transition-colors"
         >
-          {uploadMutation.isPending ? 'Загрузка...' : 'Загрузить CSV'}
+          {uploadMutation.isPending ? 'Загрузка...' : isProcessing ? 'Обработка...' : 'Загрузить CSV'}
         </button>
       </form>
     </div>
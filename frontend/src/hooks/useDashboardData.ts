@@ -1,84 +1,47 @@
 import { useQuery } from '@tanstack/react-query'
-import {
-  fetchBehavior,
-  fetchChannels,
-  fetchEngagement,
-  fetchInsights,
-  fetchOverview,
-  fetchReviews,
-  fetchVkDashboard,
-} from '@/api/dashboard'
+import { fetchDashboardBundle } from '@/api/dashboard'
 import { usePeriod } from '@/context/PeriodContext'
 import { useRobots } from '@/context/RobotsContext'
+import type { DashboardBundle } from '@/types'
 
-export function useOverview(libraryId: string) {
+// All dashboard blocks come from one /dashboard/bundle request: hooks with the
+// same key share it and each selects its own section.
+function useBundleSection<T>(libraryId: string, select: (bundle: DashboardBundle) => T) {
   const { period, customFrom, customTo, counterId } = usePeriod()
   const { excludeRobots } = useRobots()
   const hasCustom = customFrom && customTo
   return useQuery({
-    queryKey: ['overview', libraryId, period, customFrom, customTo, counterId, excludeRobots],
-    queryFn: () => fetchOverview(libraryId, period, hasCustom ? customFrom : undefined, hasCustom ? customTo : undefined, counterId || undefined, excludeRobots),
+    queryKey: ['dashboard-bundle', libraryId, period, customFrom, customTo, counterId, excludeRobots],
+    queryFn: () => fetchDashboardBundle(libraryId, period, hasCustom ? customFrom : undefined, hasCustom ? customTo : undefined, counterId || undefined, excludeRobots),
+    select,
     enabled: !!libraryId,
   })
 }
 
+export function useOverview(libraryId: string) {
+  return useBundleSection(libraryId, (bundle) => bundle.overview ?? undefined)
+}
+
 export function useChannels(libraryId: string) {
-  const { period, customFrom, customTo, counterId } = usePeriod()
-  const { excludeRobots } = useRobots()
-  const hasCustom = customFrom && customTo
-  return useQuery({
-    queryKey: ['channels', libraryId, period, customFrom, customTo, counterId, excludeRobots],
-    queryFn: () => fetchChannels(libraryId, period, hasCustom ? customFrom : undefined, hasCustom ? customTo : undefined, counterId || undefined, excludeRobots),
-    enabled: !!libraryId,
-  })
+  return useBundleSection(libraryId, (bundle) => bundle.channels ?? undefined)
 }
 
 export function useBehavior(libraryId: string) {
-  const { period, customFrom, customTo, counterId } = usePeriod()
-  const { excludeRobots } = useRobots()
-  const hasCustom = customFrom && customTo
-  return useQuery({
-    queryKey: ['behavior', libraryId, period, customFrom, customTo, counterId, excludeRobots],
-    queryFn: () => fetchBehavior(libraryId, period, hasCustom ? customFrom : undefined, hasCustom ? customTo : undefined, counterId || undefined, excludeRobots),
-    enabled: !!libraryId,
-  })
+  return useBundleSection(libraryId, (bundle) => bundle.behavior ?? undefined)
 }
 
 export function useEngagement(libraryId: string) {
-  const { period, customFrom, customTo } = usePeriod()
-  const hasCustom = customFrom && customTo
-  return useQuery({
-    queryKey: ['engagement', libraryId, period, customFrom, customTo],
-    queryFn: () => fetchEngagement(libraryId, period, hasCustom ? customFrom : undefined, hasCustom ? customTo : undefined),
-    enabled: !!libraryId,
-  })
+  return useBundleSection(libraryId, (bundle) => bundle.engagement ?? undefined)
 }
 
 export function useReviews(libraryId: string) {
-  return useQuery({
-    queryKey: ['reviews', libraryId],
-    queryFn: () => fetchReviews(libraryId),
-    enabled: !!libraryId,
-  })
+  return useBundleSection(libraryId, (bundle) => bundle.reviews ?? undefined)
 }
 
 export function useInsights(libraryId: string) {
-  const { period, customFrom, customTo, counterId } = usePeriod()
-  const { excludeRobots } = useRobots()
-  const hasCustom = customFrom && customTo
-  return useQuery({
-    queryKey: ['insights', libraryId, period, customFrom, customTo, counterId, excludeRobots],
-    queryFn: () => fetchInsights(libraryId, period, hasCustom ? customFrom : undefined, hasCustom ? customTo : undefined, counterId || undefined, excludeRobots),
-    enabled: !!libraryId,
-  })
+  return useBundleSection(libraryId, (bundle) => bundle.insights ?? undefined)
 }
 
 export function useVkStats(libraryId: string) {
-  const { period, customFrom, customTo } = usePeriod()
-  const hasCustom = customFrom && customTo
-  return useQuery({
-    queryKey: ['vk-dashboard', libraryId, period, customFrom, customTo],
-    queryFn: () => fetchVkDashboard(libraryId, period, hasCustom ? customFrom : undefined, hasCustom ? customTo : undefined),
-    enabled: !!libraryId,
-  })
+  return useBundleSection(libraryId, (bundle) => bundle.vk ?? undefined)
 }
@@ -40,6 +40,7 @@ export default function AdminEngagementPage() {
       setSuccess(true)
       setTimeout(() => setSuccess(false), 3000)
       queryClient.invalidateQueries({ queryKey: ['engagement'] })
+      queryClient.invalidateQueries({ queryKey: ['dashboard-bundle'] })
     },
   })
 
@@ -58,6 +58,7 @@ export default function AdminReviewsPage() {
       setTimeout(() => setSuccess(false), 3000)
       setText('')
       queryClient.invalidateQueries({ queryKey: ['reviews'] })
+      queryClient.invalidateQueries({ queryKey: ['dashboard-bundle'] })
     },
   })
 
@@ -65,6 +66,7 @@ export default function AdminReviewsPage() {
     mutationFn: (reviewId: string) => deleteReview(reviewId),
     onSuccess: () => {
       queryClient.invalidateQueries({ queryKey: ['reviews'] })
+      queryClient.invalidateQueries({ queryKey: ['dashboard-bundle'] })
     },
   })
 
@@ -131,8 +131,8 @@ export interface VkUpload {
   channel_id: string
   filename: string
   uploaded_at: string
-  period_start: string
-  period_end: string
+  period_start: string | null
+  period_end: string | null
   total_rows: number | null
   status: 'processing' | 'completed' | 'error'
   error_message: string | null
@@ -199,11 +199,40 @@ export interface VkStatsResponse {
   insights: Insight[]
 }
 
-export interface VkUploadSummary {
-  upload_id: string
-  total_rows: number
-  period_start: string
-  period_end: string
-  vk_metrics_count: number
-  engagement_metrics_count: number
+// Dashboard bundle (GET /dashboard/bundle): requested sections, the rest null
+
+export type BundleSection = 'overview' | 'channels' | 'behavior' | 'engagement' | 'reviews' | 'insights' | 'vk'
+
+export interface DashboardBundle {
+  overview: KpiOverview | null
+  channels: ChannelMetric[] | null
+  behavior: BehaviorData | null
+  engagement: EngagementData | null
+  reviews: ReviewsResponse | null
+  insights: Insight[] | null
+  vk: VkStatsResponse | null
+}
+
+export interface VkUploadProgress {
+  id: string
+  library_id: string
+  channel_id: string
+  filename: string
+  status: 'processing' | 'completed' | 'error'
+  phase: 'queued' | 'parsing' | 'saving' | null
+  bytes_total: number | null
+  bytes_processed: number
+  rows_processed: number
+  progress_pct: number | null
+  rows_per_second: number | null
+  eta_seconds: number | null
+  period_start: string | null
+  period_end: string | null
+  total_rows: number | null
+  vk_metrics_count: number | null
+  engagement_metrics_count: number | null
+  error_message: string | null
+  uploaded_at: string
+  started_at: string | null
+  finished_at: string | null
 }